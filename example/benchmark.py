@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the stages of generate_visualization.py.
+
+Synthetic result files in the format of the ``material`` executable are
+written for every combination of ``--schemes`` and ``--extracted``, and
+each stage is timed on them ``--repeat`` times:
+
+* ``parse``: ``parse_color_file``
+* ``extracted``: ``plot_extracted_colors``
+* ``impression_first``: the first ``draw_material_you_impression`` of a
+  process, which also builds the scene
+* ``impression``: ``draw_material_you_impression``, every scheme once
+  (seconds per scheme)
+* ``overview``: ``plot_all_schemes_overview``
+* ``comparison``: ``plot_scheme_comparison``
+* ``html``: ``generate_html_preview``
+
+Stages that take a DPI (the palette, overview and comparison plots) run
+once per ``--dpi`` value; the others do not depend on it. Results go to a
+JSON file together with the commit and library versions, and ``--compare``
+reports the ratio of every matching stage to an earlier run.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+
+from scheme_table import TOKENS, VARIANTS, hex_from_argb
+
+STAGES = (
+    "parse",
+    "extracted",
+    "impression_first",
+    "impression",
+    "overview",
+    "comparison",
+    "html",
+)
+
+# 接受 DPI 参数的阶段及其默认值
+DPI_STAGES = {"extracted": 200, "overview": 300, "comparison": 200}
+
+# 比上次慢这么多倍才算回归 (单核机器上抖动可达 10%)
+DEFAULT_REGRESSION_RATIO = 1.25
+# 亚毫秒级的阶段只看比例全是噪声，还要求绝对值慢出这么多秒
+MIN_REGRESSION_SECONDS = 0.005
+
+# 本进程里已经画过印象图的后端：场景只在第一次时构建
+_warm_backends = set()
+
+# 本进程是否已经做过不计时的预热渲染 (matplotlib 导入、字体缓存)
+_warm_renderer = False
+
+
+def write_synthetic_result(path, n_schemes, n_extracted, seed=0):
+    """
+    Write a result file with ``n_extracted`` extracted colors and
+    ``n_schemes`` schemes of random token colors.
+    """
+    rng = np.random.default_rng(seed)
+    extracted = rng.integers(0, 1 << 24, n_extracted)
+    colors = rng.integers(0, 1 << 24, (n_schemes, len(VARIANTS), len(TOKENS)))
+    lines = [f"Extracted {n_extracted} Colors:"]
+    lines += [hex_from_argb(c) for c in extracted.tolist()]
+    lines.append(f"Use source color {hex_from_argb(extracted[0])} to create scheme")
+    lines.append("")
+    for s in range(n_schemes):
+        for v, variant in enumerate(VARIANTS):
+            lines.append(f"Scheme Synthetic{s:03d} {variant.title()}:")
+            lines += [
+                f"{token}: Color {hex_from_argb(c)}"
+                for token, c in zip(TOKENS, colors[s, v].tolist())
+            ]
+            lines.append("")
+    Path(path).write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def time_call(func, *args, **kwargs):
+    """(seconds, result) of one call, with the printing of the plots muted."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        return time.perf_counter() - start, result
+
+
+def _record(results, stage, seconds, **params):
+    seconds = [round(t, 6) for t in seconds]
+    results.append(
+        dict(
+            stage=stage,
+            **params,
+            seconds=seconds,
+            min=min(seconds),
+            median=float(np.median(seconds)),
+        )
+    )
+
+
+def bench_case(gv, data_file, output_dir, dpis, repeat, backend, stages):
+    """Time every stage on one result file; returns a list of records."""
+    global _warm_renderer
+    results = []
+    parse_times = []
+    for _ in range(repeat):
+        t, (extracted, schemes) = time_call(gv.parse_color_file, data_file)
+        parse_times.append(t)
+    table = gv.SchemeTable.from_schemes(schemes, extracted)
+    params = dict(backend=backend, schemes=len(table), extracted=len(extracted))
+    if "parse" in stages:
+        _record(results, "parse", parse_times, dpi=None, **params)
+
+    paths = {}
+    for dpi in dpis:
+        calls = {
+            "extracted": (gv.plot_extracted_colors, (extracted, output_dir)),
+            "overview": (gv.plot_all_schemes_overview, (table, output_dir)),
+            "comparison": (gv.plot_scheme_comparison, (table, output_dir, backend)),
+        }
+        for stage, (func, args) in calls.items():
+            if stage not in stages:
+                continue
+            stage_dpi = dpi or DPI_STAGES[stage]
+            # 第一个计时阶段之前先渲染一次不计时，否则它独自承担 matplotlib
+            # 的导入和字体缓存，与其余阶段没法比较
+            if not _warm_renderer:
+                time_call(func, *args, dpi=stage_dpi)
+                _warm_renderer = True
+            times = []
+            for _ in range(repeat):
+                t, paths[stage] = time_call(func, *args, dpi=stage_dpi)
+                times.append(t)
+            _record(results, stage, times, dpi=stage_dpi, **params)
+
+    if stages & {"impression_first", "impression", "html"}:
+        scheme_paths = {}
+        first = None
+        warm = backend in _warm_backends
+        times = []
+        for _ in range(repeat):
+            for index, name in enumerate(table.names):
+                gv._seed_scheme_rng(index)
+                t, scheme_paths[name] = time_call(
+                    gv.draw_material_you_impression, name, table, output_dir, backend
+                )
+                # 第一张图包含场景 (或栅格化计划、SVG 模板) 的构建
+                if first is None and not warm:
+                    first = t
+                else:
+                    times.append(t)
+        _warm_backends.add(backend)
+        if "impression_first" in stages and first is not None:
+            _record(results, "impression_first", [first], dpi=None, **params)
+        if "impression" in stages and times:
+            _record(results, "impression", times, dpi=None, **params)
+
+    if "html" in stages:
+        times = []
+        for _ in range(repeat):
+            t, _ = time_call(
+                gv.generate_html_preview,
+                output_dir,
+                paths.get("extracted", output_dir / "extracted_colors.png"),
+                paths.get("overview", output_dir / "all_schemes_overview.png"),
+                paths.get("comparison", output_dir / "scheme_comparison.png"),
+                scheme_paths,
+            )
+            times.append(t)
+        _record(results, "html", times, dpi=None, **params)
+    return results
+
+
+def environment():
+    """Commit and versions the numbers were measured with."""
+    import matplotlib
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _case_key(record):
+    return (
+        record["stage"],
+        record["schemes"],
+        record["extracted"],
+        record["dpi"],
+        record["backend"],
+    )
+
+
+def compare(results, baseline, max_ratio=DEFAULT_REGRESSION_RATIO):
+    """
+    Print the ratio of every stage to the matching one of ``baseline`` (the
+    ``results`` list of an earlier run).
+
+    Returns:
+        the records that got slower than ``max_ratio`` times the baseline
+        (and by more than ``MIN_REGRESSION_SECONDS``)
+    """
+    before = {_case_key(record): record for record in baseline}
+    regressions = []
+    for record in results:
+        old = before.get(_case_key(record))
+        if old is None:
+            continue
+        ratio = record["min"] / old["min"] if old["min"] else float("inf")
+        flag = ""
+        if ratio > max_ratio and record["min"] - old["min"] > MIN_REGRESSION_SECONDS:
+            regressions.append(record)
+            flag = "  REGRESSION"
+        print(
+            f"  {record['stage']:<17} {old['min'] * 1000:9.1f} -> "
+            f"{record['min'] * 1000:9.1f} ms  x{ratio:5.2f}{flag}"
+        )
+    return regressions
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--schemes",
+        type=_int_list,
+        default=[9],
+        help="comma-separated scheme counts (default: 9)",
+    )
+    parser.add_argument(
+        "--extracted",
+        type=_int_list,
+        default=[4],
+        help="comma-separated extracted color counts (default: 4)",
+    )
+    parser.add_argument(
+        "--dpi",
+        type=_int_list,
+        default=None,
+        help="comma-separated DPIs of the palette, overview and comparison "
+        "plots (default: their own, "
+        + ", ".join(f"{stage} {dpi}" for stage, dpi in DPI_STAGES.items())
+        + ")",
+    )
+    parser.add_argument(
+        "--stages",
+        type=lambda text: text.split(","),
+        default=list(STAGES),
+        help="comma-separated stages to run (default: all)",
+    )
+    parser.add_argument(
+        "--backend",
+        default="matplotlib",
+        help="impression backend of generate_visualization (default: matplotlib)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per stage (default: 3)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the synthetic colors"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("benchmark.json"),
+        help="JSON file the results are written to (default: benchmark.json)",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="JSON",
+        help="earlier results to compare with; fails on regressions",
+    )
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=DEFAULT_REGRESSION_RATIO,
+        help="--compare: slowdown counted as a regression "
+        f"(default: {DEFAULT_REGRESSION_RATIO})",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    # 延迟导入：matplotlib 的导入时间不算进任何阶段
+    import generate_visualization as gv
+
+    if args.backend not in gv.IMPRESSION_BACKENDS:
+        parser.error(f"unknown backend: {args.backend}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="material-bench-") as tmp:
+        tmp = Path(tmp)
+        for n_schemes, n_extracted in product(args.schemes, args.extracted):
+            data_file = write_synthetic_result(
+                tmp / f"result_{n_schemes}_{n_extracted}.txt",
+                n_schemes,
+                n_extracted,
+                args.seed,
+            )
+            output_dir = tmp / f"out_{n_schemes}_{n_extracted}"
+            output_dir.mkdir()
+            case = bench_case(
+                gv,
+                data_file,
+                output_dir,
+                args.dpi or [None],
+                args.repeat,
+                args.backend,
+                set(args.stages),
+            )
+            for record in case:
+                dpi = f" dpi {record['dpi']}" if record["dpi"] else ""
+                print(
+                    f"{n_schemes:3d} schemes {n_extracted:3d} colors "
+                    f"{record['stage']:<17} {record['min'] * 1000:9.1f} ms{dpi}"
+                )
+            results.extend(case)
+
+    report = {"environment": environment(), "results": results}
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"Compared with {args.compare} ({baseline['environment']['commit']}):")
+        regressions = compare(results, baseline["results"], args.max_ratio)
+        return not regressions
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
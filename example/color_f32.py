@@ -0,0 +1,143 @@
+"""
+float32 ports of the color helpers used by the extraction pipeline:
+Material/Extract/futhark/src/color.fut and the ``int_to_cam`` of hct.fut.
+
+These follow the Futhark code operation by operation in float32 (including
+its pre-scaled matrices), rather than the float64 ``color_utils``/``hct``
+ports of the Lean library, so quantizer and scoring results match the
+native extraction.
+"""
+
+import numpy as np
+
+_F32 = np.float32
+_EPS = _F32((6.0 / 29.0) ** 3)
+_KAPPA = _F32(903.3)
+_DELTA = _F32(6.0 / 29.0)
+_LINEAR_TO_XYZ = np.array(
+    [
+        [0.43394994055572506, 0.37620976990331095, 0.18984028954096394],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.017756582753965265, 0.10946796102238182, 0.8727754562236529],
+    ],
+    dtype=np.float32,
+)
+_XYZ_TO_LINEAR = np.array(
+    [
+        [3.079954503474, -1.5371385, -0.542815944262],
+        [-0.92125825502, 1.8760108, 0.045247419479999995],
+        [0.052887382398, -0.2040259, 1.151138514516],
+    ],
+    dtype=np.float32,
+)
+
+
+def _mul(mat, vec):
+    # 与 color.fut 一样逐项展开，保持 float32 的求和顺序
+    return [
+        mat[i, 0] * vec[0] + mat[i, 1] * vec[1] + mat[i, 2] * vec[2] for i in range(3)
+    ]
+
+
+def srgb_to_linear(c):
+    """0-255 channel -> 0-1 linear, float32."""
+    return np.where(
+        c <= _F32(10.31475),
+        c * _F32(1 / 3294.6),
+        ((c + _F32(14.025)) * _F32(1 / 269.025)) ** _F32(2.4),
+    )
+
+
+def _int_to_rgb(argb):
+    argb = np.asarray(argb, dtype=np.uint32)
+    return [((argb >> shift) & 0xFF).astype(np.float32) for shift in (16, 8, 0)]
+
+
+def int_to_lab(argb):
+    """ARGB -> float32 [..., 3] L*a*b*, as ``int_to_lab`` in color.fut."""
+    linear = [srgb_to_linear(c) for c in _int_to_rgb(argb)]
+    fx, fy, fz = (
+        np.where(t > _EPS, t ** _F32(1 / 3), (_KAPPA * t + _F32(16)) * _F32(1 / 116))
+        for t in _mul(_LINEAR_TO_XYZ, linear)
+    )
+    return np.stack(
+        [_F32(116) * fy - _F32(16), _F32(500) * (fx - fy), _F32(200) * (fy - fz)],
+        axis=-1,
+    ).astype(np.float32)
+
+
+def lab_to_int(lab):
+    """float32 [..., 3] L*a*b* -> ARGB, as ``lab_to_int`` in color.fut."""
+    lab = np.asarray(lab, dtype=np.float32)
+    fy = (lab[..., 0] + _F32(16)) * _F32(1 / 116)
+    fx = fy + lab[..., 1] / _F32(500)
+    fz = fy - lab[..., 2] / _F32(200)
+    xyz = [
+        np.where(
+            t > _DELTA,
+            t * t * t,
+            _F32(3) * (_DELTA * _DELTA) * (t - _F32(4 / 29)),
+        )
+        for t in (fx, fy, fz)
+    ]
+    channels = []
+    with np.errstate(invalid="ignore"):
+        for c in _mul(_XYZ_TO_LINEAR, xyz):
+            srgb = np.where(
+                c <= _F32(0.0031308),
+                _F32(3294.6) * c,
+                _F32(269.025) * c ** _F32(1 / 2.4) - _F32(14.025),
+            )
+            # clamp: 先比较再截断取整
+            channels.append(np.clip(srgb, 0, 255).astype(np.uint32))
+    r, g, b = channels
+    return np.uint32(0xFF000000) | r << 16 | g << 8 | b
+
+
+# linear RGB (0-1) -> 经过白点和 D65 适应缩放后的 CAM16 锥体响应
+_LINEAR_TO_PRE_AF = np.array(
+    [
+        [0.12008336906363107, 0.23896947346596065, 0.027957431695526624],
+        [0.05891086930158274, 0.29785503982969913, 0.03270666258785232],
+        [0.010146692740499652, 0.05364214490750101, 0.32979402579569106],
+    ],
+    dtype=np.float32,
+)
+_RGB_A_TO_ABUAC = np.array(
+    [
+        [1.0, -12.0 / 11.0, 1 / 11.0],
+        [1.0 / 9.0, 1.0 / 9.0, -2.0 / 9.0],
+        [1.0, 1.0, 1.05],
+        [0.06783757876475698, 0.03391878938237849, 0.0016959394691189245],
+    ],
+    dtype=np.float32,
+)
+
+
+def int_to_cam(argb):
+    """
+    ARGB -> float32 (hue, chroma) arrays, as ``int_to_cam`` in hct.fut.
+    """
+    linear = [srgb_to_linear(c) for c in _int_to_rgb(argb)]
+    pre_af = _mul(_LINEAR_TO_PRE_AF, linear)
+    rgb_a = []
+    for paf in pre_af:
+        af = np.abs(paf) ** _F32(0.42)
+        rgb_a.append(np.sign(paf) * _F32(400) * af / (af + _F32(27.13)))
+    a, b, u = _mul(_RGB_A_TO_ABUAC, rgb_a)
+    m = _RGB_A_TO_ABUAC[3]
+    ac = m[0] * rgb_a[0] + m[1] * rgb_a[1] + m[2] * rgb_a[2]
+
+    degrees = np.arctan2(b, a) * _F32(180) / _F32(np.pi)
+    hue = np.where(degrees < 0, degrees + _F32(360), degrees)
+    hue_radians = hue * _F32(np.pi) / _F32(180)
+    sqrt_j_div_100 = np.sqrt(ac ** _F32(1.317326989131661))
+    hue_prime = np.where(
+        hue < _F32(20.14),
+        hue_radians + _F32(2) * _F32(np.pi) + _F32(2),
+        hue_radians + _F32(2),
+    )
+    p1 = _F32(977.8069759615383) * np.cos(hue_prime) + _F32(3715.666508653846)
+    t = p1 * np.sqrt(a * a + b * b) / (u + _F32(0.305))
+    chroma = t ** _F32(0.9) * _F32(0.8834525553575613) * sqrt_j_div_100
+    return hue.astype(np.float32), chroma.astype(np.float32)
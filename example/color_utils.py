@@ -0,0 +1,147 @@
+"""
+NumPy port of Material/Utils/ColorUtils.lean.
+
+Every function accepts scalars or arrays and broadcasts, so whole palettes
+are converted in one call. ARGB colors are ``uint32`` values as in the Lean
+code; L* and Y use the same 0-100 scales.
+"""
+
+import numpy as np
+
+SRGB_TO_XYZ = np.array(
+    [
+        [0.41233895, 0.35762064, 0.18051042],
+        [0.2126, 0.7152, 0.0722],
+        [0.01932141, 0.11916382, 0.95034478],
+    ]
+)
+
+XYZ_TO_SRGB = np.array(
+    [
+        [3.2413774792388685, -1.5376652402851851, -0.49885366846268053],
+        [-0.9691452513005321, 1.8758853451067872, 0.04156585616912061],
+        [0.05562093689691305, -0.20395524564742123, 1.0571799111220335],
+    ]
+)
+
+WHITE_POINT_D65 = np.array([95.047, 100.0, 108.883])
+
+_LAB_E = 216.0 / 24389.0
+_LAB_KAPPA = 24389.0 / 27.0
+
+
+def red_from_argb(argb):
+    return (np.asarray(argb, dtype=np.uint32) >> 16) & 0xFF
+
+
+def green_from_argb(argb):
+    return (np.asarray(argb, dtype=np.uint32) >> 8) & 0xFF
+
+
+def blue_from_argb(argb):
+    return np.asarray(argb, dtype=np.uint32) & 0xFF
+
+
+def argb_from_rgb(red, green, blue):
+    red = np.asarray(red, dtype=np.uint32)
+    green = np.asarray(green, dtype=np.uint32)
+    blue = np.asarray(blue, dtype=np.uint32)
+    return (
+        np.uint32(0xFF000000)
+        | ((red & 0xFF) << 16)
+        | ((green & 0xFF) << 8)
+        | (blue & 0xFF)
+    )
+
+
+def rgb_from_argb(argb):
+    """ARGB -> [..., 3] array of 0-255 channel values."""
+    return np.stack(
+        [red_from_argb(argb), green_from_argb(argb), blue_from_argb(argb)], axis=-1
+    )
+
+
+def linearized(rgb_component):
+    """0-255 sRGB channel -> 0-100 linear RGB."""
+    normalized = np.asarray(rgb_component, dtype=np.float64) / 255.0
+    return np.where(
+        normalized <= 0.040449936,
+        normalized / 12.92 * 100.0,
+        ((normalized + 0.055) / 1.055) ** 2.4 * 100.0,
+    )
+
+
+def true_delinearized(rgb_component):
+    """0-100 linear RGB -> 0-255 sRGB, unrounded."""
+    normalized = np.asarray(rgb_component, dtype=np.float64) / 100.0
+    delinearized = np.where(
+        normalized <= 0.0031308,
+        normalized * 12.92,
+        1.055 * np.abs(normalized) ** (1.0 / 2.4) - 0.055,
+    )
+    return delinearized * 255.0
+
+
+def delinearized(rgb_component):
+    """0-100 linear RGB -> 0-255 sRGB, truncated and clamped like the Lean code."""
+    # Float.toUInt32 把 NaN 变成 0
+    value = np.nan_to_num(true_delinearized(rgb_component), nan=0.0)
+    return np.clip(value, 0, 255).astype(np.uint32)
+
+
+def lab_f(t):
+    t = np.asarray(t, dtype=np.float64)
+    return np.where(
+        t > _LAB_E, np.abs(t) ** (1.0 / 3.0), (_LAB_KAPPA * t + 16.0) / 116.0
+    )
+
+
+def lab_invf(ft):
+    ft = np.asarray(ft, dtype=np.float64)
+    ft3 = ft**3
+    return np.where(ft3 > _LAB_E, ft3, (116.0 * ft - 16.0) / _LAB_KAPPA)
+
+
+def y_from_lstar(lstar):
+    return 100.0 * lab_invf((np.asarray(lstar, dtype=np.float64) + 16.0) / 116.0)
+
+
+def lstar_from_y(y):
+    return lab_f(np.asarray(y, dtype=np.float64) / 100.0) * 116.0 - 16.0
+
+
+def argb_from_linrgb(linrgb):
+    """[..., 3] linear RGB (0-100) -> ARGB."""
+    v = delinearized(linrgb)
+    return argb_from_rgb(v[..., 0], v[..., 1], v[..., 2])
+
+
+def argb_from_xyz(xyz):
+    """[..., 3] XYZ -> ARGB."""
+    return argb_from_linrgb(np.asarray(xyz, dtype=np.float64) @ XYZ_TO_SRGB.T)
+
+
+def xyz_from_argb(argb):
+    """ARGB -> [..., 3] XYZ."""
+    return linearized(rgb_from_argb(argb)) @ SRGB_TO_XYZ.T
+
+
+def y_from_argb(argb):
+    """ARGB -> relative luminance Y on the 0-100 scale."""
+    return linearized(rgb_from_argb(argb)) @ SRGB_TO_XYZ[1]
+
+
+def lab_from_argb(argb):
+    """ARGB -> [..., 3] L*a*b*."""
+    fxyz = lab_f(xyz_from_argb(argb) / WHITE_POINT_D65)
+    fx, fy, fz = fxyz[..., 0], fxyz[..., 1], fxyz[..., 2]
+    return np.stack([116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)], axis=-1)
+
+
+def argb_from_lstar(lstar):
+    component = delinearized(y_from_lstar(lstar))
+    return argb_from_rgb(component, component, component)
+
+
+def lstar_from_argb(argb):
+    return lstar_from_y(y_from_argb(argb))
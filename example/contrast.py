@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Vectorized port of Material/Contrast/Contrast.lean plus bulk legibility tools.
+
+Contrast ratios follow WCAG: (Y_lighter + 5) / (Y_darker + 5) with the
+relative luminance Y on the 0-100 scale of ColorUtils. All functions
+broadcast over NumPy arrays, so every foreground/background role pair of
+every scheme is checked in one pass.
+"""
+
+import argparse
+
+import numpy as np
+
+from color_utils import lstar_from_y, y_from_argb, y_from_lstar
+from scheme_table import VARIANTS
+
+CONTRAST_RATIO_EPSILON = 0.04
+LUMINANCE_GAMUT_MAP_TOLERANCE = 0.4
+
+# WCAG AA 门槛：正文 4.5，大字/图形 3.0
+MIN_RATIO_TEXT = 4.5
+MIN_RATIO_LARGE = 3.0
+
+# 需要保证可读性的 (前景, 背景) 角色对
+ON_COLOR_PAIRS = (
+    ("onBackground", "background"),
+    ("onSurface", "surface"),
+    ("onSurface", "surfaceDim"),
+    ("onSurface", "surfaceBright"),
+    ("onSurface", "surfaceContainerLowest"),
+    ("onSurface", "surfaceContainerLow"),
+    ("onSurface", "surfaceContainer"),
+    ("onSurface", "surfaceContainerHigh"),
+    ("onSurface", "surfaceContainerHighest"),
+    ("onSurfaceVariant", "surfaceVariant"),
+    ("inverseOnSurface", "inverseSurface"),
+    ("inversePrimary", "inverseSurface"),
+    ("onPrimary", "primary"),
+    ("onPrimaryContainer", "primaryContainer"),
+    ("onSecondary", "secondary"),
+    ("onSecondaryContainer", "secondaryContainer"),
+    ("onTertiary", "tertiary"),
+    ("onTertiaryContainer", "tertiaryContainer"),
+    ("onError", "error"),
+    ("onErrorContainer", "errorContainer"),
+    ("onPrimaryFixed", "primaryFixed"),
+    ("onPrimaryFixedVariant", "primaryFixed"),
+    ("onSecondaryFixed", "secondaryFixed"),
+    ("onSecondaryFixedVariant", "secondaryFixed"),
+    ("onTertiaryFixed", "tertiaryFixed"),
+    ("onTertiaryFixedVariant", "tertiaryFixed"),
+)
+
+
+def ratio_of_ys(y1, y2):
+    lighter = np.maximum(y1, y2)
+    darker = np.minimum(y1, y2)
+    return (lighter + 5.0) / (darker + 5.0)
+
+
+def ratio_of_tones(t1, t2):
+    return ratio_of_ys(y_from_lstar(t1), y_from_lstar(t2))
+
+
+def lighter(tone, ratio):
+    """
+    Tone >= ``tone`` with at least ``ratio`` contrast; NaN where
+    Contrast.lighter returns none.
+    """
+    tone = np.asarray(tone, dtype=np.float64)
+    ratio = np.asarray(ratio, dtype=np.float64)
+    dark_y = y_from_lstar(tone)
+    light_y = ratio * (dark_y + 5.0) - 5.0
+    real_contrast = ratio_of_ys(light_y, dark_y)
+    delta = np.abs(real_contrast - ratio)
+    value = lstar_from_y(light_y) + LUMINANCE_GAMUT_MAP_TOLERANCE
+    ok = (
+        (0.0 <= tone)
+        & (tone <= 100.0)
+        & (0.0 <= light_y)
+        & (light_y <= 100.0)
+        & ((real_contrast >= ratio) | (delta <= CONTRAST_RATIO_EPSILON))
+        & (0.0 <= value)
+        & (value <= 100.0)
+    )
+    return np.where(ok, value, np.nan)
+
+
+def darker(tone, ratio):
+    """
+    Tone <= ``tone`` with at least ``ratio`` contrast; NaN where
+    Contrast.darker returns none.
+    """
+    tone = np.asarray(tone, dtype=np.float64)
+    ratio = np.asarray(ratio, dtype=np.float64)
+    light_y = y_from_lstar(tone)
+    dark_y = (light_y + 5.0) / ratio - 5.0
+    real_contrast = ratio_of_ys(light_y, dark_y)
+    delta = np.abs(real_contrast - ratio)
+    value = lstar_from_y(dark_y) - LUMINANCE_GAMUT_MAP_TOLERANCE
+    ok = (
+        (0.0 <= tone)
+        & (tone <= 100.0)
+        & (0.0 <= dark_y)
+        & (dark_y <= 100.0)
+        & ((real_contrast >= ratio) | (delta <= CONTRAST_RATIO_EPSILON))
+        & (0.0 <= value)
+        & (value <= 100.0)
+    )
+    return np.where(ok, value, np.nan)
+
+
+def lighter_unsafe(tone, ratio):
+    return np.nan_to_num(lighter(tone, ratio), nan=100.0)
+
+
+def darker_unsafe(tone, ratio):
+    return np.nan_to_num(darker(tone, ratio), nan=0.0)
+
+
+def pick_on_color(backgrounds, candidates):
+    """
+    For every background pick the candidate with the highest contrast.
+
+    Args:
+        backgrounds: ARGB array of any shape
+        candidates: 1-D ARGB array of possible foreground colors
+
+    Returns:
+        (index, ratio) arrays shaped like ``backgrounds``: the chosen
+        candidate index and the contrast it achieves
+    """
+    backgrounds = np.asarray(backgrounds, dtype=np.uint32)
+    candidates = np.asarray(candidates, dtype=np.uint32).reshape(-1)
+    ratios = ratio_of_ys(y_from_argb(backgrounds)[..., None], y_from_argb(candidates))
+    index = ratios.argmax(axis=-1)
+    return index, np.take_along_axis(ratios, index[..., None], axis=-1)[..., 0]
+
+
+def contrast_matrix(table, foregrounds=None, backgrounds=None):
+    """
+    Contrast ratio of every foreground role against every background role.
+
+    Args:
+        table: ``SchemeTable``
+        foregrounds, backgrounds: token names (default: all tokens)
+
+    Returns:
+        float array [scheme, variant, foreground, background]
+    """
+    fg = [table.token_index[t] for t in (foregrounds or table.tokens)]
+    bg = [table.token_index[t] for t in (backgrounds or table.tokens)]
+    y = y_from_argb(table.argb)
+    return ratio_of_ys(y[:, :, fg, None], y[:, :, None, bg])
+
+
+def pair_contrast(table, pairs=ON_COLOR_PAIRS):
+    """Contrast of each (foreground, background) pair: [scheme, variant, pair]."""
+    fg = [table.token_index[f] for f, _ in pairs]
+    bg = [table.token_index[b] for _, b in pairs]
+    y = y_from_argb(table.argb)
+    return ratio_of_ys(y[:, :, fg], y[:, :, bg])
+
+
+def audit(table, pairs=ON_COLOR_PAIRS, min_ratio=MIN_RATIO_TEXT):
+    """
+    Bulk accessibility audit of a ``SchemeTable``.
+
+    Returns:
+        list of (scheme, variant, foreground, background, ratio) for every
+        pair below ``min_ratio``, worst first
+    """
+    ratios = pair_contrast(table, pairs)
+    failures = [
+        (table.names[s], VARIANTS[v], pairs[p][0], pairs[p][1], float(ratios[s, v, p]))
+        for s, v, p in zip(*np.nonzero(ratios < min_ratio))
+    ]
+    return sorted(failures, key=lambda row: row[4])
+
+
+def main(argv=None):
+    # 延迟导入：解析结果文件需要 generate_visualization 中的解析器
+    from generate_visualization import parse_color_table
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "input", help="output of the material executable, '-' for stdin"
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        default=MIN_RATIO_TEXT,
+        help=f"minimum contrast ratio for on-color pairs (default: {MIN_RATIO_TEXT})",
+    )
+    parser.add_argument(
+        "--matrix",
+        metavar="NPY",
+        help="also save the full [scheme, variant, fg, bg] contrast matrix here",
+    )
+    args = parser.parse_args(argv)
+
+    table = parse_color_table(args.input)
+    if args.matrix:
+        np.save(args.matrix, contrast_matrix(table))
+        print(
+            f"Saved {len(table)}x2x{len(table.tokens)}^2 contrast matrix to {args.matrix}"
+        )
+
+    failures = audit(table, min_ratio=args.min_ratio)
+    n_checked = len(table) * 2 * len(ON_COLOR_PAIRS)
+    print(
+        f"Checked {n_checked} on-color pairs, {len(failures)} below {args.min_ratio}:1"
+    )
+    for scheme, variant, fg, bg, ratio in failures:
+        print(f"  {scheme:<12} {variant:<5} {fg:>24} on {bg:<24} {ratio:5.2f}:1")
+    return not failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+"""
+NumPy rasterizer for the desktop impression of generate_visualization.py.
+
+The scene is the same list of ``Shape`` records the matplotlib backend turns
+into patches (rounded rectangles, circles, one rectangle and the cursor
+polygon). Here each shape becomes a signed distance field over the pixels
+of its bounding box, and ``clip(0.5 - d, 0, 1)`` is its antialiased
+coverage. Data coordinates map to pixels exactly as in the matplotlib
+figure (same size, DPI and subplot layout, clipped to the axes).
+
+Coverage and alpha do not depend on the colors, so alpha compositing is
+done once per process on "recipes" instead of colors: every pixel stores
+the index of a fixed mix of palette slots (background, surface, primary,
+...). Rendering a scheme is then a small matrix product, recipes x slot
+colors, and one gather into the image. Only the terminal code lines,
+whose widths are random per scheme, are composited per render, inside
+their small bounding box; their coverage is cached per width, which
+repeats for the same scheme across the images of a batch.
+
+A scheme takes 25-35 ms to render (the lower figure once its code lines
+are cached) and another 28 ms to compress into a PNG. zlib costs about the
+same at every level on the 8.8 MB of RGB rows, so the whole impression is
+4-5x faster than matplotlib, not 10x.
+"""
+
+import argparse
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+from lazy_import import lazy_import
+from scheme_table import TOKEN_INDEX, VARIANTS, argb_from_hex, rgba_from_argb
+
+np = lazy_import("numpy")
+
+# 合成时 alpha 量化到 1/4096，远小于 8 位输出的精度
+ALPHA_LEVELS = 4096
+
+# matplotlib 的 round 圆角是二次贝塞尔曲线，按这么多段折线求距离
+CORNER_SEGMENTS = 16
+
+# 输出 PNG 的 zlib 压缩级别
+PNG_LEVEL = 3
+
+# 缓存这么多条 (屏幕, 代码行, 宽度) 的覆盖率：批量渲染时第 k 个方案的
+# 代码行宽度在每张图里都一样 (见 _seed_scheme_rng)
+CODE_LINE_CACHE_SIZE = 256
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _ellipse_sdf(qx, qy, rx, ry):
+    """Approximate signed distance of ``(qx, qy)`` to an origin-centered ellipse."""
+    k0 = np.hypot(qx / rx, qy / ry)
+    k1 = np.hypot(qx / (rx * rx), qy / (ry * ry))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d = k0 * (k0 - 1.0) / k1
+    # 圆心处梯度为零，直接取到短半轴的距离
+    return np.where(k1 > 0, d, -min(rx, ry))
+
+
+def _polyline_distance(px, py, points):
+    """Distance from every ``(px, py)`` to the polyline through ``points``."""
+    d = np.full(np.shape(px), np.inf)
+    for (ax, ay), (bx, by) in zip(points[:-1], points[1:]):
+        ex, ey = bx - ax, by - ay
+        wx, wy = px - ax, py - ay
+        t = np.clip((wx * ex + wy * ey) / (ex * ex + ey * ey), 0.0, 1.0)
+        d = np.minimum(d, np.hypot(wx - ex * t, wy - ey * t))
+    return d
+
+
+def rrect_sdf(px, py, cx, cy, hx, hy, rx, ry):
+    """
+    Signed distance to the ``round`` box of matplotlib: half size
+    ``(hx, hy)`` centered at ``(cx, cy)``, corners of size ``(rx, ry)``
+    (0 = sharp).
+
+    The corners are the quadratic Bezier curves ``BoxStyle.Round`` draws
+    (control point at the box corner), not circular arcs.
+    """
+    px, py = np.broadcast_arrays(px, py)
+    qx = np.abs(px - cx) - (hx - rx)
+    qy = np.abs(py - cy) - (hy - ry)
+    d = np.maximum(qx - rx, qy - ry)
+    corner = (qx > 0) & (qy > 0)
+    if rx <= 0 or ry <= 0:
+        return np.where(corner, np.hypot(qx, qy), d)
+    qx, qy = qx[corner], qy[corner]
+    # 以圆角起点为原点：B(t) = (rx (2t - t^2), ry (1 - t^2))
+    t = np.linspace(0.0, 1.0, CORNER_SEGMENTS + 1)
+    curve = np.stack([rx * (2 * t - t * t), ry * (1 - t * t)], axis=1)
+    distance = _polyline_distance(qx, qy, curve)
+    # 曲线的隐式方程：sqrt(u) + sqrt(v) = 1，u、v 是到角点的归一化距离
+    u = np.clip((rx - qx) / rx, 0.0, None)
+    v = np.clip((ry - qy) / ry, 0.0, None)
+    inside = np.sqrt(u) + np.sqrt(v) > 1.0
+    d[corner] = np.where(inside, -distance, distance)
+    return d
+
+
+def polygon_sdf(px, py, vertices):
+    """Signed distance to a closed polygon (even-odd inside test)."""
+    px, py = np.broadcast_arrays(px, py)
+    vertices = np.asarray(vertices, dtype=np.float64)
+    d = _polyline_distance(px, py, np.vstack([vertices, vertices[:1]]))
+    inside = np.zeros(d.shape, dtype=bool)
+    for (ax, ay), (bx, by) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (px < x_cross)
+    return np.where(inside, -d, d)
+
+
+def fill_coverage(d):
+    return np.clip(0.5 - d, 0.0, 1.0)
+
+
+def stroke_coverage(d, width):
+    return np.clip(0.5 + width / 2 - np.abs(d), 0.0, 1.0)
+
+
+def axes_boxes(figsize, dpi, n_axes, left, right, top, bottom, wspace):
+    """
+    Pixel boxes ``(x0, y0, x1, y1)`` (top-left origin) of a 1 x ``n_axes``
+    ``subplots`` grid after ``subplots_adjust``.
+    """
+    width, height = figsize[0] * dpi, figsize[1] * dpi
+    cell = (right - left) / (n_axes + wspace * (n_axes - 1))
+    boxes = []
+    for i in range(n_axes):
+        x0 = left + i * cell * (1 + wspace)
+        boxes.append(
+            (x0 * width, (1 - top) * height, (x0 + cell) * width, (1 - bottom) * height)
+        )
+    return boxes
+
+
+def png_rows(height, width):
+    """
+    uint8 [h, 1 + 3w] buffer in PNG scanline layout (filter byte 0, then
+    RGB) and its [h, w, 3] image view, so an image drawn into the view is
+    written without another copy.
+    """
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    return raw, raw[:, 1:].reshape(height, width, 3)
+
+
+def png_chunk(tag, data):
+    """One PNG chunk: length, tag, data and CRC."""
+    body = tag + data
+    return len(data).to_bytes(4, "big") + body + zlib.crc32(body).to_bytes(4, "big")
+
+
+def write_png(path, rgb, level=PNG_LEVEL):
+    """
+    Write a uint8 [h, w, 3] image (ideally a ``png_rows`` view) as an 8-bit
+    RGB PNG.
+
+    Rows are stored unfiltered: flat UI colors compress about as well that
+    way, and it is several times faster than PIL's filtered encoder.
+    """
+    height, width, _ = rgb.shape
+    raw = rgb.base
+    # 只有恰好是 png_rows 的视图时才能直接压缩底层缓冲区
+    if (
+        raw is None
+        or raw.shape != (height, width * 3 + 1)
+        or rgb.ctypes.data != raw.ctypes.data + 1
+    ):
+        raw, view = png_rows(height, width)
+        view[:] = rgb
+
+    header = (
+        width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, 2, 0, 0, 0])
+    )
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", header))
+        f.write(png_chunk(b"IDAT", zlib.compress(raw, level)))
+        f.write(png_chunk(b"IEND", b""))
+
+
+class RasterScreen:
+    """One screen (axes) of the scene: data-to-pixel mapping and clipping."""
+
+    def __init__(self, box, data_size, image_size):
+        x0, y0, x1, y1 = box
+        self.x0, self.y1 = x0, y1
+        self.sx = (x1 - x0) / data_size[0]
+        self.sy = (y1 - y0) / data_size[1]
+        # Agg 的裁剪框取整到像素
+        width, height = image_size
+        self.clip = (
+            max(int(np.floor(x0 + 0.5)), 0),
+            max(int(np.floor(y0 + 0.5)), 0),
+            min(int(np.floor(x1 + 0.5)), width),
+            min(int(np.floor(y1 + 0.5)), height),
+        )
+
+    def to_pixels(self, x, y):
+        return self.x0 + x * self.sx, self.y1 - y * self.sy
+
+    def grid(self, x0, y0, x1, y1, pad):
+        """
+        Pixel-center grid over a pixel-space bounding box (plus ``pad``),
+        clipped to the axes; None if nothing is left. Slices are relative
+        to the clip box.
+        """
+        cx0, cy0, cx1, cy1 = self.clip
+        c0 = max(int(np.floor(x0 - pad)), cx0)
+        c1 = min(int(np.ceil(x1 + pad)), cx1)
+        r0 = max(int(np.floor(y0 - pad)), cy0)
+        r1 = min(int(np.ceil(y1 + pad)), cy1)
+        if c0 >= c1 or r0 >= r1:
+            return None
+        px = np.arange(c0, c1, dtype=np.float64)[None, :] + 0.5
+        py = np.arange(r0, r1, dtype=np.float64)[:, None] + 0.5
+        return slice(r0 - cy0, r1 - cy0), slice(c0 - cx0, c1 - cx0), px, py
+
+    def shape_sdf(self, shape, pad):
+        """(rows, cols, signed distance in pixels) of a ``Shape``, or None."""
+        if shape.kind in ("rrect", "rect"):
+            x, y, w, h = shape.geometry[:4]
+            r = shape.geometry[4] if shape.kind == "rrect" else 0.0
+            left, top = self.to_pixels(x, y + h)
+            right, bottom = self.to_pixels(x + w, y)
+            region = self.grid(left, top, right, bottom, pad)
+            if region is None:
+                return None
+            rows, cols, px, py = region
+            d = rrect_sdf(
+                px,
+                py,
+                (left + right) / 2,
+                (top + bottom) / 2,
+                (right - left) / 2,
+                (bottom - top) / 2,
+                r * self.sx,
+                r * self.sy,
+            )
+        elif shape.kind == "circle":
+            x, y, r = shape.geometry
+            cx, cy = self.to_pixels(x, y)
+            rx, ry = r * self.sx, r * self.sy
+            region = self.grid(cx - rx, cy - ry, cx + rx, cy + ry, pad)
+            if region is None:
+                return None
+            rows, cols, px, py = region
+            d = _ellipse_sdf(px - cx, py - cy, rx, ry)
+        else:
+            vertices = np.array([self.to_pixels(x, y) for x, y in shape.geometry])
+            (left, top), (right, bottom) = vertices.min(axis=0), vertices.max(axis=0)
+            region = self.grid(left, top, right, bottom, pad)
+            if region is None:
+                return None
+            rows, cols, px, py = region
+            d = polygon_sdf(px, py, vertices)
+        return rows, cols, d
+
+
+def _color_key(color):
+    """Palette slot key of a ``ColorRole`` or literal color; None if unpainted."""
+    if isinstance(color, str):
+        return None if color.lower() == "none" else color.lower()
+    return color.key
+
+
+class _Recipes:
+    """Growable table of recipes: rows of weights over the palette slots."""
+
+    def __init__(self, n_slots, first_slot):
+        self.weights = np.zeros((1024, n_slots))
+        self.weights[0, first_slot] = 1.0
+        self.count = 1
+
+    def mix(self, old, alpha, slot):
+        """Add ``old * (1 - alpha) + slot * alpha`` recipes; returns their ids."""
+        new = self.weights[old] * (1.0 - alpha)[:, None]
+        new[:, slot] += alpha
+        end = self.count + len(new)
+        if end > len(self.weights):
+            grown = np.zeros((max(2 * len(self.weights), end), self.weights.shape[1]))
+            grown[: self.count] = self.weights[: self.count]
+            self.weights = grown
+        self.weights[self.count : end] = new
+        ids = np.arange(self.count, end, dtype=np.int32)
+        self.count = end
+        return ids
+
+
+class ScreenPlan:
+    """
+    Precomputed composite of one screen.
+
+    Attributes:
+        labels: int32 recipe of every pixel of the clip box, code lines left out
+        weights: float64 [n_recipes, n_slots]
+        code_box: (rows, cols) slices around all code lines, or None
+        code_lower: recipes under the code lines inside ``code_box``
+        code_transmittance: share of a code line's color that reaches the
+            image through the layers above it
+    """
+
+    def __init__(self, screen, layers, code_shapes, n_slots):
+        x0, y0, x1, y1 = screen.clip
+        self.screen = screen
+        labels = np.zeros((y1 - y0, x1 - x0), dtype=np.int32)
+        recipes = _Recipes(n_slots, 0)
+        self.code_box = None
+        self.code_lower = None
+        self.code_transmittance = None
+
+        for item in layers:
+            if item is None:
+                # 代码行所在的位置：记下下层配方，之后累计上层的透过率
+                self._start_code_lines(screen, code_shapes, labels)
+                continue
+            rows, cols, alpha, slot = item
+            q = np.rint(alpha * ALPHA_LEVELS).astype(np.int64)
+            region = labels[rows, cols]
+            # 内部像素的 alpha 都相同，只按原配方分组即可，不用排序
+            interior = q == q.max()
+            if q.max() > 0:
+                old = region[interior]
+                present = np.bincount(old, minlength=recipes.count) > 0
+                lookup = np.zeros(recipes.count, dtype=np.int32)
+                unique = np.flatnonzero(present)
+                lookup[unique] = recipes.mix(
+                    unique, np.full(len(unique), q.max() / ALPHA_LEVELS), slot
+                )
+                region[interior] = lookup[old]
+            # 边缘像素按 (原配方, alpha) 分组
+            edge = (q > 0) & ~interior
+            if edge.any():
+                keys = region[edge].astype(np.int64) * (ALPHA_LEVELS + 1) + q[edge]
+                unique, inverse = np.unique(keys, return_inverse=True)
+                region[edge] = recipes.mix(
+                    unique // (ALPHA_LEVELS + 1),
+                    (unique % (ALPHA_LEVELS + 1)) / ALPHA_LEVELS,
+                    slot,
+                )[inverse.ravel()]
+            if self.code_transmittance is not None:
+                self._attenuate(rows, cols, q)
+
+        # 只保留最终用到的配方
+        used = [labels.ravel()]
+        if self.code_lower is not None:
+            used.append(self.code_lower.ravel())
+        used = np.unique(np.concatenate(used))
+        self.weights = recipes.weights[used]
+        self.labels = np.searchsorted(used, labels).astype(np.int32)
+        if self.code_lower is not None:
+            self.code_lower = np.searchsorted(used, self.code_lower).astype(np.int32)
+
+    def _start_code_lines(self, screen, code_shapes, labels):
+        boxes = [screen.shape_sdf(shape, pad=1.0) for shape in code_shapes]
+        boxes = [b for b in boxes if b is not None]
+        if not boxes:
+            return
+        rows = slice(min(b[0].start for b in boxes), max(b[0].stop for b in boxes))
+        cols = slice(min(b[1].start for b in boxes), max(b[1].stop for b in boxes))
+        self.code_box = rows, cols
+        self.code_lower = labels[rows, cols].copy()
+        self.code_transmittance = np.ones(self.code_lower.shape)
+
+    def _attenuate(self, rows, cols, q):
+        box_rows, box_cols = self.code_box
+        r0, r1 = max(rows.start, box_rows.start), min(rows.stop, box_rows.stop)
+        c0, c1 = max(cols.start, box_cols.start), min(cols.stop, box_cols.stop)
+        if r0 >= r1 or c0 >= c1:
+            return
+        layer = q[r0 - rows.start : r1 - rows.start, c0 - cols.start : c1 - cols.start]
+        self.code_transmittance[
+            r0 - box_rows.start : r1 - box_rows.start,
+            c0 - box_cols.start : c1 - box_cols.start,
+        ] *= (
+            1.0 - layer / ALPHA_LEVELS
+        )
+
+
+class RasterDesktop:
+    """
+    Desktop impression rendered without matplotlib.
+
+    ``scene`` is ``DesktopScene`` (the class is enough): its ``build_shapes``
+    and layout constants describe what to draw.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.image_size = (
+            int(round(scene.FIGSIZE[0] * scene.DPI)),
+            int(round(scene.FIGSIZE[1] * scene.DPI)),
+        )
+        boxes = axes_boxes(
+            scene.FIGSIZE, scene.DPI, len(VARIANTS), **scene.SUBPLOTS_ADJUST
+        )
+        self.screens = [
+            RasterScreen(box, (scene.W, scene.H), self.image_size) for box in boxes
+        ]
+        self.shapes, code_lines = scene.build_shapes()
+        self.code_lines = list(code_lines)
+        self._code_layers = OrderedDict()
+
+        # 图像缓冲区常驻：屏幕以外的边框始终是底色，每次只重画两块屏幕
+        self.raw, self.image = png_rows(self.image_size[1], self.image_size[0])
+        self.image[:] = _to_uint8(rgba_from_argb(argb_from_hex(scene.FACECOLOR))[:3])
+
+        # 调色板槽位：0 号是图像底色，其余每个颜色角色 (或字面颜色) 一个
+        self.slots = [scene.FACECOLOR.lower()]
+        for shape in self.shapes:
+            for color in (shape.color, shape.edge_color):
+                key = _color_key(color)
+                if key is not None and key not in self.slots:
+                    self.slots.append(key)
+
+        # matplotlib 按 zorder 稳定排序后绘制
+        order = sorted(range(len(self.shapes)), key=lambda i: self.shapes[i].zorder)
+        self.plans = []
+        for screen in self.screens:
+            layers = []
+            for i in order:
+                if i in self.code_lines:
+                    # 代码行是连续的一组，只在第一行处留一个标记
+                    if i == self.code_lines[0]:
+                        layers.append(None)
+                    continue
+                layers.extend(self._layers(screen, self.shapes[i]))
+            code_shapes = [self.shapes[i] for i in self.code_lines]
+            self.plans.append(ScreenPlan(screen, layers, code_shapes, len(self.slots)))
+
+    def _alpha(self, shape, color):
+        # 与 matplotlib 一样：图元自己的 alpha 覆盖颜色里的 alpha
+        if shape.alpha is not None:
+            return shape.alpha
+        return 1.0 if isinstance(color, str) else color.alpha
+
+    def _layers(self, screen, shape):
+        """Face then edge ``(rows, cols, alpha * coverage, slot)`` of a shape."""
+        face, edge = _color_key(shape.color), _color_key(shape.edge_color)
+        stroke = 0.0
+        if edge is not None and shape.linewidth:
+            # 线宽单位是磅
+            stroke = shape.linewidth * self.scene.DPI / 72.0
+        region = screen.shape_sdf(shape, pad=1.0 + stroke / 2)
+        if region is None:
+            return []
+        rows, cols, d = region
+        layers = []
+        if face is not None:
+            alpha = self._alpha(shape, shape.color) * fill_coverage(d)
+            layers.append((rows, cols, alpha, self.slots.index(face)))
+        if stroke:
+            alpha = self._alpha(shape, shape.edge_color) * stroke_coverage(d, stroke)
+            layers.append((rows, cols, alpha, self.slots.index(edge)))
+        return layers
+
+    def palette(self, table, scheme_name, variant):
+        """float64 [n_slots, 3] RGB of every palette slot."""
+        rgb = table.variant_rgba(scheme_name, variant)[:, :3]
+        return np.array(
+            [
+                (
+                    rgb[TOKEN_INDEX[key]]
+                    if key in TOKEN_INDEX
+                    else rgba_from_argb(argb_from_hex(key))[:3]
+                )
+                for key in self.slots
+            ]
+        )
+
+    def render(self, table, scheme_name, output_path=None):
+        """
+        Render both screens of ``scheme_name`` of a ``SchemeTable``.
+
+        Draws the random terminal line widths from the global NumPy RNG in
+        the same order as ``DesktopScene.apply``.
+
+        Returns:
+            uint8 [height, width, 3] image, also written to ``output_path``
+            as a PNG when given; the buffer is reused by the next render
+        """
+        image = self.image
+        widths = self.scene.draw_code_line_widths()
+        for s, (plan, line_widths, variant) in enumerate(
+            zip(self.plans, widths, VARIANTS)
+        ):
+            palette = self.palette(table, scheme_name, variant)
+            colors = plan.weights @ palette
+            x0, y0, x1, y1 = plan.screen.clip
+            screen = image[y0:y1, x0:x1]
+            # 每个像素当作一个 3 字节的整体取一次，比逐通道 take 快一半
+            colors8 = _to_uint8(colors).view("V3")[:, 0]
+            np.take(colors8, plan.labels, out=screen.view("V3")[..., 0], mode="clip")
+            if plan.code_box is not None:
+                rows, cols = plan.code_box
+                covered, code_colors = self._code_lines(
+                    s, plan, colors, palette, line_widths
+                )
+                screen[rows, cols][covered] = _to_uint8(code_colors)
+        if output_path is not None:
+            write_png(output_path, image)
+        return image
+
+    def _code_line_layers(self, s, plan, i, width):
+        """
+        ``(box slices, quantized alpha, slot)`` of code line ``i`` drawn
+        ``width`` wide on screen ``s``; only the colors differ between
+        schemes, so the coverage is cached per geometry.
+        """
+        key = (s, i, width)
+        layers = self._code_layers.get(key)
+        if layers is not None:
+            self._code_layers.move_to_end(key)
+            return layers
+        rows, cols = plan.code_box
+        x, y, _, h, r = self.shapes[i].geometry
+        shape = self.shapes[i]._replace(geometry=(x, y, width, h, r))
+        layers = []
+        for line_rows, line_cols, alpha, slot in self._layers(plan.screen, shape):
+            sub = (
+                slice(line_rows.start - rows.start, line_rows.stop - rows.start),
+                slice(line_cols.start - cols.start, line_cols.stop - cols.start),
+            )
+            alpha = np.rint(alpha * ALPHA_LEVELS) / ALPHA_LEVELS
+            layers.append((sub, alpha[..., None], slot))
+        self._code_layers[key] = layers
+        if len(self._code_layers) > CODE_LINE_CACHE_SIZE:
+            self._code_layers.popitem(last=False)
+        return layers
+
+    def _code_lines(self, s, plan, colors, palette, line_widths):
+        """
+        ``(sub, colors)``: final float colors of the part ``sub`` of
+        ``plan.code_box`` the code lines cover; the rest of the box already
+        has its colors.
+        """
+        layers = [
+            layer
+            for i, width in zip(self.code_lines, line_widths)
+            for layer in self._code_line_layers(s, plan, i, width)
+        ]
+        if not layers:
+            return (slice(0, 0), slice(0, 0)), np.zeros((0, 0, 3))
+        # 只处理代码行的外接矩形，其余像素与 take 写入的颜色相同
+        r0 = min(sub[0].start for sub, _, _ in layers)
+        r1 = max(sub[0].stop for sub, _, _ in layers)
+        c0 = min(sub[1].start for sub, _, _ in layers)
+        c1 = max(sub[1].stop for sub, _, _ in layers)
+        covered = slice(r0, r1), slice(c0, c1)
+        lower = colors[plan.code_lower[covered]]
+        delta = np.zeros(lower.shape)
+        for (sub_rows, sub_cols), alpha, slot in layers:
+            sub = (
+                slice(sub_rows.start - r0, sub_rows.stop - r0),
+                slice(sub_cols.start - c0, sub_cols.stop - c0),
+            )
+            delta[sub] += (palette[slot] - lower[sub]) * alpha
+        # 上层图元只透过一部分代码行的颜色
+        rows, cols = plan.code_box
+        base = colors[plan.labels[rows, cols][covered]]
+        return covered, base + delta * plan.code_transmittance[covered][..., None]
+
+
+def _to_uint8(rgb):
+    return np.floor(np.asarray(rgb) * 255.0 + 0.5).astype(np.uint8)
+
+
+def compare_backends(table, scheme_name, output_dir, threshold=16):
+    """
+    Render ``scheme_name`` with both backends into ``output_dir``.
+
+    Returns:
+        dict of timings and per-pixel differences between the two images
+    """
+    import generate_visualization as gv
+    from PIL import Image
+
+    output_dir = Path(output_dir)
+    stats = {}
+    for backend in ("matplotlib", "raster"):
+        gv._seed_scheme_rng(0)
+        backend_dir = output_dir / backend
+        backend_dir.mkdir(parents=True, exist_ok=True)
+        # 第一次包含场景构建，第二次才是单张图的开销
+        for run in ("first", "again"):
+            start = time.perf_counter()
+            path = gv.draw_material_you_impression(
+                scheme_name, table, backend_dir, backend=backend
+            )
+            stats[f"{backend}_{run}"] = time.perf_counter() - start
+        stats[f"{backend}_path"] = path
+    reference = np.asarray(Image.open(stats["matplotlib_path"]).convert("RGB"))
+    raster = np.asarray(Image.open(stats["raster_path"]).convert("RGB"))
+    diff = np.abs(reference.astype(np.int16) - raster.astype(np.int16)).max(axis=-1)
+    stats["mean_diff"] = float(diff.mean())
+    stats["max_diff"] = int(diff.max())
+    stats["over_threshold"] = float((diff > threshold).mean())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default=Path(__file__).with_name("example_result.txt"),
+        help="result file with the schemes (default: example_result.txt)",
+    )
+    parser.add_argument(
+        "--scheme", default="TonalSpot", help="scheme to compare (default: TonalSpot)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("/tmp/desktop_raster"),
+        help="where both renderings are written (default: /tmp/desktop_raster)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=16,
+        help="per-channel difference that counts as a differing pixel (default: 16)",
+    )
+    parser.add_argument(
+        "--max-fraction",
+        type=float,
+        default=0.01,
+        help="largest allowed fraction of differing pixels (default: 0.01)",
+    )
+    args = parser.parse_args(argv)
+
+    from generate_visualization import parse_color_table
+
+    table = parse_color_table(args.input)
+    stats = compare_backends(table, args.scheme, args.output_dir, args.threshold)
+    for backend in ("matplotlib", "raster"):
+        print(
+            f"{backend:<11} first {stats[f'{backend}_first'] * 1000:6.0f} ms, "
+            f"then {stats[f'{backend}_again'] * 1000:6.0f} ms  "
+            f"{stats[f'{backend}_path']}"
+        )
+    print(
+        f"speedup {stats['matplotlib_again'] / stats['raster_again']:.1f}x; "
+        f"mean difference {stats['mean_diff']:.2f}, max {stats['max_diff']}, "
+        f"{stats['over_threshold']:.3%} of pixels differ by more than "
+        f"{args.threshold}"
+    )
+    return stats["over_threshold"] <= args.max_fraction
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -4,93 +4,206 @@ Visualization script for Material You color scheme results.
 Parses example_result.txt and generates visualizations of the color schemes.
 """
 
+import argparse
+import glob
+import json
+import os
 import re
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib import gridspec
-import numpy as np
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import chain
 from pathlib import Path
-from matplotlib.path import Path as MplPath
-import os
 
-np.random.seed(42)
+from lazy_import import lazy_import
 
+# parse / html 子命令不画图：NumPy 和用到它的模块在第一次使用时才真正导入，
+# matplotlib 由 _import_matplotlib() 在渲染路径上导入，进程池
+# (concurrent.futures) 在用到它的函数里导入
+np = lazy_import("numpy")
+contrast = lazy_import("contrast")
+desktop_raster = lazy_import("desktop_raster")
+indexed_image = lazy_import("indexed_image")
+profiling = lazy_import("profiling")
+svg_template = lazy_import("svg_template")
 
-def parse_color_file(filepath):
-    """
-    Parse the example_result.txt file.
+from render_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, RenderCache
+from scheme_table import (
+    TOKEN_INDEX,
+    VARIANTS,
+    SchemeTable,
+    argb_from_hex,
+    hex_from_argb,
+    pack_hex,
+    rgb8_view,
+)
 
-    Returns:
-        extracted_colors: list of hex colors extracted from image
-        schemes: dict of scheme_name -> dict with 'light' and 'dark' subdicts
-                each subdict contains token -> hex color mapping
-    """
-    with open(filepath, "r") as f:
-        lines = [line.rstrip("\n") for line in f]
+RANDOM_SEED = 42
+# 每个终端窗口画 5 行随机长度的“代码”，每个方案画 Light/Dark 两屏
+TERMINAL_CODE_LINES = 5
+RANDOM_DRAWS_PER_SCHEME = TERMINAL_CODE_LINES * 2
 
-    # Parse extracted colors (first 5 lines)
-    extracted_colors = []
-    for i in range(2, 6):  # lines 2-5 contain colors
-        if i < len(lines):
-            line = lines[i].strip()
-            if line.startswith("#"):
-                extracted_colors.append(line)
+# 色块上的文字颜色候选：白色与深灰 (比纯黑更柔和)，按对比度择优
+ON_COLOR_CANDIDATES = ("#FFFFFF", "#1C1B1F")
 
-    # Parse schemes
-    schemes = {}
-    current_scheme = None
-    current_variant = None
+plt = patches = Figure = FigureCanvasAgg = None
 
-    for line in lines:
-        line = line.strip()
 
-        # Check for scheme header
-        scheme_match = re.match(r"^Scheme (\w+) (Light|Dark):$", line)
+def _import_matplotlib():
+    """Import matplotlib with the Agg backend, on the first render of a process."""
+    global plt, patches, Figure, FigureCanvasAgg
+    if plt is None:
+        import matplotlib
+
+        # 只写文件，不需要交互式后端
+        matplotlib.use("Agg")
+        import matplotlib.pyplot
+        import matplotlib.patches
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        plt, patches = matplotlib.pyplot, matplotlib.patches
+
+
+_EXTRACTED_HEADER = re.compile(r"^Extracted (\d+) Colors?:$")
+_HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_SCHEME_HEADER = re.compile(r"^Scheme (\w+) (Light|Dark):$")
+_TOKEN_LINE = re.compile(r"^(\S+): Color #([0-9A-Fa-f]+)$")
+
+
+def open_result_source(source):
+    """Open a result file for reading; ``"-"`` means stdin (e.g. a pipe)."""
+    if str(source) == "-":
+        return sys.stdin
+    return open(source, "r")
+
+
+def iter_color_blocks(lines):
+    """
+    Incrementally parse the output of the ``material`` executable.
+
+    ``lines`` can be any iterable of lines, including a file or a pipe that
+    is still being written to: every block is yielded as soon as it is
+    complete, without waiting for the end of the input.
+
+    Yields:
+        (None, "extracted", colors) first, where colors is the list of hex
+        colors extracted from the image (any number of them), then
+        (scheme_name, variant, tokens) for every scheme block, where variant
+        is 'light' or 'dark' and tokens maps token -> hex color
+    """
+    lines = iter(lines)
+
+    # 1. 提取色：由 "Extracted N Colors:" 给出数量，凑够 N 个即完成
+    extracted_colors = []
+    expected = None
+    pending = None  # 调色板之后第一行，留给方案解析
+    for raw in lines:
+        line = raw.strip()
+        header = _EXTRACTED_HEADER.match(line)
+        if header:
+            expected = int(header.group(1))
+        elif _HEX_COLOR.match(line):
+            extracted_colors.append(line)
+        elif extracted_colors or _SCHEME_HEADER.match(line):
+            pending = line
+            break
+        if expected is not None and len(extracted_colors) >= expected:
+            break
+    yield None, "extracted", extracted_colors
+
+    # 2. 方案块：以空行、下一个方案头或输入结束为界
+    if pending is not None:
+        lines = chain([pending], lines)
+    scheme_name = variant = tokens = None
+    for raw in lines:
+        line = raw.strip()
+
+        scheme_match = _SCHEME_HEADER.match(line)
         if scheme_match:
+            if tokens is not None:
+                yield scheme_name, variant, tokens
             scheme_name = scheme_match.group(1)
             variant = scheme_match.group(2).lower()
+            tokens = {}
+            continue
 
-            if scheme_name not in schemes:
-                schemes[scheme_name] = {"light": {}, "dark": {}}
-
-            current_scheme = scheme_name
-            current_variant = variant
+        if tokens is None:
+            continue
+        if not line:
+            yield scheme_name, variant, tokens
+            tokens = None
             continue
 
         # Parse color tokens: "tokenName: Color #rrggbb"
-        if current_scheme and current_variant and ": Color #" in line:
-            # Split on ': Color #'
-            parts = line.split(": Color #")
-            if len(parts) == 2:
-                token = parts[0].strip()
-                hex_color = "#" + parts[1].strip()
-                schemes[current_scheme][current_variant][token] = hex_color
+        token_match = _TOKEN_LINE.match(line)
+        if token_match:
+            tokens[token_match.group(1)] = "#" + token_match.group(2)
+
+    if tokens is not None:
+        yield scheme_name, variant, tokens
+
+
+def parse_color_file(filepath):
+    """
+    Parse the example_result.txt file (or ``"-"`` for stdin).
+
+    Returns:
+        extracted_colors: list of hex colors extracted from image
+        schemes: dict of scheme_name -> dict with 'light' and 'dark' subdicts
+                each subdict contains token -> hex color mapping
+    """
+    f = open_result_source(filepath)
+    try:
+        return collect_blocks(iter_color_blocks(f))
+    finally:
+        if f is not sys.stdin:
+            f.close()
 
+
+def collect_blocks(blocks):
+    """``iter_color_blocks`` blocks -> (extracted_colors, schemes) of ``parse_color_file``."""
+    extracted_colors = []
+    schemes = {}
+    for scheme_name, variant, tokens in blocks:
+        if scheme_name is None:
+            extracted_colors = tokens
+            continue
+        if scheme_name not in schemes:
+            schemes[scheme_name] = {"light": {}, "dark": {}}
+        schemes[scheme_name][variant].update(tokens)
     return extracted_colors, schemes
 
 
-def hex_to_rgb(hex_color):
-    """Convert hex color to RGB tuple (0-1 range)."""
-    hex_color = hex_color.lstrip("#")
-    if len(hex_color) == 6:
-        r = int(hex_color[0:2], 16) / 255.0
-        g = int(hex_color[2:4], 16) / 255.0
-        b = int(hex_color[4:6], 16) / 255.0
-        return (r, g, b)
-    elif len(hex_color) == 3:
-        r = int(hex_color[0] * 2, 16) / 255.0
-        g = int(hex_color[1] * 2, 16) / 255.0
-        b = int(hex_color[2] * 2, 16) / 255.0
-        return (r, g, b)
-    else:
-        return (0, 0, 0)  # default black
+def parse_color_table(filepath):
+    """Parse a result file (or ``"-"``) straight into a ``SchemeTable``."""
+    extracted_colors, schemes = parse_color_file(filepath)
+    return SchemeTable.from_schemes(schemes, extracted_colors)
 
 
-def plot_extracted_colors(extracted_colors, output_dir):
+def iter_generated_blocks(source_color, contrast=0.0):
+    """
+    Same blocks as ``iter_color_blocks``, but with the schemes generated
+    in-process from ``source_color`` ('#RRGGBB') instead of parsed from the
+    output of the ``material`` executable.
+    """
+    # 延迟导入：只有 --source 才需要 HCT / DynamicScheme 的移植
+    from dynamic_scheme import generate_schemes
+
+    table = generate_schemes(argb_from_hex(source_color), contrast=contrast)
+    yield None, "extracted", [hex_from_argb(c) for c in table.extracted]
+    for name, variant_tokens in table.to_schemes().items():
+        for variant, tokens in variant_tokens.items():
+            yield name, variant, tokens
+
+
+def plot_extracted_colors(extracted_colors, output_dir, dpi=200):
     """
     将提取的颜色可视化为极具设计感的“调色板卡片”。
     采用圆角胶囊设计、阴影效果和优雅的字体排版。
     """
+    _import_matplotlib()
     n_colors = len(extracted_colors)
     # 动态调整画布宽度
     fig_w = max(10, n_colors * 1.8)
@@ -115,11 +228,12 @@ def plot_extracted_colors(extracted_colors, output_dir):
     )
     ax.text(-0.3, 1.15, "Source: Input Image Analysis", fontsize=10, color="#5f6368")
 
-    def get_text_color(hex_color):
-        hex_color = hex_color.lstrip("#")
-        r, g, b = tuple(int(hex_color[i : i + 2], 16) / 255 for i in (0, 2, 4))
-        luma = 0.299 * r + 0.587 * g + 0.114 * b
-        return "white" if luma < 0.6 else "#1c1b1f"
+    # 一次性解包所有颜色，并为每个色块选对比度最高的文字颜色
+    argb = pack_hex(extracted_colors)
+    rgb = rgb8_view(argb)
+    text_colors = np.array(ON_COLOR_CANDIDATES)[
+        contrast.pick_on_color(argb, pack_hex(ON_COLOR_CANDIDATES))[0]
+    ]
 
     for i, hex_color in enumerate(extracted_colors):
         # 1. 绘制阴影 (稍微向右下方偏移)
@@ -150,7 +264,7 @@ def plot_extracted_colors(extracted_colors, output_dir):
         ax.add_patch(main_rect)
 
         # 3. 颜色信息标注
-        txt_c = get_text_color(hex_color)
+        txt_c = text_colors[i]
 
         # 色块内的编号
         ax.text(
@@ -180,9 +294,7 @@ def plot_extracted_colors(extracted_colors, output_dir):
 
         # 4. 底部详细信息 (类似潘通色卡)
         # RGB 数值预览
-        r_val = int(hex_color[1:3], 16)
-        g_val = int(hex_color[3:5], 16)
-        b_val = int(hex_color[5:7], 16)
+        r_val, g_val, b_val = rgb[i]
         rgb_text = f"R:{r_val} G:{g_val} B:{b_val}"
         ax.text(
             i,
@@ -195,9 +307,13 @@ def plot_extracted_colors(extracted_colors, output_dir):
         )
 
     plt.tight_layout()
-    output_path = output_dir / "extracted_colors.png"
-    plt.savefig(
-        output_path, dpi=200, bbox_inches="tight", facecolor=fig.get_facecolor()
+    output_path = indexed_image.save_figure(
+        fig,
+        output_dir / "extracted_colors.png",
+        argb,
+        dpi=dpi,
+        bbox_inches="tight",
+        facecolor=fig.get_facecolor(),
     )
     plt.close()
 
@@ -205,10 +321,31 @@ def plot_extracted_colors(extracted_colors, output_dir):
     return output_path
 
 
-def draw_material_you_impression(scheme_name, scheme_data, output_dir):
+ColorRole = namedtuple("ColorRole", ["key", "alpha"])
+
+# 模板里尚未着色的占位颜色，apply() 之后会被真实颜色覆盖
+UNBOUND = "none"
+
+# 桌面印象图的一个图元，数据坐标。geometry 按 kind 区分：
+# "rrect" (x, y, w, h, r)、"circle" (x, y, r)、"rect" (x, y, w, h)、
+# "polygon" 顶点列表。color / edge_color 是 ColorRole 或字面颜色；
+# alpha 为 None 时使用颜色自带的 alpha，否则覆盖它 (与 matplotlib 一致)
+Shape = namedtuple(
+    "Shape",
+    ["kind", "geometry", "color", "edge_color", "linewidth", "alpha", "zorder"],
+)
+
+
+class DesktopScene:
     """
-    绘制 Material You 主题印象图 (Impression Diagram)。
-    特征：悬浮顶栏、下拉式控制中心、多窗口堆叠、现代Dock。
+    Material You 桌面印象图的场景模板。
+
+    The geometry (bubbles, status bar, control center, windows, dock and
+    cursor) is identical for every scheme: ``build_shapes()`` describes it
+    once as a list of ``Shape`` records, which are turned into matplotlib
+    artists here and rasterized directly by ``desktop_raster``. Each artist
+    is recorded with the token index and alpha of the ``ColorRole`` it is
+    painted with, and ``apply()`` only recolors the artists before saving.
     """
 
     # 画布设定 (16:10 比例)
@@ -219,80 +356,183 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
     R_M = 0.4  # 中圆角 (按钮、卡片)
     R_S = 0.2  # 小圆角 (小按钮)
 
-    fig, axes = plt.subplots(1, 2, figsize=(24, 8.5))  # 左右双屏
-
-    # --- 辅助函数 ---
-    def hex_to_rgb(hex_color, alpha=1.0):
-        if not hex_color or hex_color == "None":
-            return (0, 0, 0, 0)
-        hex_color = hex_color.lstrip("#")
-        return tuple(int(hex_color[i : i + 2], 16) / 255 for i in (0, 2, 4)) + (alpha,)
-
-    def get_c(colors, key, alpha=1.0):
-        return hex_to_rgb(colors.get(key, "#000000"), alpha)
-
-    def draw_rrect(ax, x, y, w, h, color, r=0.3, z=1, alpha=1.0, edge_c="none", lw=0):
-        # 限制圆角半径不超过短边一半
-        r = min(r, w / 2, h / 2)
-        rect = patches.FancyBboxPatch(
-            (x + r, y + r),
-            w - 2 * r,
-            h - 2 * r,
-            boxstyle=f"round,pad={r},rounding_size={r}",
-            facecolor=color,
-            edgecolor=edge_c,
-            linewidth=lw,
-            alpha=alpha,
-            zorder=z,
-            mutation_scale=1,
-        )
-        ax.add_patch(rect)
-        return rect
-
-    def draw_shadow(ax, x, y, w, h, color, r=0.3, z=0, offset=0.15, alpha=0.25):
-        """绘制柔和阴影"""
-        draw_rrect(ax, x + offset, y - offset, w, h, color, r=r, z=z, alpha=alpha)
-
-    def draw_circle(ax, x, y, r, color, z=1, alpha=1.0):
-        ax.add_patch(
-            patches.Circle(
-                (x, y), r, facecolor=color, edgecolor="none", zorder=z, alpha=alpha
-            )
-        )
-
-    def draw_text_blob(ax, x, y, w, h, color, z=10):
-        draw_rrect(ax, x, y, w, h, color, r=h / 2, z=z)
+    # 图像尺寸与布局，两个后端共用
+    FIGSIZE = (24, 8.5)
+    DPI = 120
+    FACECOLOR = "#f0f0f0"
+    SUBPLOTS_ADJUST = dict(left=0.02, right=0.98, top=0.95, bottom=0.1, wspace=0.05)
+
+    # 终端代码行：圆角 r = h / 2 = 0.1，宽度在 [1, 4) 内随机
+    CODE_LINE_RADIUS = 0.1
+
+    def __init__(self):
+        _import_matplotlib()
+        # 不交给 pyplot 管理，避免被其它绘图函数的 plt.close() 关掉
+        self.fig = Figure(figsize=self.FIGSIZE)
+        FigureCanvasAgg(self.fig)
+        axes = self.fig.subplots(1, 2)  # 左右双屏
+
+        # 每屏一组 (setter, token 下标, alpha) 绑定，以及终端里随机长度的代码行
+        shapes, code_line_shapes = self.build_shapes()
+        self.bindings = []
+        self.code_lines = []
+        for ax in axes:
+            artists, bindings = self._add_artists(ax, shapes, "")
+            self.bindings.append(bindings)
+            self.code_lines.append([artists[i] for i in code_line_shapes])
+
+        self.fig.subplots_adjust(**self.SUBPLOTS_ADJUST)
+
+    @classmethod
+    def draw_code_line_widths(cls):
+        """Random code line widths of both screens, in ``apply()`` order."""
+        return [
+            [np.random.uniform(1, 4) for _ in range(TERMINAL_CODE_LINES)]
+            for _ in VARIANTS
+        ]
 
-    # --- 渲染逻辑 ---
-    def render_screen(ax, colors, title):
-        ax.set_xlim(0, W)
-        ax.set_ylim(0, H)
+    def apply(self, table, scheme_name):
+        """Recolor both screens for ``scheme_name`` of a ``SchemeTable``."""
+        self._apply_screens(self.bindings, self.code_lines, table, scheme_name)
+
+    def _apply_screens(self, screen_bindings, screen_code_lines, table, scheme_name):
+        """Recolor the light and dark screen given by their bindings and code lines."""
+        widths = self.draw_code_line_widths()
+        for bindings, code_lines, line_widths, variant in zip(
+            screen_bindings, screen_code_lines, widths, VARIANTS
+        ):
+            rgb = table.variant_rgba(scheme_name, variant)[:, :3]
+            for setter, token, alpha in bindings:
+                setter((*rgb[token], alpha))
+            for line, width in zip(code_lines, line_widths):
+                line.set_width(width - 2 * self.CODE_LINE_RADIUS)
+
+    def _add_artists(self, ax, shapes, title):
+        """Add ``shapes`` to ``ax`` as patches; returns (artists, bindings)."""
+        bindings = []
+
+        def bind(setter, color):
+            """颜色角色记录下来延后着色，字面颜色直接使用。"""
+            if isinstance(color, ColorRole):
+                bindings.append((setter, TOKEN_INDEX[color.key], color.alpha))
+
+        def literal(color):
+            return UNBOUND if isinstance(color, ColorRole) else color
+
+        ax.set_xlim(0, self.W)
+        ax.set_ylim(0, self.H)
         ax.axis("off")
 
+        # 壁纸底色 (axis off 时 axes 背景不会画出来，实际露出的是 FACECOLOR)
+        bind(ax.set_facecolor, ColorRole("surface", 1.0))
+
+        artists = []
+        for shape in shapes:
+            if shape.kind == "rrect":
+                x, y, w, h, r = shape.geometry
+                artist = patches.FancyBboxPatch(
+                    (x + r, y + r),
+                    w - 2 * r,
+                    h - 2 * r,
+                    boxstyle=f"round,pad={r},rounding_size={r}",
+                    facecolor=literal(shape.color),
+                    edgecolor=literal(shape.edge_color),
+                    linewidth=shape.linewidth,
+                    alpha=shape.alpha,
+                    zorder=shape.zorder,
+                    mutation_scale=1,
+                )
+            elif shape.kind == "circle":
+                x, y, r = shape.geometry
+                artist = patches.Circle(
+                    (x, y),
+                    r,
+                    facecolor=literal(shape.color),
+                    edgecolor="none",
+                    zorder=shape.zorder,
+                    alpha=shape.alpha,
+                )
+            elif shape.kind == "rect":
+                x, y, w, h = shape.geometry
+                artist = patches.Rectangle(
+                    (x, y),
+                    w,
+                    h,
+                    facecolor=literal(shape.color),
+                    alpha=shape.alpha,
+                    zorder=shape.zorder,
+                )
+            else:
+                artist = patches.Polygon(
+                    shape.geometry,
+                    closed=True,
+                    facecolor=literal(shape.color),
+                    edgecolor=literal(shape.edge_color),
+                    linewidth=shape.linewidth,
+                    zorder=shape.zorder,
+                )
+            ax.add_patch(artist)
+            bind(artist.set_facecolor, shape.color)
+            bind(artist.set_edgecolor, shape.edge_color)
+            artists.append(artist)
+
+        # Title Label
+        label = ax.text(
+            self.W / 2,
+            -0.8,
+            title,
+            ha="center",
+            va="top",
+            fontsize=14,
+            fontweight="bold",
+        )
+        bind(label.set_color, ColorRole("onSurface", 1.0))
+        return artists, bindings
+
+    @classmethod
+    def build_shapes(cls):
+        """
+        The shapes of one screen in drawing order, and the indices of the
+        terminal code lines among them (drawn at their maximum width).
+        """
+        W, H = cls.W, cls.H
+        R_L, R_M, R_S = cls.R_L, cls.R_M, cls.R_S
+        shapes = []
+        code_lines = []
+
+        # --- 辅助函数 ---
+        def get_c(key, alpha=1.0):
+            return ColorRole(key, alpha)
+
+        def draw_rrect(x, y, w, h, color, r=0.3, z=1, alpha=1.0, edge_c="none", lw=0):
+            # 限制圆角半径不超过短边一半
+            r = min(r, w / 2, h / 2)
+            shapes.append(Shape("rrect", (x, y, w, h, r), color, edge_c, lw, alpha, z))
+            return len(shapes) - 1
+
+        def draw_shadow(x, y, w, h, color, r=0.3, z=0, offset=0.15, alpha=0.25):
+            """绘制柔和阴影"""
+            draw_rrect(x + offset, y - offset, w, h, color, r=r, z=z, alpha=alpha)
+
+        def draw_circle(x, y, r, color, z=1, alpha=1.0):
+            shapes.append(Shape("circle", (x, y, r), color, "none", None, alpha, z))
+
+        def draw_text_blob(x, y, w, h, color, z=10):
+            return draw_rrect(x, y, w, h, color, r=h / 2, z=z)
+
+        # --- 渲染逻辑 ---
         # 1. 壁纸 (Abstract Wallpaper)
         # 使用 Surface 色调作为底色，叠加 Fixed/Container 气泡
-        ax.set_facecolor(get_c(colors, "surface"))
 
         # 抽象气泡布局
-        draw_circle(ax, 0, 0, 8, get_c(colors, "primaryContainer"), z=0, alpha=0.5)
-        draw_circle(ax, W, H, 7, get_c(colors, "tertiaryContainer"), z=0, alpha=0.5)
-        draw_circle(
-            ax, W * 0.3, H * 0.7, 5, get_c(colors, "secondaryFixedDim"), z=0, alpha=0.3
-        )
-        draw_circle(
-            ax, W * 0.7, H * 0.3, 4, get_c(colors, "primaryFixed"), z=0, alpha=0.4
-        )
+        draw_circle(0, 0, 8, get_c("primaryContainer"), z=0, alpha=0.5)
+        draw_circle(W, H, 7, get_c("tertiaryContainer"), z=0, alpha=0.5)
+        draw_circle(W * 0.3, H * 0.7, 5, get_c("secondaryFixedDim"), z=0, alpha=0.3)
+        draw_circle(W * 0.7, H * 0.3, 4, get_c("primaryFixed"), z=0, alpha=0.4)
 
         # 统一色调遮罩
-        ax.add_patch(
-            patches.Rectangle(
-                (0, 0),
-                W,
-                H,
-                facecolor=get_c(colors, "surfaceTint"),
-                alpha=0.08,
-                zorder=0.1,
-            )
+        shapes.append(
+            Shape("rect", (0, 0, W, H), get_c("surfaceTint"), "none", None, 0.08, 0.1)
         )
 
         # 2. 悬浮顶栏 (Floating Status Bar)
@@ -302,36 +542,29 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         bar_x = (W - bar_w) / 2
         bar_y = H - bar_h - 0.2  # 距离顶部有间隙
 
-        shadow_c = get_c(colors, "shadow")
+        shadow_c = get_c("shadow")
 
         # 顶栏阴影
-        draw_shadow(ax, bar_x, bar_y, bar_w, bar_h, shadow_c, r=bar_h / 2, z=4)
+        draw_shadow(bar_x, bar_y, bar_w, bar_h, shadow_c, r=bar_h / 2, z=4)
         # 顶栏主体 (surfaceContainer)
         draw_rrect(
-            ax,
             bar_x,
             bar_y,
             bar_w,
             bar_h,
-            get_c(colors, "surfaceContainer"),
+            get_c("surfaceContainer"),
             r=bar_h / 2,
             z=5,
         )
 
         # 顶栏左侧内容 (Date/Time)
-        draw_text_blob(
-            ax, bar_x + 0.5, bar_y + 0.2, 1.5, 0.3, get_c(colors, "onSurface"), z=6
-        )
+        draw_text_blob(bar_x + 0.5, bar_y + 0.2, 1.5, 0.3, get_c("onSurface"), z=6)
 
         # 顶栏右侧内容 (Status Icons)
         # 模拟 Wifi, Battery, Control Center Trigger
         bx_end = bar_x + bar_w
-        draw_circle(
-            ax, bx_end - 0.5, bar_y + 0.35, 0.15, get_c(colors, "primary"), z=6
-        )  # Battery
-        draw_circle(
-            ax, bx_end - 1.0, bar_y + 0.35, 0.12, get_c(colors, "onSurface"), z=6
-        )  # Wifi
+        draw_circle(bx_end - 0.5, bar_y + 0.35, 0.15, get_c("primary"), z=6)  # Battery
+        draw_circle(bx_end - 1.0, bar_y + 0.35, 0.12, get_c("onSurface"), z=6)  # Wifi
 
         # 3. 控制中心 (Popup Control Center) - 重点修改部分
         # 位于顶栏右侧下方，呈现展开状态
@@ -340,15 +573,14 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         cc_y = bar_y - cc_h - 0.2  # 位于顶栏下方，留一点空隙
 
         # 面板阴影
-        draw_shadow(ax, cc_x, cc_y, cc_w, cc_h, shadow_c, r=R_L, z=50)
+        draw_shadow(cc_x, cc_y, cc_w, cc_h, shadow_c, r=R_L, z=50)
         # 面板背景 (surfaceContainerHigh - 略高于背景)
         draw_rrect(
-            ax,
             cc_x,
             cc_y,
             cc_w,
             cc_h,
-            get_c(colors, "surfaceContainerHigh"),
+            get_c("surfaceContainerHigh"),
             r=R_L,
             z=51,
         )
@@ -363,55 +595,45 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         btn_h = 1.0
         btn_w_half = (cw - 0.2) / 2
         draw_rrect(
-            ax,
             cx_start,
             cy_top - btn_h,
             btn_w_half,
             btn_h,
-            get_c(colors, "primary"),
+            get_c("primary"),
             r=R_M,
             z=52,
         )
-        draw_circle(
-            ax, cx_start + 0.5, cy_top - 0.5, 0.2, get_c(colors, "onPrimary"), z=53
-        )  # Icon
+        draw_circle(cx_start + 0.5, cy_top - 0.5, 0.2, get_c("onPrimary"), z=53)  # Icon
         draw_text_blob(
-            ax,
             cx_start + 0.9,
             cy_top - 0.4,
             0.6,
             0.12,
-            get_c(colors, "onPrimary"),
+            get_c("onPrimary"),
             z=53,
         )  # Label
         draw_text_blob(
-            ax,
             cx_start + 0.9,
             cy_top - 0.7,
             0.5,
             0.12,
-            get_c(colors, "onPrimary", 0.7),
+            get_c("onPrimary", 0.7),
             z=53,
         )  # Subtext
 
         # Bluetooth (Inactive - SurfaceContainerHighest)
         bt_x = cx_start + btn_w_half + 0.2
         draw_rrect(
-            ax,
             bt_x,
             cy_top - btn_h,
             btn_w_half,
             btn_h,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=R_M,
             z=52,
         )
-        draw_circle(
-            ax, bt_x + 0.5, cy_top - 0.5, 0.2, get_c(colors, "onSurfaceVariant"), z=53
-        )
-        draw_text_blob(
-            ax, bt_x + 1.0, cy_top - 0.5, 0.6, 0.15, get_c(colors, "onSurface"), z=53
-        )
+        draw_circle(bt_x + 0.5, cy_top - 0.5, 0.2, get_c("onSurfaceVariant"), z=53)
+        draw_text_blob(bt_x + 1.0, cy_top - 0.5, 0.6, 0.15, get_c("onSurface"), z=53)
 
         # Row 2: 小圆形功能键 (4个)
         r2_y = cy_top - btn_h - 0.2 - 0.8
@@ -431,123 +653,110 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         for i, (bg, fg) in enumerate(zip(colors_row, on_colors_row)):
             sx = cx_start + i * (small_size + 0.2)
             draw_rrect(
-                ax,
                 sx,
                 r2_y,
                 small_size,
                 small_size,
-                get_c(colors, bg),
+                get_c(bg),
                 r=small_size / 2,
                 z=52,
             )
             draw_circle(
-                ax,
                 sx + small_size / 2,
                 r2_y + small_size / 2,
                 small_size / 4,
-                get_c(colors, fg),
+                get_c(fg),
                 z=53,
             )
 
         # Row 3: 亮度滑块 (带图标)
         r3_y = r2_y - 0.2 - 0.8
         draw_rrect(
-            ax,
             cx_start,
             r3_y,
             cw,
             0.8,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=0.4,
             z=52,
         )  # Track
         draw_rrect(
-            ax,
             cx_start,
             r3_y,
             cw * 0.7,
             0.8,
-            get_c(colors, "surfaceVariant"),
+            get_c("surfaceVariant"),
             r=0.4,
             z=53,
         )  # Fill (Low emphasis)
         draw_circle(
-            ax,
             cx_start + 0.4,
             r3_y + 0.4,
             0.15,
-            get_c(colors, "onSurfaceVariant"),
+            get_c("onSurfaceVariant"),
             z=54,
         )  # Icon
 
         # Row 4: 音量滑块
         r4_y = r3_y - 0.2 - 0.8
         draw_rrect(
-            ax,
             cx_start,
             r4_y,
             cw,
             0.8,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=0.4,
             z=52,
         )
         draw_rrect(
-            ax, cx_start, r4_y, cw * 0.4, 0.8, get_c(colors, "primary"), r=0.4, z=53
+            cx_start, r4_y, cw * 0.4, 0.8, get_c("primary"), r=0.4, z=53
         )  # Fill (High emphasis)
-        draw_circle(
-            ax, cx_start + 0.4, r4_y + 0.4, 0.15, get_c(colors, "onPrimary"), z=54
-        )  # Icon
+        draw_circle(cx_start + 0.4, r4_y + 0.4, 0.15, get_c("onPrimary"), z=54)  # Icon
 
         # Row 5: 底部媒体播放器 (Tertiary tint)
         r5_y = cc_y + 0.2
         r5_h = r4_y - 0.2 - r5_y
         draw_rrect(
-            ax,
             cx_start,
             r5_y,
             cw,
             r5_h,
-            get_c(colors, "tertiaryContainer"),
+            get_c("tertiaryContainer"),
             r=R_M,
             z=52,
         )
         # Cover Art
         draw_rrect(
-            ax,
             cx_start + 0.2,
             r5_y + 0.2,
             r5_h - 0.4,
             r5_h - 0.4,
-            get_c(colors, "onTertiaryContainer", 0.2),
+            get_c("onTertiaryContainer", 0.2),
             r=0.1,
             z=53,
         )
         draw_circle(
-            ax,
             cx_start + 0.2 + (r5_h - 0.4) / 2,
             r5_y + 0.2 + (r5_h - 0.4) / 2,
             0.15,
-            get_c(colors, "onTertiaryContainer"),
+            get_c("onTertiaryContainer"),
             z=54,
         )  # Note icon
         # Text
         draw_text_blob(
-            ax,
             cx_start + r5_h,
             r5_y + r5_h / 2 + 0.1,
             1.5,
             0.15,
-            get_c(colors, "onTertiaryContainer"),
+            get_c("onTertiaryContainer"),
             z=53,
         )
         draw_text_blob(
-            ax,
             cx_start + r5_h,
             r5_y + r5_h / 2 - 0.2,
             1.0,
             0.15,
-            get_c(colors, "onTertiaryContainer", 0.7),
+            get_c("onTertiaryContainer", 0.7),
             z=53,
         )
 
@@ -556,59 +765,56 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         term_x, term_y = 1.0, 2.5
         term_w, term_h = 7.0, 5.5
 
-        draw_shadow(ax, term_x, term_y, term_w, term_h, shadow_c, r=R_M, z=9)
+        draw_shadow(term_x, term_y, term_w, term_h, shadow_c, r=R_M, z=9)
         draw_rrect(
-            ax,
             term_x,
             term_y,
             term_w,
             term_h,
-            get_c(colors, "inverseSurface"),
+            get_c("inverseSurface"),
             r=R_M,
             z=10,
         )
         # Terminal Header
         draw_rrect(
-            ax,
             term_x,
             term_y + term_h - 0.8,
             term_w,
             0.8,
-            get_c(colors, "inverseSurface"),
+            get_c("inverseSurface"),
             r=R_M,
             z=11,
         )
         draw_rrect(
-            ax,
             term_x,
             term_y + term_h - 0.8,
             term_w,
             0.4,
-            get_c(colors, "inverseSurface"),
+            get_c("inverseSurface"),
             r=0,
             z=11,
         )
         # Buttons
         for i, c_role in enumerate(["error", "tertiary", "secondary"]):
             draw_circle(
-                ax,
                 term_x + 0.4 + i * 0.35,
                 term_y + term_h - 0.4,
                 0.1,
-                get_c(colors, c_role),
+                get_c(c_role),
                 z=12,
             )
         # Code
-        for i in range(5):
-            draw_text_blob(
-                ax,
+        # 行宽是随机的，每次 apply() 时重新抽取；这里先用最大宽度占位
+        for i in range(TERMINAL_CODE_LINES):
+            line = draw_text_blob(
                 term_x + 0.5,
                 term_y + term_h - 1.5 - i * 0.6,
-                np.random.uniform(1, 4),
+                4.0,
                 0.2,
-                get_c(colors, "inverseOnSurface"),
+                get_c("inverseOnSurface"),
                 z=11,
             )
+            code_lines.append(line)
 
         # 5. 主窗口 (Settings/Files)
         # 居中偏左
@@ -617,19 +823,18 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         mw_x, mw_y, mw_w, mw_h = 5.0, 2.0, 9.5, 7.5
 
         # 阴影
-        draw_shadow(ax, mw_x, mw_y, mw_w, mw_h, shadow_c, r=R_L, z=19)
+        draw_shadow(mw_x, mw_y, mw_w, mw_h, shadow_c, r=R_L, z=19)
 
         # 窗口主体 (Surface)
-        draw_rrect(ax, mw_x, mw_y, mw_w, mw_h, get_c(colors, "surface"), r=R_L, z=20)
+        draw_rrect(mw_x, mw_y, mw_w, mw_h, get_c("surface"), r=R_L, z=20)
         # 边框 (Outline Variant) - 模拟细边框
         draw_rrect(
-            ax,
             mw_x,
             mw_y,
             mw_w,
             mw_h,
             "none",
-            edge_c=get_c(colors, "outlineVariant"),
+            edge_c=get_c("outlineVariant"),
             lw=1,
             r=R_L,
             z=21,
@@ -638,23 +843,21 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         # 侧边栏 (Navigation Rail) - SurfaceContainerLow
         sb_w = 2.5
         draw_rrect(
-            ax,
             mw_x,
             mw_y,
             sb_w,
             mw_h,
-            get_c(colors, "surfaceContainerLow"),
+            get_c("surfaceContainerLow"),
             r=R_L,
             z=21,
         )
         # 修正右侧圆角，使其变直，这里直接覆盖一个矩形在中间连接处
         draw_rrect(
-            ax,
             mw_x + sb_w - 0.5,
             mw_y,
             0.5,
             mw_h,
-            get_c(colors, "surfaceContainerLow"),
+            get_c("surfaceContainerLow"),
             r=0,
             z=21,
         )
@@ -663,30 +866,27 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         # 选中的项目 (SecondaryContainer)
         sel_y = mw_y + mw_h - 2.0
         draw_rrect(
-            ax,
             mw_x + 0.2,
             sel_y,
             sb_w - 0.4,
             0.8,
-            get_c(colors, "secondaryContainer"),
+            get_c("secondaryContainer"),
             r=R_S,
             z=22,
         )
         draw_text_blob(
-            ax,
             mw_x + 0.8,
             sel_y + 0.3,
             1.2,
             0.2,
-            get_c(colors, "onSecondaryContainer"),
+            get_c("onSecondaryContainer"),
             z=23,
         )
         draw_circle(
-            ax,
             mw_x + 0.5,
             sel_y + 0.4,
             0.15,
-            get_c(colors, "onSecondaryContainer"),
+            get_c("onSecondaryContainer"),
             z=23,
         )  # Icon
 
@@ -694,20 +894,18 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         for i in range(1, 4):
             item_y = sel_y - (i * 1.0)
             draw_text_blob(
-                ax,
                 mw_x + 0.8,
                 item_y + 0.3,
                 1.0,
                 0.2,
-                get_c(colors, "onSurfaceVariant"),
+                get_c("onSurfaceVariant"),
                 z=22,
             )
             draw_circle(
-                ax,
                 mw_x + 0.5,
                 item_y + 0.4,
                 0.15,
-                get_c(colors, "onSurfaceVariant"),
+                get_c("onSurfaceVariant"),
                 z=22,
             )
 
@@ -717,137 +915,114 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
 
         # Header Title
         draw_text_blob(
-            ax,
             cw_x + 0.5,
             mw_y + mw_h - 1.0,
             2.0,
             0.3,
-            get_c(colors, "onSurface"),
+            get_c("onSurface"),
             z=22,
         )
 
         # UI 元素组 1: 卡片 (Surface Container Highest)
         c1_x, c1_y = cw_x + 0.5, mw_y + mw_h - 3.0
         draw_rrect(
-            ax,
             c1_x,
             c1_y,
             4.0,
             1.5,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=R_M,
             z=22,
         )
         # Icon inside card (Primary)
         draw_rrect(
-            ax,
             c1_x + 0.2,
             c1_y + 0.3,
             0.9,
             0.9,
-            get_c(colors, "primary"),
+            get_c("primary"),
             r=R_S,
             z=23,
         )
+        draw_text_blob(c1_x + 1.3, c1_y + 0.9, 1.5, 0.2, get_c("onSurface"), z=23)
         draw_text_blob(
-            ax, c1_x + 1.3, c1_y + 0.9, 1.5, 0.2, get_c(colors, "onSurface"), z=23
-        )
-        draw_text_blob(
-            ax,
             c1_x + 1.3,
             c1_y + 0.5,
             2.0,
             0.15,
-            get_c(colors, "onSurfaceVariant"),
+            get_c("onSurfaceVariant"),
             z=23,
         )
 
         # UI 元素组 2: 开关和滑块
         # Switch (Active)
         sw_y = mw_y + mw_h - 4.0
-        draw_text_blob(
-            ax, c1_x, sw_y + 0.1, 1.5, 0.2, get_c(colors, "onSurface"), z=22
-        )  # Label
+        draw_text_blob(c1_x, sw_y + 0.1, 1.5, 0.2, get_c("onSurface"), z=22)  # Label
         # Track
-        draw_rrect(
-            ax, c1_x + 4.0, sw_y, 1.0, 0.5, get_c(colors, "primary"), r=0.25, z=22
-        )
+        draw_rrect(c1_x + 4.0, sw_y, 1.0, 0.5, get_c("primary"), r=0.25, z=22)
         # Handle
-        draw_circle(
-            ax, c1_x + 4.0 + 0.75, sw_y + 0.25, 0.18, get_c(colors, "onPrimary"), z=23
-        )
+        draw_circle(c1_x + 4.0 + 0.75, sw_y + 0.25, 0.18, get_c("onPrimary"), z=23)
 
         # Switch (Inactive)
         sw2_y = sw_y - 0.8
-        draw_text_blob(
-            ax, c1_x, sw2_y + 0.1, 1.0, 0.2, get_c(colors, "onSurface"), z=22
-        )
+        draw_text_blob(c1_x, sw2_y + 0.1, 1.0, 0.2, get_c("onSurface"), z=22)
         draw_rrect(
-            ax,
             c1_x + 4.0,
             sw2_y,
             1.0,
             0.5,
-            get_c(colors, "surfaceContainerHighest"),
-            edge_c=get_c(colors, "outline"),
+            get_c("surfaceContainerHighest"),
+            edge_c=get_c("outline"),
             lw=1,
             r=0.25,
             z=22,
         )
-        draw_circle(
-            ax, c1_x + 4.0 + 0.25, sw2_y + 0.25, 0.15, get_c(colors, "outline"), z=23
-        )
+        draw_circle(c1_x + 4.0 + 0.25, sw2_y + 0.25, 0.15, get_c("outline"), z=23)
 
         # Slider
         sl_y = sw2_y - 0.8
         draw_rrect(
-            ax,
             c1_x,
             sl_y + 0.2,
             5.0,
             0.1,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=0.05,
             z=22,
         )  # Track bg
         draw_rrect(
-            ax, c1_x, sl_y + 0.2, 2.5, 0.1, get_c(colors, "primary"), r=0.05, z=23
+            c1_x, sl_y + 0.2, 2.5, 0.1, get_c("primary"), r=0.05, z=23
         )  # Active track
-        draw_circle(
-            ax, c1_x + 2.5, sl_y + 0.25, 0.15, get_c(colors, "primary"), z=24
-        )  # Thumb
+        draw_circle(c1_x + 2.5, sl_y + 0.25, 0.15, get_c("primary"), z=24)  # Thumb
 
         # Floating Action Button (FAB) inside window bottom right
         fab_size = 1.0
         draw_rrect(
-            ax,
             cw_x + cw_w - fab_size - 0.5,
             mw_y + 0.5,
             fab_size,
             fab_size,
-            get_c(colors, "tertiaryContainer"),
+            get_c("tertiaryContainer"),
             r=0.35,
             z=25,
         )
         # Simple Plus Icon
         fcx, fcy = cw_x + cw_w - fab_size - 0.5 + 0.5, mw_y + 0.5 + 0.5
         draw_rrect(
-            ax,
             fcx - 0.2,
             fcy - 0.05,
             0.4,
             0.1,
-            get_c(colors, "onTertiaryContainer"),
+            get_c("onTertiaryContainer"),
             r=0.02,
             z=26,
         )
         draw_rrect(
-            ax,
             fcx - 0.05,
             fcy - 0.2,
             0.1,
             0.4,
-            get_c(colors, "onTertiaryContainer"),
+            get_c("onTertiaryContainer"),
             r=0.02,
             z=26,
         )
@@ -857,14 +1032,13 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         qs_w, qs_h = 3.5, 4.0
         qs_x, qs_y = W - qs_w - 0.5, 1.5
 
-        draw_shadow(ax, qs_x, qs_y, qs_w, qs_h, shadow_c, r=R_L, z=29)
+        draw_shadow(qs_x, qs_y, qs_w, qs_h, shadow_c, r=R_L, z=29)
         draw_rrect(
-            ax,
             qs_x,
             qs_y,
             qs_w,
             qs_h,
-            get_c(colors, "surfaceContainerHigh"),
+            get_c("surfaceContainerHigh"),
             r=R_L,
             z=30,
         )
@@ -879,36 +1053,33 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
             by = qs_y + qs_h - 0.2 - (row + 1) * 0.9
 
             # Button Shape
-            draw_rrect(ax, bx, by, btn_w, 0.7, get_c(colors, role), r=0.35, z=31)
+            draw_rrect(bx, by, btn_w, 0.7, get_c(role), r=0.35, z=31)
             # Icon placeholder
             draw_circle(
-                ax,
                 bx + 0.35,
                 by + 0.35,
                 0.15,
-                get_c(colors, f"on{role.capitalize()}"),
+                get_c(f"on{role.capitalize()}"),
                 z=32,
             )
 
         # Brightness Slider in Panel
         bs_y = qs_y + 0.5
         draw_rrect(
-            ax,
             qs_x + 0.2,
             bs_y,
             qs_w - 0.4,
             0.6,
-            get_c(colors, "surfaceContainerHighest"),
+            get_c("surfaceContainerHighest"),
             r=0.3,
             z=31,
         )
         draw_rrect(
-            ax,
             qs_x + 0.2,
             bs_y,
             (qs_w - 0.4) * 0.7,
             0.6,
-            get_c(colors, "inversePrimary"),
+            get_c("inversePrimary"),
             r=0.3,
             z=32,
         )  # Level
@@ -918,14 +1089,13 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         dock_y = 0.3
 
         # 磨砂玻璃感 Dock (Transparent surfaceContainerHighest)
-        draw_shadow(ax, dock_x, dock_y, dock_w, dock_h, shadow_c, r=0.5, z=40)
+        draw_shadow(dock_x, dock_y, dock_w, dock_h, shadow_c, r=0.5, z=40)
         draw_rrect(
-            ax,
             dock_x,
             dock_y,
             dock_w,
             dock_h,
-            get_c(colors, "surfaceContainerHighest", 0.85),
+            get_c("surfaceContainerHighest", 0.85),
             r=0.55,
             z=41,
         )
@@ -944,14 +1114,13 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
         for i, role in enumerate(icons):
             ix = dock_x + gap + i * (i_size + gap)
             iy = dock_y + (dock_h - i_size) / 2
-            draw_rrect(ax, ix, iy, i_size, i_size, get_c(colors, role), r=0.2, z=42)
+            draw_rrect(ix, iy, i_size, i_size, get_c(role), r=0.2, z=42)
             if i == 0:  # Active indicator
                 draw_circle(
-                    ax,
                     ix + i_size / 2,
                     dock_y - 0.15,
                     0.05,
-                    get_c(colors, "onSurface"),
+                    get_c("onSurface"),
                     z=42,
                 )
 
@@ -967,48 +1136,287 @@ def draw_material_you_impression(scheme_name, scheme_data, output_dir):
             (cur_x + 0.4, cur_y - 0.6),
             (cur_x + 0.7, cur_y - 0.6),
         ]
-
-        poly = patches.Polygon(
-            cursor_poly,
-            closed=True,
-            facecolor=get_c(colors, "primary"),
-            edgecolor=get_c(colors, "onPrimary"),
-            linewidth=1,
-            zorder=100,
+        shapes.append(
+            Shape(
+                "polygon",
+                cursor_poly,
+                get_c("primary"),
+                get_c("onPrimary"),
+                1,
+                None,
+                100,
+            )
         )
-        ax.add_patch(poly)
 
-        # Title Label
-        ax.text(
-            W / 2,
-            -0.8,
-            title,
-            ha="center",
-            va="top",
-            fontsize=14,
-            color=get_c(colors, "onSurface"),
-            fontweight="bold",
-        )
+        return shapes, code_lines
 
-    # 生成 Light/Dark 对比图
-    render_screen(axes[0], scheme_data["light"], "")
-    render_screen(axes[1], scheme_data["dark"], "")
 
-    plt.subplots_adjust(left=0.02, right=0.98, top=0.95, bottom=0.1, wspace=0.05)
+_desktop_scene = None
+_raster_desktop = None
+_desktop_svg = None
+_desktop_atlas = None
 
-    filename = f"desktop_concept_{scheme_name.lower()}.png"
-    output_path = output_dir / filename
-    plt.savefig(output_path, dpi=120, facecolor="#f0f0f0")
-    plt.close()
+# 印象图的画法：matplotlib patch、desktop_raster 直接栅格化，或 svg_template
+# 填色后输出 SVG (对比图也随之输出 SVG)
+IMPRESSION_BACKENDS = ("matplotlib", "raster", "svg")
+
+
+def get_desktop_scene():
+    """The process-wide ``DesktopScene``, built on first use."""
+    global _desktop_scene
+    if _desktop_scene is None:
+        _desktop_scene = DesktopScene()
+    return _desktop_scene
+
+
+def get_desktop_atlas(n_schemes):
+    """The process-wide ``DesktopAtlas`` of the last scheme count asked for."""
+    global _desktop_atlas
+    if _desktop_atlas is None or _desktop_atlas.n_schemes != n_schemes:
+        _desktop_atlas = DesktopAtlas(n_schemes)
+    return _desktop_atlas
+
+
+def get_raster_desktop():
+    """The process-wide ``desktop_raster.RasterDesktop``, built on first use."""
+    global _raster_desktop
+    if _raster_desktop is None:
+        _raster_desktop = desktop_raster.RasterDesktop(DesktopScene)
+    return _raster_desktop
+
+
+# --backend svg 另外输出的页面端模板与其取值 (svg_template.FILL_SCRIPT 填色)
+DESKTOP_TEMPLATE = "desktop_concept.template.svg"
+COMPARISON_TEMPLATE = "scheme_comparison.template.svg"
+SVG_VALUES = "svg_colors.json"
+SVG_TEMPLATES = (DESKTOP_TEMPLATE, COMPARISON_TEMPLATE)
+
+
+def get_desktop_svg():
+    """
+    The process-wide ``svg_template.DesktopSvg``, built on first use.
+
+    A template has fixed terminal line widths: those of the first scheme of
+    a serial run.
+    """
+    global _desktop_svg
+    if _desktop_svg is None:
+        rng = np.random.RandomState(RANDOM_SEED)
+        widths = rng.uniform(1, 4, size=(len(VARIANTS), TERMINAL_CODE_LINES))
+        _desktop_svg = svg_template.DesktopSvg(DesktopScene, widths.tolist())
+    return _desktop_svg
+
+
+def draw_material_you_impression(
+    scheme_name, scheme_data, output_dir, backend="matplotlib"
+):
+    """
+    绘制 Material You 主题印象图 (Impression Diagram)。
+    特征：悬浮顶栏、下拉式控制中心、多窗口堆叠、现代Dock。
+
+    ``scheme_data`` is either a ``SchemeTable`` containing ``scheme_name`` or
+    the {'light': ..., 'dark': ...} dict of ``parse_color_file``.
+    ``backend="raster"`` draws the same scene with ``desktop_raster``, equal
+    to within antialiasing and about 4-5x faster (45-55 ms against 170-260
+    ms per scheme; about 28 ms of it is the zlib pass of the PNG);
+    ``backend="svg"`` writes ``desktop_concept_<name>.svg`` filled in from
+    the ``svg_template`` template.
+    """
+    if backend not in IMPRESSION_BACKENDS:
+        raise ValueError(f"unknown impression backend: {backend!r}")
+    if not isinstance(scheme_data, SchemeTable):
+        scheme_data = SchemeTable.from_schemes({scheme_name: scheme_data})
+
+    suffix = "svg" if backend == "svg" else "png"
+    output_path = output_dir / f"desktop_concept_{scheme_name.lower()}.{suffix}"
+    if backend == "svg":
+        get_desktop_svg().write(scheme_data, scheme_name, output_path)
+        print(f"Generated updated impression diagram: {output_path}")
+        return output_path
+    # 索引色输出时以本方案的全部 token 颜色为调色板种子
+    seeds = scheme_data.argb[scheme_data.scheme_index[scheme_name]]
+    if backend == "raster":
+        if indexed_image.enabled():
+            image = get_raster_desktop().render(scheme_data, scheme_name)
+            output_path = indexed_image.write_image(output_path, image, seeds)
+        else:
+            get_raster_desktop().render(scheme_data, scheme_name, output_path)
+        print(f"Generated updated impression diagram: {output_path}")
+        return output_path
+
+    scene = get_desktop_scene()
+    # 生成 Light/Dark 对比图
+    scene.apply(scheme_data, scheme_name)
+    output_path = indexed_image.save_figure(
+        scene.fig, output_path, seeds, dpi=scene.DPI, facecolor=scene.FACECOLOR
+    )
     print(f"Generated updated impression diagram: {output_path}")
     return output_path
 
 
-def plot_all_schemes_overview(schemes, output_dir):
+ATLAS_STEM = "scheme_atlas"
+
+
+class DesktopAtlas(DesktopScene):
+    """
+    Every screen of every scheme on one canvas (``--atlas``).
+
+    One row per scheme, light screen then dark, each tile the pixel size of
+    a screen of the single-scheme figure, ``GAP`` pixels apart. All tiles
+    are axes of one figure, so the whole atlas is drawn and encoded once;
+    ``sprite_map`` gives the pixel rectangle of every tile. The figure only
+    depends on the number of schemes and is recolored like ``DesktopScene``.
+    """
+
+    # 图块之间及四周的留白 (像素)
+    GAP = 24
+
+    def __init__(self, n_schemes):
+        _import_matplotlib()
+        self.n_schemes = n_schemes
+        layout = self.sprite_map([None] * n_schemes)
+        width, height = layout["width"], layout["height"]
+        self.fig = Figure(figsize=(width / self.DPI, height / self.DPI), dpi=self.DPI)
+        FigureCanvasAgg(self.fig)
+
+        shapes, code_line_shapes = self.build_shapes()
+        self.bindings = []
+        self.code_lines = []
+        for tile in layout["tiles"]:
+            # 图块坐标原点在左上角，axes 的在左下角
+            ax = self.fig.add_axes(
+                (
+                    tile["x"] / width,
+                    1 - (tile["y"] + tile["h"]) / height,
+                    tile["w"] / width,
+                    tile["h"] / height,
+                )
+            )
+            artists, bindings = self._add_artists(ax, shapes, "")
+            self.bindings.append(bindings)
+            self.code_lines.append([artists[i] for i in code_line_shapes])
+
+    @classmethod
+    def tile_size(cls):
+        """Pixel (width, height) of one screen of ``DesktopScene``."""
+        x0, y0, x1, y1 = desktop_raster.axes_boxes(
+            cls.FIGSIZE, cls.DPI, len(VARIANTS), **cls.SUBPLOTS_ADJUST
+        )[0]
+        return int(round(x1 - x0)), int(round(y1 - y0))
+
+    @classmethod
+    def sprite_map(cls, scheme_names, image=None):
+        """
+        Canvas size and the pixel rectangle (top-left origin) of every tile,
+        as written to ``scheme_atlas.json``.
+        """
+        tile_w, tile_h = cls.tile_size()
+        tiles = [
+            {
+                "scheme": scheme_name,
+                "variant": variant,
+                "x": cls.GAP + column * (tile_w + cls.GAP),
+                "y": cls.GAP + row * (tile_h + cls.GAP),
+                "w": tile_w,
+                "h": tile_h,
+            }
+            for row, scheme_name in enumerate(scheme_names)
+            for column, variant in enumerate(VARIANTS)
+        ]
+        return {
+            "image": image,
+            "width": len(VARIANTS) * (tile_w + cls.GAP) + cls.GAP,
+            "height": len(scheme_names) * (tile_h + cls.GAP) + cls.GAP,
+            "tiles": tiles,
+        }
+
+    def apply(self, table):
+        """
+        Recolor one row of tiles per scheme of ``table``. Draws the terminal
+        line widths of all schemes in order, as a serial run of the
+        single-scheme figures does.
+        """
+        for i, scheme_name in enumerate(table.names):
+            screens = slice(i * len(VARIANTS), (i + 1) * len(VARIANTS))
+            self._apply_screens(
+                self.bindings[screens], self.code_lines[screens], table, scheme_name
+            )
+
+
+def write_sprite_map(scheme_names, output_dir):
+    """Write ``scheme_atlas.json`` for the atlas image of the configured format."""
+    # 只取决于方案名和布局常量，不必经过渲染缓存
+    suffix = indexed_image.SUFFIXES[indexed_image.settings()[0]]
+    sprite_map = DesktopAtlas.sprite_map(scheme_names, ATLAS_STEM + suffix)
+    path = Path(output_dir) / f"{ATLAS_STEM}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sprite_map, f, indent=2)
+    return path
+
+
+def plot_scheme_atlas(schemes, output_dir, backend="matplotlib"):
+    """
+    Draw the desktop impressions of all schemes into ``scheme_atlas.png``:
+    one figure and one encode instead of one per scheme. The terminal lines
+    are those of the single-scheme figures.
+
+    ``backend="raster"`` renders the schemes with ``desktop_raster`` and
+    copies their screens into one buffer, encoded once.
+    """
+    if backend not in ("matplotlib", "raster"):
+        raise ValueError(
+            f"the atlas is drawn with matplotlib or raster, not {backend!r}"
+        )
+    table = SchemeTable.coerce(schemes)
+    output_path = output_dir / f"{ATLAS_STEM}.png"
+    seeds = np.unique(table.argb)
+    np.random.seed(RANDOM_SEED)
+    if backend == "matplotlib":
+        atlas = get_desktop_atlas(len(table))
+        atlas.apply(table)
+        output_path = indexed_image.save_figure(
+            atlas.fig, output_path, seeds, dpi=atlas.DPI, facecolor=atlas.FACECOLOR
+        )
+        print(f"Generated scheme atlas: {output_path}")
+        return output_path
+
+    layout = DesktopAtlas.sprite_map(table.names)
+    raster = get_raster_desktop()
+    raw, image = desktop_raster.png_rows(layout["height"], layout["width"])
+    image[:] = rgb8_view(argb_from_hex(DesktopScene.FACECOLOR))
+    tiles = iter(layout["tiles"])
+    for scheme_name in table.names:
+        screens = raster.render(table, scheme_name)
+        for screen in raster.screens:
+            tile = next(tiles)
+            x0, y0 = screen.clip[:2]
+            image[
+                tile["y"] : tile["y"] + tile["h"], tile["x"] : tile["x"] + tile["w"]
+            ] = screens[y0 : y0 + tile["h"], x0 : x0 + tile["w"]]
+    if indexed_image.enabled():
+        output_path = indexed_image.write_image(output_path, image, seeds)
+    else:
+        desktop_raster.write_png(output_path, image)
+    print(f"Generated scheme atlas: {output_path}")
+    return output_path
+
+
+def plot_all_schemes_overview(schemes, output_dir, dpi=300):
     """Create an overview visualization showing primary colors of all schemes."""
-    scheme_names = list(schemes.keys())
+    _import_matplotlib()
+    table = SchemeTable.coerce(schemes)
+    scheme_names = table.names
     n_schemes = len(scheme_names)
 
+    # 所有方案 Light/Dark 的 primary 一次取出: [scheme, variant, 3]
+    primary = table.token_index["primary"]
+    primary_rgb = table.rgba[:, :, primary, :3]
+    text_colors = np.array(["white", "black"])[
+        contrast.pick_on_color(
+            table.argb[:, :, primary], pack_hex(["#FFFFFF", "#000000"])
+        )[0]
+    ]
+
     fig, axes = plt.subplots(2, n_schemes, figsize=(4 * n_schemes, 8))
     fig.suptitle(
         "Material You Color Schemes Overview\nPrimary Colors for Light and Dark Variants",
@@ -1017,17 +1425,15 @@ def plot_all_schemes_overview(schemes, output_dir):
     )
 
     for col, scheme_name in enumerate(scheme_names):
-        scheme_data = schemes[scheme_name]
-
         # Light variant primary color
-        light_primary = scheme_data["light"].get("primary", "#000000")
+        light_primary = hex_from_argb(table.argb[col, 0, primary])
         ax_light = axes[0, col]
         ax_light.add_patch(
             patches.Rectangle(
                 (0, 0),
                 1,
                 1,
-                facecolor=hex_to_rgb(light_primary),
+                facecolor=primary_rgb[col, 0],
                 edgecolor="black",
                 linewidth=2,
             )
@@ -1040,7 +1446,7 @@ def plot_all_schemes_overview(schemes, output_dir):
             va="center",
             fontsize=12,
             fontweight="bold",
-            color="white" if np.mean(hex_to_rgb(light_primary)) < 0.5 else "black",
+            color=text_colors[col, 0],
         )
         ax_light.set_title(f"{scheme_name}\n{light_primary}", fontsize=11)
         ax_light.set_xlim(0, 1)
@@ -1049,14 +1455,13 @@ def plot_all_schemes_overview(schemes, output_dir):
         ax_light.axis("off")
 
         # Dark variant primary color
-        dark_primary = scheme_data["dark"].get("primary", "#000000")
         ax_dark = axes[1, col]
         ax_dark.add_patch(
             patches.Rectangle(
                 (0, 0),
                 1,
                 1,
-                facecolor=hex_to_rgb(dark_primary),
+                facecolor=primary_rgb[col, 1],
                 edgecolor="black",
                 linewidth=2,
             )
@@ -1069,7 +1474,7 @@ def plot_all_schemes_overview(schemes, output_dir):
             va="center",
             fontsize=12,
             fontweight="bold",
-            color="white" if np.mean(hex_to_rgb(dark_primary)) < 0.5 else "black",
+            color=text_colors[col, 1],
         )
         ax_dark.set_xlim(0, 1)
         ax_dark.set_ylim(0, 1)
@@ -1077,8 +1482,13 @@ def plot_all_schemes_overview(schemes, output_dir):
         ax_dark.axis("off")
 
     plt.tight_layout()
-    output_path = output_dir / "all_schemes_overview.png"
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    output_path = indexed_image.save_figure(
+        fig,
+        output_dir / "all_schemes_overview.png",
+        table.argb,
+        dpi=dpi,
+        bbox_inches="tight",
+    )
     plt.close()
     print(f"Saved all schemes overview to {output_path}")
 
@@ -1163,27 +1573,43 @@ def plot_all_schemes_overview(schemes, output_dir):
 #     return output_path
 
 
-def plot_scheme_comparison(schemes, output_dir):
+# 对比图选择更有代表性的颜色角色
+# - Primary: 核心品牌色
+# - Tertiary: 独特的强调色（Material You的灵魂）
+# - Primary Container: 界面中大面积使用的色彩，体现氛围
+# - Secondary Container: 辅助元素的底色
+# - Surface Container Highest: 带有主题色调倾向的中性色（比纯Surface更有味道）
+COMPARISON_TOKENS = (
+    ("primary", 1.5),  # (Role Name, Height Weight) - 主色最高
+    ("tertiary", 1.0),  # 强调色
+    ("primaryContainer", 1.25),  # 容器色次高
+    ("secondaryContainer", 1.0),
+    ("surfaceContainerHighest", 1.125),  # 中性色底座
+)
+
+
+def plot_scheme_comparison(schemes, output_dir, backend="matplotlib", dpi=200):
     """
     创建一个美观的、具有现代设计感的配色方案对比图。
     摒弃了无聊的网格，采用“色卡柱”设计，并选择了更能体现主题倾向的颜色角色。
+
+    ``backend="svg"`` writes the same chart as ``scheme_comparison.svg``
+    from the ``svg_template`` template; other backends draw it with
+    matplotlib.
     """
-    scheme_names = list(schemes.keys())
+    table = SchemeTable.coerce(schemes)
+    if backend == "svg":
+        output_path = output_dir / "scheme_comparison.svg"
+        _comparison_svg(len(table)).write(table, output_path)
+        print(f"Saved aesthetic comparison to {output_path}")
+        return output_path
+
+    _import_matplotlib()
+    scheme_names = table.names
     n_schemes = len(scheme_names)
 
-    # 1. 选择更有代表性的颜色角色
-    # - Primary: 核心品牌色
-    # - Tertiary: 独特的强调色（Material You的灵魂）
-    # - Primary Container: 界面中大面积使用的色彩，体现氛围
-    # - Secondary Container: 辅助元素的底色
-    # - Surface Container Highest: 带有主题色调倾向的中性色（比纯Surface更有味道）
-    display_tokens = [
-        ("primary", 1.5),  # (Role Name, Height Weight) - 主色最高
-        ("tertiary", 1.0),  # 强调色
-        ("primaryContainer", 1.25),  # 容器色次高
-        ("secondaryContainer", 1.0),
-        ("surfaceContainerHighest", 1.125),  # 中性色底座
-    ]
+    # 1. 颜色角色见 COMPARISON_TOKENS
+    display_tokens = COMPARISON_TOKENS
 
     total_weight = sum(w for _, w in display_tokens)
 
@@ -1197,31 +1623,27 @@ def plot_scheme_comparison(schemes, output_dir):
     ax.set_ylim(0, total_weight + 1.5)  # 留出顶部标题空间
     ax.axis("off")
 
-    # 辅助函数：计算亮度以决定文字颜色 (黑/白)
-    def hex_to_rgb(hex_color):
-        hex_color = hex_color.lstrip("#")
-        return tuple(int(hex_color[i : i + 2], 16) / 255 for i in (0, 2, 4))
-
-    def get_text_color(bg_hex):
-        r, g, b = hex_to_rgb(bg_hex)
-        # 计算感知亮度 (Luma)
-        luminance = 0.299 * r + 0.587 * g + 0.114 * b
-        return "white" if luminance < 0.55 else "#1c1b1f"  # 使用深灰而不是纯黑，更柔和
+    # 按 WCAG 对比度选择文字颜色，所有方案一次算完
+    # 默认展示 Light 模式，色彩更明显: [scheme, token]
+    token_ids = [table.token_index[name] for name, _ in display_tokens]
+    light_argb = table.argb[:, 0, token_ids]
+    text_colors = np.array(ON_COLOR_CANDIDATES)[
+        contrast.pick_on_color(light_argb, pack_hex(ON_COLOR_CANDIDATES))[0]
+    ]
 
     # 绘制逻辑
     pad_x = 0.2  # 柱子之间的间隙
     col_width = 1.0 - pad_x * 2
 
     for col_idx, scheme_name in enumerate(scheme_names):
-        scheme_data = schemes[scheme_name]["light"]  # 默认展示 Light 模式，色彩更明显
-
         current_y = 0
         center_x = col_idx + 0.5
 
         # 2. 绘制该方案的色卡柱 (从下往上堆叠)
         # 我们倒序遍历，这样"Surface"在最下面，"Primary"在最上面，符合视觉直觉
-        for token_name, weight in reversed(display_tokens):
-            hex_color = scheme_data.get(token_name, "#000000")
+        for k in reversed(range(len(display_tokens))):
+            token_name, weight = display_tokens[k]
+            hex_color = hex_from_argb(light_argb[col_idx, k])
 
             # 绘制圆角矩形
             # 使用 FancyBboxPatch 实现圆角
@@ -1244,7 +1666,7 @@ def plot_scheme_comparison(schemes, output_dir):
             ax.add_patch(rect)
 
             # 添加文字信息
-            txt_color = get_text_color(hex_color)
+            txt_color = text_colors[col_idx, k]
 
             # Token Name (小字)
             ax.text(
@@ -1307,61 +1729,704 @@ def plot_scheme_comparison(schemes, output_dir):
     )
 
     plt.tight_layout()
-    output_path = output_dir / "scheme_comparison.png"
-    plt.savefig(output_path, dpi=200, bbox_inches="tight")
+    output_path = indexed_image.save_figure(
+        fig,
+        output_dir / "scheme_comparison.png",
+        table.argb,
+        dpi=dpi,
+        bbox_inches="tight",
+    )
     plt.close()
     print(f"Saved aesthetic comparison to {output_path}")
 
     return output_path
 
 
-def main():
+def _seed_scheme_rng(index):
+    """
+    Put the global NumPy RNG where a serial run would have it when drawing
+    the ``index``-th scheme, so every scheme renders identically no matter
+    which process draws it or in what order.
+    """
+    np.random.seed(RANDOM_SEED)
+    if index:
+        np.random.uniform(1, 4, size=index * RANDOM_DRAWS_PER_SCHEME)
+
+
+def _draw_scheme_task(index, scheme_name, scheme_data, backend, output_dir):
+    _seed_scheme_rng(index)
+    return draw_material_you_impression(scheme_name, scheme_data, output_dir, backend)
+
+
+def _comparison_task(table, backend, output_dir):
+    # 任务参数的最后一个必须是输出目录 (RenderCache.wrap)
+    return plot_scheme_comparison(table, output_dir, backend)
+
+
+def _atlas_task(table, backend, output_dir):
+    return plot_scheme_atlas(table, output_dir, backend)
+
+
+def _comparison_svg(n_schemes):
+    return svg_template.ComparisonSvg(n_schemes, COMPARISON_TOKENS, ON_COLOR_CANDIDATES)
+
+
+def _svg_template_task(layout, n_schemes, output_dir):
+    """Write the page template of ``layout`` ("desktop" or "comparison")."""
+    if layout == "desktop":
+        path = get_desktop_svg().write_template(output_dir / DESKTOP_TEMPLATE)
+    else:
+        path = _comparison_svg(n_schemes).write_template(
+            output_dir / COMPARISON_TEMPLATE
+        )
+    print(f"Saved {layout} template to {path}")
+    return path
+
+
+def _svg_values_task(table, output_dir):
+    """Write the values of both page templates for every scheme of ``table``."""
+    values = svg_template.page_values(
+        get_desktop_svg(), _comparison_svg(len(table)), table
+    )
+    path = output_dir / SVG_VALUES
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(values, f, indent=2)
+    return path
+
+
+def iter_render_tasks(blocks, output_dir, backend="matplotlib", atlas=False):
+    """
+    Turn a stream of ``iter_color_blocks`` blocks into render tasks.
+
+    Each task is ``(kind, name, func, args)`` and is yielded as soon as the
+    blocks it needs have arrived: the palette right away, a scheme once both
+    its light and dark blocks are in, and the overview and comparison plots
+    at the end. ``func`` is always a module-level function so the task can
+    be pickled and sent to a worker process.
+
+    With ``atlas`` the schemes are drawn together as one "atlas" task at the
+    end instead, and its sprite map is written when the task is yielded.
+    The svg backend also yields "template" tasks for the page templates of
+    both layouts and their values.
+    """
+    schemes = {}
+    variants_seen = {}
+    n_scheme_tasks = 0
+    for scheme_name, variant, tokens in blocks:
+        if scheme_name is None:
+            yield (
+                "extracted",
+                "extracted",
+                plot_extracted_colors,
+                (tokens, output_dir),
+            )
+            continue
+
+        if scheme_name not in schemes:
+            schemes[scheme_name] = {"light": {}, "dark": {}}
+        schemes[scheme_name][variant].update(tokens)
+        seen = variants_seen.setdefault(scheme_name, set())
+        seen.add(variant)
+        if len(seen) == 2 and not atlas:
+            table = SchemeTable.from_schemes({scheme_name: schemes[scheme_name]})
+            yield (
+                "scheme",
+                scheme_name,
+                _draw_scheme_task,
+                (n_scheme_tasks, scheme_name, table, backend, output_dir),
+            )
+            n_scheme_tasks += 1
+
+    table = SchemeTable.from_schemes(schemes)
+    if atlas:
+        write_sprite_map(table.names, output_dir)
+        yield ("atlas", "atlas", _atlas_task, (table, backend, output_dir))
+    yield ("overview", "overview", plot_all_schemes_overview, (table, output_dir))
+    yield (
+        "comparison",
+        "comparison",
+        _comparison_task,
+        (table, backend, output_dir),
+    )
+    if backend == "svg":
+        for layout in ("desktop", "comparison"):
+            yield (
+                "template",
+                layout,
+                _svg_template_task,
+                (layout, len(table), output_dir),
+            )
+        yield ("template", "values", _svg_values_task, (table, output_dir))
+
+
+def _init_render_worker(profile_dir=None, image_output=None):
+    _import_matplotlib()
+    if image_output is not None:
+        indexed_image.configure(*image_output)
+    if profile_dir is not None:
+        profiling.enable(profile_dir)
+
+
+def _run_render_task(task):
+    kind, name, func, args = task
+    start = time.perf_counter()
+    with profiling.span(f"{kind}:{name}", "figure") as span_args:
+        path = func(*args)
+    elapsed = time.perf_counter() - start
+    # 关闭 --profile 时 span_args 为 None，这里直接返回
+    profiling.figure_done(span_args)
+    return kind, name, path, elapsed
+
+
+def render_tasks(tasks, jobs=1, executor=None, verbose=True, cache=None):
+    """
+    Render all tasks, serially or on a pool of ``jobs`` processes.
+
+    ``tasks`` may be a lazy iterable such as ``iter_render_tasks``; every task
+    is started as soon as it is produced. Output files are identical either
+    way: every task only depends on its own arguments (scheme tasks reseed
+    the RNG themselves). An existing ``executor`` can be passed in so a batch
+    reuses one pool for all inputs. With a ``RenderCache``, figures whose
+    colors were rendered before are linked from the cache instead.
+
+    Returns:
+        list of (kind, name, path, seconds) in task order
+    """
+    if cache is not None:
+        tasks = map(cache.wrap, tasks)
+    if executor is not None:
+        results = list(executor.map(_run_render_task, tasks))
+    elif jobs <= 1:
+        results = [_run_render_task(task) for task in tasks]
+    else:
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_render_worker,
+            initargs=(profiling.spool_dir(), indexed_image.settings()),
+        ) as pool:
+            results = list(pool.map(_run_render_task, tasks))
+
+    if verbose:
+        print("\nRender timing:")
+        for kind, name, _, elapsed in results:
+            print(f"  {kind:<10} {name:<12} {elapsed:7.2f}s")
+    return results
+
+
+BATCH_MANIFEST = "manifest.json"
+
+
+def expand_result_inputs(inputs):
+    """
+    Expand directories (every ``*.txt`` inside) and glob patterns into a
+    sorted, de-duplicated list of result files.
+    """
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.txt")))
+        elif glob.has_magic(item):
+            files.extend(Path(p) for p in sorted(glob.glob(item, recursive=True)))
+        else:
+            files.append(path)
+
+    seen = set()
+    unique = []
+    for path in files:
+        key = path.resolve()
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def _batch_settings(backend, atlas):
+    """Output settings a batch tree was rendered with, kept in its manifest."""
+    return {
+        "image_format": indexed_image.cache_tag() or "png",
+        "backend": backend,
+        "atlas": bool(atlas),
+    }
+
+
+def _batch_is_up_to_date(data_file, output_dir, settings):
+    """
+    An output tree is up to date when its manifest (written last) is newer
+    than the input, was written with the same output ``settings`` and every
+    file it lists still exists.
+    """
+    manifest_path = output_dir / BATCH_MANIFEST
+    try:
+        if manifest_path.stat().st_mtime < data_file.stat().st_mtime:
+            return False
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("settings") != settings:
+        return False
+    return all((output_dir / name).exists() for name in manifest.get("outputs", []))
+
+
+def _write_batch_manifest(data_file, output_dir, results, settings):
+    outputs = [Path(path).name for _, _, path, _ in results]
+    if settings["atlas"] and any(kind == "atlas" for kind, _, _, _ in results):
+        outputs.append(f"{ATLAS_STEM}.json")
+    manifest = {
+        "input": str(data_file),
+        "settings": settings,
+        "outputs": outputs,
+        "seconds": {f"{kind}:{name}": round(t, 4) for kind, name, _, t in results},
+    }
+    tmp_path = output_dir / (BATCH_MANIFEST + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, output_dir / BATCH_MANIFEST)
+
+
+def run_batch(
+    inputs,
+    output_root,
+    jobs=1,
+    force=False,
+    cache=None,
+    backend="matplotlib",
+    atlas=False,
+):
+    """
+    Visualize many result files in one process.
+
+    Every input ``<name>.txt`` gets its own ``output_root/<name>/`` tree with
+    the same images ``main()`` produces (the HTML preview is skipped).
+    Inputs whose tree is already up to date are skipped unless ``force``;
+    figures of the others are shared through ``cache`` when one is given.
+
+    Returns:
+        (rendered, skipped, failed) counts
+    """
+    data_files = expand_result_inputs(inputs)
+    stems = [f.stem for f in data_files]
+    duplicates = sorted({s for s in stems if stems.count(s) > 1})
+    if duplicates:
+        raise SystemExit(f"Duplicate input names in batch: {', '.join(duplicates)}")
+
+    output_root = Path(output_root)
+    output_root.mkdir(parents=True, exist_ok=True)
+    total = len(data_files)
+    print(f"Batch: {total} result files -> {output_root}")
+
+    executor = None
+    if jobs > 1:
+        import concurrent.futures
+
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_render_worker,
+            initargs=(profiling.spool_dir(), indexed_image.settings()),
+        )
+
+    settings = _batch_settings(backend, atlas)
+    rendered = skipped = failed = 0
+    batch_start = time.perf_counter()
+    try:
+        for i, data_file in enumerate(data_files, 1):
+            output_dir = output_root / data_file.stem
+            if not force and _batch_is_up_to_date(data_file, output_dir, settings):
+                skipped += 1
+                print(
+                    f"[{i}/{total}] {data_file.name}: up to date, skipped", flush=True
+                )
+                continue
+
+            start = time.perf_counter()
+            try:
+                output_dir.mkdir(parents=True, exist_ok=True)
+                with open_result_source(data_file) as f, profiling.span(
+                    data_file.name, "input"
+                ):
+                    tasks = iter_render_tasks(
+                        iter_color_blocks(f), output_dir, backend, atlas
+                    )
+                    results = render_tasks(
+                        tasks, jobs, executor=executor, verbose=False, cache=cache
+                    )
+                _write_batch_manifest(data_file, output_dir, results, settings)
+            except Exception as e:
+                failed += 1
+                print(f"[{i}/{total}] {data_file.name}: FAILED ({e})", flush=True)
+                continue
+
+            rendered += 1
+            elapsed = time.perf_counter() - start
+            avg = (time.perf_counter() - batch_start) / i
+            print(
+                f"[{i}/{total}] {data_file.name}: {len(results)} images "
+                f"in {elapsed:.2f}s (eta {avg * (total - i):.0f}s)",
+                flush=True,
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print(
+        f"Batch done in {time.perf_counter() - batch_start:.1f}s: "
+        f"{rendered} rendered, {skipped} skipped, {failed} failed"
+    )
+    return rendered, skipped, failed
+
+
+COMMANDS = ("parse", "render", "html", "all")
+
+
+def parse_args(argv=None):
+    """
+    ``[COMMAND] [INPUT] [options]``. Without a command the script runs
+    ``all``, as it did before it had subcommands.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv.insert(0, "all")
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument(
+        "input",
+        nargs="?",
+        help="output of the material executable, '-' for stdin "
+        "(default: example_result.txt next to this script)",
+    )
+    source.add_argument(
+        "--source",
+        metavar="COLOR",
+        help="generate the schemes of this '#RRGGBB' source color in-process "
+        "instead of reading a result file",
+    )
+    source.add_argument(
+        "--contrast",
+        type=float,
+        default=0.0,
+        help="--source: contrast level from -1 to 1 (default: 0)",
+    )
+
+    render = argparse.ArgumentParser(add_help=False)
+    render.add_argument(
+        "--backend",
+        choices=IMPRESSION_BACKENDS,
+        default="matplotlib",
+        help="how desktop impressions are drawn: matplotlib patches, the 4-5x "
+        "faster NumPy rasterizer of desktop_raster.py, or SVG files filled in "
+        "from the templates of svg_template.py, which also covers the comparison "
+        "chart; the templates themselves and svg_colors.json are written too and "
+        "index.html fills them in (default: matplotlib)",
+    )
+    render.add_argument(
+        "--atlas",
+        action="store_true",
+        help="draw the impressions of all schemes into one scheme_atlas image, "
+        "with the pixel rectangle of every screen in scheme_atlas.json, instead "
+        "of one figure per scheme (matplotlib or raster backend)",
+    )
+    render.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="number of worker processes used for rendering (default: 1, serial)",
+    )
+    render.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="INPUT",
+        help="result files, directories or glob patterns to visualize in one run",
+    )
+    render.add_argument(
+        "--output-root",
+        type=Path,
+        default=Path("visualization"),
+        help="batch mode: one output directory per input is created here",
+    )
+    render.add_argument(
+        "--force",
+        action="store_true",
+        help="batch mode: re-render inputs whose outputs are up to date",
+    )
+    render.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="reuse figures rendered before for the same colors from here "
+        f"(default: {DEFAULT_CACHE_DIR.name} next to this script, "
+        "or $MATERIAL_RENDER_CACHE)",
+    )
+    render.add_argument(
+        "--cache-size",
+        type=float,
+        default=DEFAULT_MAX_BYTES / 2**20,
+        metavar="MIB",
+        help="evict least recently used figures beyond this size "
+        f"(default: {DEFAULT_MAX_BYTES // 2**20})",
+    )
+    render.add_argument(
+        "--no-cache", action="store_true", help="always render every figure"
+    )
+    # 取值同 indexed_image.IMAGE_FORMATS / DEFAULT_COMPRESS_LEVEL：解析参数时
+    # 还不导入它 (parse / html 子命令用不到 NumPy)
+    render.add_argument(
+        "--image-format",
+        choices=("png", "indexed", "webp", "svg"),
+        default="png",
+        help="png: full-color PNGs as matplotlib writes them; indexed / webp: "
+        "quantize every figure to 256 colors seeded with its scheme tokens and "
+        "write an 8-bit indexed PNG / lossless WebP; svg: matplotlib's SVG "
+        "of the figures it draws (default: png)",
+    )
+    render.add_argument(
+        "--compress-level",
+        type=int,
+        choices=range(10),
+        default=6,
+        metavar="0-9",
+        help="indexed / webp: zlib level, or WebP effort (default: 6)",
+    )
+    render.add_argument(
+        "--profile",
+        nargs="?",
+        const=Path("profile_trace.json"),
+        type=Path,
+        metavar="TRACE",
+        help="time every figure and its layout / rasterize / encode phases, print "
+        "a summary and write a Chrome trace (default: profile_trace.json)",
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    parse = commands.add_parser(
+        "parse",
+        parents=[source],
+        help="list the colors and schemes of the input (no matplotlib)",
+    )
+    parse.add_argument(
+        "--json",
+        type=Path,
+        metavar="PATH",
+        help="also write the extracted colors and every token to PATH as JSON",
+    )
+    commands.add_parser(
+        "render",
+        parents=[source, render],
+        help="render the figures into example/visualization",
+    )
+    commands.add_parser(
+        "html",
+        parents=[source],
+        help="rewrite index.html for the figures already rendered (no matplotlib)",
+    )
+    commands.add_parser(
+        "all",
+        parents=[source, render],
+        help="render, then write index.html (the default)",
+    )
+    args = parser.parse_args(argv)
+    if getattr(args, "atlas", False) and args.backend == "svg":
+        parser.error("--atlas is drawn with the matplotlib or raster backend")
+    return args
+
+
+def _report_blocks(blocks):
+    # 边解析边打印，渲染任务随块的到达而启动
+    for block in blocks:
+        scheme_name, variant, tokens = block
+        if scheme_name is None:
+            print(f"Found {len(tokens)} extracted colors:")
+            for color in tokens:
+                print(f"  {color}")
+        else:
+            print(f"  Scheme {scheme_name} {variant}: {len(tokens)} tokens")
+        yield block
+
+
+@contextmanager
+def open_input_blocks(args):
+    """
+    ``iter_color_blocks`` of ``args.input`` (or the generated blocks of
+    ``args.source``); the input is closed on exit.
+    """
+    if args.source:
+        yield iter_generated_blocks(args.source, args.contrast)
+        return
+    f = open_result_source(_data_file(args))
+    try:
+        yield iter_color_blocks(f)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _data_file(args):
+    return args.input if args.input else Path(__file__).parent / "example_result.txt"
+
+
+def main(argv=None):
     """Main function to generate all visualizations."""
+    args = parse_args(argv)
+    if args.command == "parse":
+        return run_parse(args)
+    if args.command == "html":
+        return run_html(args)
+    if not args.profile:
+        return _main(args)
+    profiling.enable()
+    try:
+        with profiling.span("main"):
+            return _main(args)
+    finally:
+        profiling.finish(args.profile)
+
+
+def run_parse(args):
+    """``parse``: print the contents of the input, optionally export them as JSON."""
+    with open_input_blocks(args) as blocks:
+        extracted_colors, schemes = collect_blocks(_report_blocks(blocks))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"extracted": extracted_colors, "schemes": schemes}, f, indent=2)
+        print(f"Wrote {len(schemes)} schemes to {args.json}")
+    return bool(schemes)
+
+
+def _rendered_figure(output_dir, stem):
+    """Newest ``stem.png`` / ``.webp`` / ``.svg`` in ``output_dir``, or None."""
+    paths = [output_dir / f"{stem}.{suffix}" for suffix in ("png", "webp", "svg")]
+    paths = [path for path in paths if path.exists()]
+    return max(paths, key=lambda path: path.stat().st_mtime) if paths else None
+
+
+def run_html(args):
+    """
+    ``html``: write index.html for the figures in example/visualization,
+    or for the atlas when the single-scheme figures are not there.
+    """
+    script_dir = Path(__file__).parent
+    output_dir = script_dir / "visualization"
+    with open_input_blocks(args) as blocks:
+        _, schemes = collect_blocks(blocks)
+
+    stems = {
+        "extracted": "extracted_colors",
+        "overview": "all_schemes_overview",
+        "comparison": "scheme_comparison",
+    }
+    stems.update(
+        (scheme_name, f"desktop_concept_{scheme_name.lower()}")
+        for scheme_name in schemes
+    )
+    paths = {key: _rendered_figure(output_dir, stem) for key, stem in stems.items()}
+    # 没有单独的方案图时退而使用 --atlas 的图集
+    atlas_path = output_dir / f"{ATLAS_STEM}.json"
+    if not atlas_path.exists() or all(paths[name] for name in schemes):
+        atlas_path = None
+    else:
+        for scheme_name in schemes:
+            del paths[scheme_name]
+    missing = [stems[key] for key, path in paths.items() if path is None]
+    if missing:
+        print(f"Not rendered yet in {output_dir}: {', '.join(missing)}")
+        return False
+    # --backend svg 的图：有页面端模板时由浏览器填色
+    svg_values_path = output_dir / SVG_VALUES
+    svg_figures = [paths["comparison"]] + [paths.get(name) for name in schemes]
+    if atlas_path is not None or not all(
+        [path is not None and path.suffix == ".svg" for path in svg_figures]
+        + [(output_dir / name).exists() for name in (SVG_VALUES,) + SVG_TEMPLATES]
+    ):
+        svg_values_path = None
+    generate_html_preview(
+        script_dir.parent,
+        paths.pop("extracted"),
+        paths.pop("overview"),
+        paths.pop("comparison"),
+        paths,
+        atlas_path,
+        svg_values_path,
+    )
+    return True
+
+
+def _main(args):
+    # 编码线程按进程平分 CPU
+    indexed_image.configure(
+        args.image_format,
+        args.compress_level,
+        max(1, (os.cpu_count() or 1) // max(1, args.jobs)),
+    )
+    cache = None
+    if not args.no_cache:
+        cache = RenderCache(
+            args.cache_dir,
+            int(args.cache_size * 2**20),
+            variant=indexed_image.cache_tag(),
+        )
+    if args.batch:
+        try:
+            _, _, failed = run_batch(
+                args.batch,
+                args.output_root,
+                args.jobs,
+                args.force,
+                cache,
+                args.backend,
+                args.atlas,
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+        return failed == 0
+
     # Setup paths
     script_dir = Path(__file__).parent
-    data_file = script_dir / "example_result.txt"
     output_dir = script_dir / "visualization"
     project_root = script_dir.parent
 
     # Create output directory if it doesn't exist
     output_dir.mkdir(exist_ok=True)
 
-    print(f"Parsing color data from {data_file}...")
-    extracted_colors, schemes = parse_color_file(data_file)
-
-    print(f"Found {len(extracted_colors)} extracted colors:")
-    for color in extracted_colors:
-        print(f"  {color}")
-
-    print(f"Found {len(schemes)} color schemes:")
-    for scheme_name in schemes:
-        light_tokens = len(schemes[scheme_name]["light"])
-        dark_tokens = len(schemes[scheme_name]["dark"])
+    start = time.perf_counter()
+    if args.source:
+        print(f"Generating schemes for {args.source} and visualizations...")
+    else:
         print(
-            f"  {scheme_name}: {light_tokens} light tokens, {dark_tokens} dark tokens"
+            f"Parsing color data from {_data_file(args)} and generating visualizations..."
         )
+    try:
+        with open_input_blocks(args) as blocks:
+            tasks = iter_render_tasks(
+                _report_blocks(blocks), output_dir, args.backend, args.atlas
+            )
+            results = render_tasks(tasks, jobs=args.jobs, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(f"  {'total':<23} {time.perf_counter() - start:7.2f}s (jobs={args.jobs})")
 
-    # Generate visualizations
-    print("\nGenerating visualizations...")
-
-    # 1. Extracted colors
-    extracted_path = plot_extracted_colors(extracted_colors, output_dir)
-
-    # 2. Individual scheme palettes
     scheme_paths = {}
-    for scheme_name in schemes:
-        # scheme_path = plot_scheme_palette(scheme_name, schemes[scheme_name], output_dir)
-        # scheme_path = draw_fake_desktop(scheme_name, schemes[scheme_name], output_dir)
-        scheme_path = draw_material_you_impression(
-            scheme_name, schemes[scheme_name], output_dir
-        )
-        scheme_paths[scheme_name] = scheme_path
-
-    # 3. Overview of all schemes
-    overview_path = plot_all_schemes_overview(schemes, output_dir)
-
-    # 4. Scheme comparison
-    comparison_path = plot_scheme_comparison(schemes, output_dir)
+    atlas_path = None
+    svg_values_path = None
+    for kind, name, path, _ in results:
+        if kind == "extracted":
+            extracted_path = path
+        elif kind == "scheme":
+            scheme_paths[name] = path
+        elif kind == "atlas":
+            atlas_image = path
+            atlas_path = output_dir / f"{ATLAS_STEM}.json"
+        elif kind == "overview":
+            overview_path = path
+        elif kind == "comparison":
+            comparison_path = path
+        elif kind == "template" and name == "values":
+            svg_values_path = path
 
     print("\n" + "=" * 60)
     print("VISUALIZATION GENERATION COMPLETE")
@@ -1370,28 +2435,117 @@ def main():
     print(f"1. Extracted colors: {extracted_path}")
     print(f"2. Scheme overview: {overview_path}")
     print(f"3. Scheme comparison: {comparison_path}")
-    print(f"4. Individual scheme palettes:")
+    if atlas_path is not None:
+        print(f"4. Scheme atlas: {atlas_image} (sprite map {atlas_path})")
+    else:
+        print(f"4. Individual scheme palettes:")
     for scheme_name, path in scheme_paths.items():
         print(f"   - {scheme_name}: {path}")
 
+    if args.command == "render":
+        return True
+
     # Generate a simple HTML preview page
-    generate_html_preview(
-        project_root, extracted_path, overview_path, comparison_path, scheme_paths
-    )
+    with profiling.span("html_preview"):
+        generate_html_preview(
+            project_root,
+            extracted_path,
+            overview_path,
+            comparison_path,
+            scheme_paths,
+            atlas_path,
+            svg_values_path,
+        )
 
     return True
 
 
+def _atlas_tile_html(sprite_map, tile, image_url):
+    """A block showing one tile of the atlas image, cropped with CSS."""
+    width, height = sprite_map["width"], sprite_map["height"]
+    # 百分比定位：图块左上角对齐块的左上角，随块宽度缩放
+    size = 100 * width / tile["w"]
+    x = 100 * tile["x"] / (width - tile["w"])
+    y = 100 * tile["y"] / (height - tile["h"])
+    return (
+        f'<div class="atlas-tile" role="img" '
+        f'aria-label="{tile["scheme"]} {tile["variant"]}" '
+        f'style="aspect-ratio: {tile["w"]} / {tile["h"]}; '
+        f"background-image: url('{image_url}'); background-size: {size:.4f}% auto; "
+        f'background-position: {x:.4f}% {y:.4f}%;"></div>'
+    )
+
+
+def _svg_fill_script(values_path):
+    """<script> filling the ``data-svg-template`` images from the templates next to ``values_path``."""
+    templates = {
+        "desktop": (values_path.parent / DESKTOP_TEMPLATE).read_text(encoding="utf-8"),
+        "comparison": (values_path.parent / COMPARISON_TEMPLATE).read_text(
+            encoding="utf-8"
+        ),
+    }
+    with open(values_path, "r", encoding="utf-8") as f:
+        values = json.load(f)
+
+    def inline(data):
+        # 防止内联 JSON 提前结束 <script>
+        return json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+
+    return f"""    <script>
+    {svg_template.FILL_SCRIPT}
+    const SVG_TEMPLATES = {inline(templates)};
+    const SVG_VALUES = {inline(values)};
+    for (const img of document.querySelectorAll("img[data-svg-template]")) {{
+        const layout = img.dataset.svgTemplate;
+        const values = layout === "desktop"
+            ? SVG_VALUES.desktop[img.dataset.scheme] : SVG_VALUES.comparison;
+        const svg = fillTemplate(SVG_TEMPLATES[layout], values);
+        img.src = URL.createObjectURL(new Blob([svg], {{type: "image/svg+xml"}}));
+    }}
+    </script>
+"""
+
+
 def generate_html_preview(
-    output_dir, extracted_path, overview_path, comparison_path, scheme_paths
+    output_dir,
+    extracted_path,
+    overview_path,
+    comparison_path,
+    scheme_paths,
+    atlas_path=None,
+    svg_values_path=None,
 ):
-    """Generate a high-design HTML preview at the project root."""
+    """
+    Generate a high-design HTML preview at the project root.
+
+    With ``atlas_path`` (a ``scheme_atlas.json`` sprite map) the scheme
+    screens are cropped out of the one atlas image with CSS instead. With
+    ``svg_values_path`` (``svg_colors.json`` of the svg backend) the page
+    inlines the two SVG templates and fills in the comparison chart and the
+    scheme impressions itself; the filled files stay as the ``src`` for
+    browsers without JavaScript.
+    """
 
     # 因为 index.html 在根目录，而图片在子目录，我们需要这个前缀
     # 假设 output_dir 的名字就是 "visualization"
     sub_dir = "example/visualization"
 
-    scheme_names = sorted(scheme_paths.keys())
+    scheme_tiles = {}
+    if atlas_path is not None:
+        with open(atlas_path, "r", encoding="utf-8") as f:
+            sprite_map = json.load(f)
+        for tile in sprite_map["tiles"]:
+            scheme_tiles.setdefault(tile["scheme"], []).append(
+                _atlas_tile_html(sprite_map, tile, f"{sub_dir}/{sprite_map['image']}")
+            )
+    scheme_names = sorted(scheme_tiles or scheme_paths)
+    template_attrs = {}
+    if svg_values_path is not None:
+        template_attrs["comparison"] = ' data-svg-template="comparison"'
+        for scheme_name in scheme_names:
+            template_attrs[scheme_name] = (
+                f' data-svg-template="desktop" data-scheme="{scheme_name}"'
+            )
 
     html_content = f"""
 <!DOCTYPE html>
@@ -1521,6 +2675,18 @@ def generate_html_preview(
             transform: scale(1.03);
         }}
 
+        .atlas-pair {{
+            display: grid;
+            grid-template-columns: 1fr 1fr;
+            gap: 1%;
+            padding: 1%;
+            background: #f0f0f0;
+        }}
+
+        .atlas-tile {{
+            background-repeat: no-repeat;
+        }}
+
         footer {{
             padding: 6rem 2rem;
             text-align: center;
@@ -1547,11 +2713,11 @@ def generate_html_preview(
         <div class="overview-grid">
             <div class="glass-card">
                 <p>Extracted from Wallpaper</p>
-                <img src="{sub_dir}/extracted_colors.png" alt="Extracted colors">
+                <img src="{sub_dir}/{Path(extracted_path).name}" alt="Extracted colors">
             </div>
             <div class="glass-card">
                 <p>Cross-Scheme Comparison</p>
-                <img src="{sub_dir}/scheme_comparison.png" alt="Comparison">
+                <img src="{sub_dir}/{Path(comparison_path).name}" alt="Comparison"{template_attrs.get("comparison", "")}>
             </div>
         </div>
 
@@ -1560,7 +2726,15 @@ def generate_html_preview(
 """
 
     for scheme_name in scheme_names:
-        filename = f"desktop_concept_{scheme_name.lower()}.png"
+        if scheme_name in scheme_tiles:
+            preview = f"""<div class="desktop-preview atlas-pair">
+                    {"".join(scheme_tiles[scheme_name])}
+                </div>"""
+        else:
+            filename = Path(scheme_paths[scheme_name]).name
+            preview = f"""<div class="desktop-preview">
+                    <img src="{sub_dir}/{filename}" alt="{scheme_name} concept"{template_attrs.get(scheme_name, "")}>
+                </div>"""
         html_content += f"""
             <div class="scheme-block">
                 <div class="scheme-header">
@@ -1569,9 +2743,7 @@ def generate_html_preview(
                         <p style="color: var(--text-sub); margin-top: 0.5rem;">Adaptive Desktop Palette Simulation (Light vs Dark)</p>
                     </div>
                 </div>
-                <div class="desktop-preview">
-                    <img src="{sub_dir}/{filename}" alt="{scheme_name} concept">
-                </div>
+                {preview}
             </div>
 """
 
@@ -1583,7 +2755,10 @@ def generate_html_preview(
         <p style="font-weight: 700; color: #191b22;">Material You Lean4 Core</p>
         <p style="opacity: 0.5; font-size: 0.8rem;">Algorithms for Dynamic Color Generation</p>
     </footer>
-</body>
+"""
+    if svg_values_path is not None:
+        html_content += _svg_fill_script(Path(svg_values_path))
+    html_content += """</body>
 </html>
 """
 
@@ -1595,4 +2770,4 @@ def generate_html_preview(
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
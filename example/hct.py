@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Vectorized NumPy port of Material/Hct (ViewingConditions, Cam16, HctSolver, Hct).
+
+Every function takes arrays and broadcasts, so millions of colors are
+converted in a handful of array operations instead of one native call per
+color. The code follows the Lean sources step by step (same constants, same
+iteration counts, same tie-breaking), so results match the ``material``
+binary; run this file on a result file to check that.
+"""
+
+import argparse
+
+import numpy as np
+
+from color_utils import (
+    argb_from_linrgb,
+    argb_from_lstar,
+    lstar_from_argb,
+    lstar_from_y,
+    rgb_from_argb,
+    xyz_from_argb,
+    y_from_lstar,
+)
+
+PI = 3.14159265358979323846
+
+# --- ViewingConditions.DEFAULT ---
+VC_N = 0.18418651851244414
+VC_AW = 29.98099719444734
+VC_NBB = 1.0169191804458757
+VC_NCB = 1.0169191804458757
+VC_C = 0.69
+VC_NC = 1.0
+VC_RGB_D = np.array([1.02117770275752, 0.9863077294280124, 0.9339605082802299])
+VC_FL = 0.3884814537800353
+VC_FL_ROOT = 0.7894826179304937
+VC_Z = 1.909169568483652
+
+# --- Cam16 ---
+XYZ_TO_CAM16RGB = np.array(
+    [
+        [0.401288, 0.650173, -0.051461],
+        [-0.250268, 1.204414, 0.045854],
+        [-0.002079, 0.048952, 0.953127],
+    ]
+)
+
+# --- HctSolver ---
+SCALED_DISCOUNT_FROM_LINRGB = np.array(
+    [
+        [0.001200833568784504, 0.002389694492170889, 0.0002795742885861124],
+        [0.0005891086651375999, 0.0029785502573438758, 0.0003270666104008398],
+        [0.00010146692491640572, 0.0005364214359186694, 0.0032979401770712076],
+    ]
+)
+LINRGB_FROM_SCALED_DISCOUNT = np.array(
+    [
+        [1373.2198709594231, -1100.4251190754821, -7.278681089101213],
+        [-271.815969077903, 559.6580465940733, -32.46047482791194],
+        [1.9622899599665666, -57.173814538844006, 308.7233197812385],
+    ]
+)
+TO_RGBA = np.array(
+    [
+        [460.0 / 1403.0, 451.0 / 1403.0, 288.0 / 1403.0],
+        [460.0 / 1403.0, -891.0 / 1403.0, -261.0 / 1403.0],
+        [460.0 / 1403.0, -220.0 / 1403.0, -6300.0 / 1403.0],
+    ]
+)
+Y_FROM_LINRGB = np.array([0.2126, 0.7152, 0.0722])
+
+# 每个亮度区间内色域多边形的顶点编号 (nthVertexList)，不足 5 个用 -1 补齐
+_Y_BANDS = np.array([7.22, 21.26, 28.48, 71.52, 78.74, 92.78])
+_BAND_VERTICES = np.array(
+    [
+        [0, 4, 8, -1, -1],
+        [0, 4, 6, 1, -1],
+        [1, 10, 5, 4, 6],
+        [5, 4, 6, 7, -1],
+        [5, 2, 9, 6, 7],
+        [2, 3, 7, 5, -1],
+        [3, 7, 11, -1, -1],
+    ]
+)
+
+
+def _mod(a, b):
+    """Float modulo as MathUtils defines it: a - b * floor(a / b)."""
+    return a - b * np.floor(a / b)
+
+
+def sanitize_degrees(degrees):
+    return _mod(np.asarray(degrees, dtype=np.float64), 360.0)
+
+
+def sanitize_radians(angle):
+    return _mod(angle, 2 * PI)
+
+
+def to_radians(degrees):
+    return degrees * PI / 180.0
+
+
+def to_degrees(radians):
+    return radians * 180.0 / PI
+
+
+def _matmul(rows, matrix):
+    """``row * matrix`` of MathUtils (each output is a row of ``matrix`` dotted with ``row``)."""
+    return rows @ matrix.T
+
+
+def _rgb_a_to_cam(rgb_a):
+    """Shared tail of Cam16.fromXyz and HctSolver.maxChroma: adapted RGB -> hue, chroma."""
+    r, g, b_ = rgb_a[..., 0], rgb_a[..., 1], rgb_a[..., 2]
+    a = (11.0 * r + -12.0 * g + 1.0 * b_) / 11.0
+    b = (1.0 * r + 1.0 * g + -2.0 * b_) / 9.0
+    u = (20.0 * r + 20.0 * g + 21.0 * b_) / 20.0
+    p2 = (40.0 * r + 20.0 * g + 1.0 * b_) / 20.0
+    hue = sanitize_degrees(to_degrees(np.arctan2(b, a)))
+    ac = p2 * VC_NBB
+    j = 100.0 * np.abs(ac / VC_AW) ** (VC_C * VC_Z)
+    hue_prime = np.where(hue < 20.14, hue + 360.0, hue)
+    e_hue = 0.25 * (np.cos(to_radians(hue_prime) + 2.0) + 3.8)
+    p1 = 50000.0 / 13.0 * e_hue * VC_NC * VC_NCB
+    t = p1 * np.hypot(a, b) / (u + 0.305)
+    alpha = (1.64 - 0.29**VC_N) ** 0.73 * np.abs(t) ** 0.9
+    chroma = alpha * np.sqrt(j / 100.0)
+    return hue, chroma
+
+
+def cam16_from_xyz(xyz):
+    """[..., 3] XYZ -> (hue, chroma) under the default viewing conditions."""
+    rgb_t = _matmul(np.asarray(xyz, dtype=np.float64), XYZ_TO_CAM16RGB)
+    rgb_d = VC_RGB_D * rgb_t
+    rgb_af = (VC_FL * np.abs(rgb_d) / 100.0) ** 0.42
+    rgb_a = np.sign(rgb_d) * 400.0 * rgb_af / (rgb_af + 27.13)
+    return _rgb_a_to_cam(rgb_a)
+
+
+def cam16_from_argb(argb):
+    """ARGB -> (hue, chroma)."""
+    return cam16_from_xyz(xyz_from_argb(argb))
+
+
+def chromatic_adaptation(component):
+    af = np.abs(component) ** 0.42
+    return np.sign(component) * 400.0 * af / (af + 27.13)
+
+
+def inverse_chromatic_adaptation(adapted):
+    adapted_abs = np.abs(adapted)
+    base = np.maximum(0.0, adapted_abs * 27.13 / (400.0 - adapted_abs))
+    return np.sign(adapted) * base ** (1.0 / 0.42)
+
+
+def hue_of(linrgb):
+    """[..., 3] linear RGB -> CAM16 hue in radians (-pi, pi]."""
+    rgb_a = chromatic_adaptation(_matmul(linrgb, SCALED_DISCOUNT_FROM_LINRGB))
+    r, g, b_ = rgb_a[..., 0], rgb_a[..., 1], rgb_a[..., 2]
+    a = (11.0 * r + -12.0 * g + 1.0 * b_) / 11.0
+    b = (1.0 * r + 1.0 * g + -2.0 * b_) / 9.0
+    return np.arctan2(b, a)
+
+
+LSTAR_SINGULAR = float(
+    lstar_from_y(100 * 0.2126 + 96.18310557389496 * 0.7152 + 95.47888926024586 * 0.0722)
+)
+
+
+def are_in_cycle_order(a, b, c):
+    return sanitize_radians(b - a) < sanitize_radians(c - a)
+
+
+def nth_vertex(y, n):
+    """
+    Vertex ``n`` (0-11) of the RGB cube slice at luminance ``y``; ``y`` and
+    ``n`` broadcast. Returns [..., 3] linear RGB.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = np.asarray(n)
+    k_r, k_g, k_b = Y_FROM_LINRGB
+    coord_a = np.where(n % 4 <= 1, 0.0, 100.0)
+    coord_b = np.where(n % 2 == 0, 0.0, 100.0)
+    # n < 4: g = a, b = b；n < 8: b = a, r = b；否则 r = a, g = b
+    r = np.where(
+        n < 4,
+        (y - coord_a * k_g - coord_b * k_b) / k_r,
+        np.where(n < 8, coord_b, coord_a),
+    )
+    g = np.where(
+        n < 4,
+        coord_a,
+        np.where(n < 8, (y - coord_b * k_r - coord_a * k_b) / k_g, coord_b),
+    )
+    b = np.where(
+        n < 4,
+        coord_b,
+        np.where(n < 8, coord_a, (y - coord_a * k_r - coord_b * k_g) / k_b),
+    )
+    return np.stack(np.broadcast_arrays(r, g, b), axis=-1)
+
+
+def ccw_dist(a, b):
+    return _mod(b - a + 2 * PI, 2 * PI)
+
+
+def bisect_to_segment(y, target_hue):
+    """Endpoints (left, right) of the gamut-boundary edge that ``target_hue`` crosses."""
+    target_hue = np.where(target_hue > PI, target_hue - 2 * PI, target_hue)
+    vertex_ids = _BAND_VERTICES[np.searchsorted(_Y_BANDS, y, side="right")]
+    valid = vertex_ids >= 0
+    vertices = nth_vertex(y[..., None], np.where(valid, vertex_ids, 0))
+    distances = ccw_dist(target_hue[..., None], hue_of(vertices))
+    # argMax / argMin 在相等时取第一个，与 np.argmax / np.argmin 一致
+    left = np.argmax(np.where(valid, distances, -np.inf), axis=-1)
+    right = np.argmin(np.where(valid, distances, np.inf), axis=-1)
+    left = np.take_along_axis(vertices, left[..., None, None], axis=-2)[..., 0, :]
+    right = np.take_along_axis(vertices, right[..., None, None], axis=-2)[..., 0, :]
+    return left, right
+
+
+def bisect_to_limit(y, target_hue):
+    """Linear RGB on the gamut boundary at luminance ``y`` closest to ``target_hue``."""
+    y = np.asarray(y, dtype=np.float64)
+    target_hue = np.asarray(target_hue, dtype=np.float64)
+    y, target_hue = np.broadcast_arrays(y, target_hue)
+    left, right = bisect_to_segment(y, target_hue)
+    hue_left = hue_of(left)
+    delta = right - left
+    lo = np.zeros(y.shape)
+    hi = np.ones(y.shape)
+    for _ in range(8):
+        mid = (lo + hi) / 2
+        mid_hue = hue_of(left + mid[..., None] * delta)
+        go_left = are_in_cycle_order(hue_left, target_hue, mid_hue)
+        hi = np.where(go_left, mid, hi)
+        lo = np.where(go_left, lo, mid)
+    t = (lo + hi) / 2
+    return left + t[..., None] * delta
+
+
+def linrgb_of_j(hue_radians, chroma, j):
+    """Linear RGB of the color with CAM16 ``hue_radians``, ``chroma`` and J."""
+    t_inner_coeff = 1 / (1.64 - 0.29**VC_N) ** 0.73
+    e_hue = 0.25 * (np.cos(hue_radians + 2.0) + 3.8)
+    p1 = e_hue * (50000.0 / 13.0) * VC_NC * VC_NCB
+    h_sin = np.sin(hue_radians)
+    h_cos = np.cos(hue_radians)
+
+    j_normalized = j / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = np.where(j == 0.0, 0.0, chroma / np.sqrt(j_normalized))
+    t = (alpha * t_inner_coeff) ** (1.0 / 0.9)
+    ac = VC_AW * np.abs(j_normalized) ** (1.0 / VC_C / VC_Z)
+    p2 = ac / VC_NBB
+    with np.errstate(invalid="ignore"):
+        gamma = (
+            23.0 * (p2 + 0.305) * t / (23.0 * p1 + 11.0 * t * h_cos + 108.0 * t * h_sin)
+        )
+    a = gamma * h_cos
+    b = gamma * h_sin
+    rgb_a = _matmul(np.stack(np.broadcast_arrays(p2, a, b), axis=-1), TO_RGBA)
+    rgb_c_scaled = inverse_chromatic_adaptation(rgb_a)
+    return _matmul(rgb_c_scaled, LINRGB_FROM_SCALED_DISCOUNT)
+
+
+def find_linrgb_by_j(hue_radians, chroma, y):
+    """
+    Newton iteration on J (findResultByJ). Returns [..., 3] linear RGB, NaN
+    where no in-gamut solution was found.
+    """
+    max_iter = 5
+    tol = 0.002
+    hue_radians, chroma, y = np.broadcast_arrays(
+        np.asarray(hue_radians, dtype=np.float64),
+        np.asarray(chroma, dtype=np.float64),
+        np.asarray(y, dtype=np.float64),
+    )
+    j = np.sqrt(y) * 11.0
+    result = np.full(y.shape + (3,), np.nan)
+    active = np.ones(y.shape, dtype=bool)
+    for i in range(max_iter):
+        if not active.any():
+            break
+        idx = np.nonzero(active)
+        linrgb = linrgb_of_j(hue_radians[idx], chroma[idx], j[idx])
+
+        negative = (linrgb < 0).any(axis=-1)
+        yj = linrgb @ Y_FROM_LINRGB
+        err = yj - y[idx]
+        done = ~negative & ((i == max_iter - 1) | (np.abs(err) < tol))
+        in_gamut = ~(linrgb > 100.01).any(axis=-1)
+        ok = done & in_gamut
+        if ok.any():
+            # NaN 分量在 Lean 中经 Float.toUInt32 变为 0
+            result[tuple(k[ok] for k in idx)] = np.nan_to_num(linrgb[ok], nan=0.0)
+
+        # 负分量或已收敛的元素不再迭代 (结果为 NaN 或已写入)
+        finished = negative | done
+        step = ~finished
+        j_idx = tuple(k[step] for k in idx)
+        # yj == 0 时与 Lean 一样得到 inf/NaN，最后一轮按黑色输出
+        with np.errstate(divide="ignore", invalid="ignore"):
+            j[j_idx] = j[j_idx] - (err[step] * j[j_idx] / (2.0 * yj[step]))
+        active[tuple(k[finished] for k in idx)] = False
+    return result
+
+
+def find_result_by_j(hue_radians, chroma, y):
+    """findResultByJ: ARGB, with 0 where no in-gamut solution was found."""
+    linrgb = find_linrgb_by_j(hue_radians, chroma, y)
+    found = ~np.isnan(linrgb[..., 0])
+    result = np.zeros(found.shape, dtype=np.uint32)
+    result[found] = argb_from_linrgb(linrgb[found])
+    return result
+
+
+def solve_to_int(hue_degrees, chroma, lstar):
+    """HctSolver.solveToInt: (hue, chroma, tone) arrays -> ARGB ``uint32`` array."""
+    hue_degrees, chroma, lstar = np.broadcast_arrays(
+        np.asarray(hue_degrees, dtype=np.float64),
+        np.asarray(chroma, dtype=np.float64),
+        np.asarray(lstar, dtype=np.float64),
+    )
+    result = np.asarray(argb_from_lstar(lstar), dtype=np.uint32).copy()
+    solve = ~((chroma < 0.0001) | (lstar < 0.0001) | (lstar >= LSTAR_SINGULAR))
+    if not solve.any():
+        return result
+
+    hue_radians = to_radians(sanitize_degrees(hue_degrees[solve]))
+    y = y_from_lstar(lstar[solve])
+    exact = find_result_by_j(hue_radians, chroma[solve], y)
+    missing = exact == 0
+    if missing.any():
+        exact[missing] = argb_from_linrgb(
+            bisect_to_limit(y[missing], hue_radians[missing])
+        )
+    result[solve] = exact
+    return result
+
+
+def max_chroma(hue, tone):
+    """HctSolver.maxChroma: highest in-gamut chroma for each (hue, tone)."""
+    y = y_from_lstar(tone)
+    hue_radians = to_radians(sanitize_degrees(hue))
+    linrgb = bisect_to_limit(y, hue_radians)
+    rgb_a = chromatic_adaptation(_matmul(linrgb, SCALED_DISCOUNT_FROM_LINRGB))
+    return _rgb_a_to_cam(rgb_a)[1]
+
+
+def hct_from_argb(argb):
+    """Hct.fromInt: ARGB array -> (hue, chroma, tone) arrays."""
+    argb = np.asarray(argb, dtype=np.uint32)
+    hue, chroma = cam16_from_argb(argb)
+    return hue, chroma, lstar_from_argb(argb)
+
+
+def argb_from_hct(hue, chroma, tone):
+    """Hct.fromHct(...).toInt: (hue, chroma, tone) arrays -> ARGB array."""
+    return solve_to_int(hue, chroma, tone)
+
+
+def check_result_file(path):
+    """
+    Compare this port with a ``material`` result file.
+
+    Every color in the file must survive ARGB -> HCT -> ARGB unchanged, and
+    the TonalSpot tokens must sit at their MaterialDynamicColor tones.
+    Colors at tone >= ``LSTAR_SINGULAR`` go through argbFromLstar, whose
+    truncating ``delinearized`` maps tone 100 to #FEFEFE in the Lean code as
+    well, so those may differ by one per channel.
+
+    Returns:
+        (n_colors, n_roundtrip_mismatches, tonal_spot_mismatches)
+    """
+    from generate_visualization import parse_color_table
+
+    table = parse_color_table(path)
+    colors = np.unique(np.concatenate([table.argb.reshape(-1), table.extracted]))
+    hue, chroma, tone = hct_from_argb(colors)
+    roundtrip = argb_from_hct(hue, chroma, tone)
+    diff = np.abs(
+        rgb_from_argb(roundtrip).astype(np.int64) - rgb_from_argb(colors)
+    ).max(axis=-1)
+    n_bad = int(((diff > 1) | ((diff == 1) & (tone < LSTAR_SINGULAR))).sum())
+
+    mismatches = []
+    if "TonalSpot" in table:
+        # MaterialDynamicColor 中 TonalSpot 的标准色调
+        expected = {
+            ("light", "primary"): 40.0,
+            ("dark", "primary"): 80.0,
+            ("light", "surface"): 98.0,
+            ("dark", "surface"): 6.0,
+            ("light", "surfaceContainerLowest"): 100.0,
+            ("dark", "onSurface"): 90.0,
+        }
+        for (variant, token), want in expected.items():
+            got = float(
+                lstar_from_argb(table.argb[table.locate("TonalSpot", variant, token)])
+            )
+            if abs(got - want) > 0.5:
+                mismatches.append((variant, token, got))
+    return len(colors), n_bad, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "input", help="output of the material executable to check against"
+    )
+    args = parser.parse_args(argv)
+
+    n_colors, n_bad, mismatches = check_result_file(args.input)
+    print(f"HCT round trip: {n_colors - n_bad}/{n_colors} colors unchanged")
+    for variant, token, got in mismatches:
+        print(f"  TonalSpot {variant} {token}: tone {got:.2f}")
+    print(f"TonalSpot tones: {'OK' if not mismatches else 'MISMATCH'}")
+    return n_bad == 0 and not mismatches
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,888 @@
+#!/usr/bin/env python3
+"""
+float32 port of the zig build's color math: zig/src/Utils/ColorUtils.zig
+and zig/src/Hct (ViewingConditions, Cam16, HctSolver, Hct, MaxChroma).
+
+The zig code is not the Lean code in f32. ``delinearized`` rounds through
+a 2414-entry table where Lean truncates, the bisection of the solver uses a
+1024-entry chromatic adaptation table and stops once the segment is
+shorter than 0.1, and Y is weighted 0.212656/0.715158/0.072186. The
+functions here follow it operation by operation in float32, in the
+evaluation order of the zig expressions, so ``dynamic_scheme`` reproduces
+the ``material`` binary's output bit for bit. Where the zig standard
+library is not plain IEEE arithmetic it is ported as well:
+
+* ``std.math.pow`` is exp(yf * log(x)) times x to the integer part of y by
+  repeated squaring, not ``powf`` (``pow32``);
+* ``std.math.atan2`` is musl's ``atan2f`` (``atan2_32``);
+* ``@mod`` on floats is fmod, and fmod(fmod(a, b) + b, b) for a negative
+  dividend, which is 0 where ``np.mod`` returns b (``_mod``);
+* ``@round`` rounds half away from zero and ``@reduce(.Add)`` sums left
+  to right.
+
+``@exp`` is glibc's table-driven expf, which is what ``material`` (linked
+against glibc) calls and what the compiler evaluated the comptime tables
+with; it is not always correctly rounded. log, sin, cos and cbrt are
+evaluated in float64 and rounded once. Every function takes arrays and
+broadcasts. ``python hct_f32.py`` regenerates the maxChroma peak table the
+way gen-maxchroma does (without libc, so with the float32 expf/logf of
+compiler_rt) and compares it with zig/src/Hct/MaxChroma.zig.
+"""
+
+import argparse
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+_F32 = np.float32
+
+PI = _F32(np.pi)
+_TWO_PI = _F32(2 * np.pi)
+_RAD_PER_DEG = _F32(np.pi / 180)
+_DEG_PER_RAD = _F32(180 / np.pi)
+
+
+def _f32(x):
+    return np.asarray(x, dtype=np.float32)
+
+
+# --- zig 的 @round / @mod 与 libm ---
+
+
+def _round(x):
+    """@round: half away from zero (x - trunc(x) is exact in float32)."""
+    whole = np.trunc(x)
+    return whole + np.where(np.abs(x - whole) >= _F32(0.5), np.sign(x), _F32(0))
+
+
+def _mod(a, b):
+    """@mod on floats: fmod, then fmod(fmod(a, b) + b, b) for a < 0."""
+    r = np.fmod(a, b)
+    negative = a < 0
+    if not negative.any():
+        return r
+    return np.where(negative, np.fmod(r + b, b), r)
+
+
+def _libm(func):
+    def f32_func(x):
+        return func(np.asarray(x, dtype=np.float64)).astype(np.float32)
+
+    f32_func.__doc__ = f"{func.__name__} rounded once to float32."
+    return f32_func
+
+
+# glibc 的 expf (ARM optimized-routines): 2^(k/32) 查表乘三次多项式，在 float64
+# 里求值
+_EXP2F_N = 32
+_EXP2F_TABLE = np.array(
+    [
+        np.float64(2.0 ** (i / _EXP2F_N)).view(np.uint64) - np.uint64(i << 47)
+        for i in range(_EXP2F_N)
+    ],
+    dtype=np.uint64,
+)
+_EXPF_POLY = (
+    float.fromhex("0x1.c6af84b912394p-5") / _EXP2F_N**3,
+    float.fromhex("0x1.ebfce50fac4f3p-3") / _EXP2F_N**2,
+    float.fromhex("0x1.62e42ff0c52d6p-1") / _EXP2F_N,
+)
+_EXPF_INVLN2_N = float.fromhex("0x1.71547652b82fep+0") * _EXP2F_N
+_EXPF_SHIFT = float.fromhex("0x1.8p+52")
+
+
+def _exp(x):
+    """glibc expf for |x| < 88."""
+    z = _EXPF_INVLN2_N * np.asarray(x, dtype=np.float32).astype(np.float64)
+    kd = z + _EXPF_SHIFT
+    ki = kd.view(np.uint64)
+    r = z - (kd - _EXPF_SHIFT)
+    # 指数加进位模式，负 k 时按 2^64 回绕
+    with np.errstate(over="ignore"):
+        bits = _EXP2F_TABLE[ki & np.uint64(_EXP2F_N - 1)] + (ki << np.uint64(47))
+    scale = bits.view(np.float64)
+    c0, c1, c2 = _EXPF_POLY
+    y = (c0 * r + c1) * (r * r) + (c2 * r + 1)
+    return (y * scale).astype(np.float32)
+
+
+_log = _libm(np.log)
+_sin = _libm(np.sin)
+_cos = _libm(np.cos)
+_cbrt = _libm(np.cbrt)
+
+
+# gen-maxchroma 不链接 libc，运行时的 @exp/@log 是 compiler_rt 的 expf/logf
+# (旧 musl 实现，全程 f32)
+def _expf_compiler_rt(x):
+    x = _f32(x)
+    hx = x.view(np.uint32) & np.uint32(0x7FFFFFFF)
+    negative = np.signbit(x)
+    # |x| > 1.5 ln2: k = trunc(x / ln2 +- 0.5)；0.5 ln2 < |x| <= 1.5 ln2: k = +-1
+    k = np.trunc(
+        _F32(1.4426950216) * x + np.where(negative, _F32(-0.5), _F32(0.5))
+    ).astype(np.int32)
+    k = np.where(hx > 0x3F851592, k, np.where(negative, -1, 1))
+    k = np.where(hx > 0x3EB17218, k, 0)
+    fk = k.astype(np.float32)
+    hi = x - fk * _F32(6.9314575195e-1)
+    lo = fk * _F32(1.4286067653e-6)
+    r = hi - lo
+    rr = r * r
+    c = r - rr * (_F32(1.6666625440e-1) + rr * _F32(-2.7667332906e-3))
+    y = _F32(1) + (r * c / (_F32(2) - c) - lo + hi)
+    y = np.ldexp(y, k).astype(np.float32)
+    return np.where(hx > 0x39000000, y, _F32(1) + x)
+
+
+def _logf_compiler_rt(x):
+    """For positive normal x; 0 and negative x as @log."""
+    x = _f32(x)
+    ix = x.view(np.uint32).astype(np.int64) + (0x3F800000 - 0x3F3504F3)
+    k = (ix >> 23) - 0x7F
+    # 约化到 [sqrt(2)/2, sqrt(2)]
+    f = ((ix & 0x007FFFFF) + 0x3F3504F3).astype(np.uint32).view(np.float32) - _F32(1)
+    s = f / (_F32(2) + f)
+    z = s * s
+    w = z * z
+    t1 = w * (_F32(0xCCCE13 * 2.0**-25) + w * _F32(0xF89E26 * 2.0**-26))
+    t2 = z * (_F32(0xAAAAAA * 2.0**-24) + w * _F32(0x91E9EE * 2.0**-25))
+    hfsq = _F32(0.5) * f * f
+    dk = k.astype(np.float32)
+    result = (
+        s * (hfsq + (t2 + t1))
+        + dk * _F32(9.0580006145e-06)
+        - hfsq
+        + f
+        + dk * _F32(6.9313812256e-01)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, np.where(x == 1, _F32(0), result), np.log(x))
+
+
+@contextmanager
+def _compiler_rt_libm():
+    """Evaluate pow32 with the expf/logf of the MaxChromaGen binary."""
+    global _exp, _log
+    saved = _exp, _log
+    _exp, _log = _expf_compiler_rt, _logf_compiler_rt
+    try:
+        yield
+    finally:
+        _exp, _log = saved
+
+
+def _hypot(x, y):
+    """std.math.hypot for f32: the square root is taken in float64."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return np.sqrt(x * x + y * y).astype(np.float32)
+
+
+def pow32(x, y):
+    """
+    std.math.pow(f32, x, y) for a constant ``y``: x^yf as exp(yf * log(x))
+    with yf in (-0.5, 0.5], times x^yi by squaring the frexp significand.
+    """
+    x = _f32(x)
+    y = _F32(y)
+    if y == 1:
+        return x
+    if y == 0.5:
+        return np.sqrt(x)
+    yi = np.floor(np.abs(y))
+    yf = np.abs(y) - yi
+    if yf > 0.5:
+        yf -= _F32(1)
+        yi += 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a1 = _exp(yf * _log(x)) if yf != 0 else np.ones_like(x)
+    x1, xe = np.frexp(x)
+    ae = np.zeros(x.shape, dtype=np.int32)
+    i = int(yi)
+    while i:
+        if i & 1:
+            a1 = a1 * x1
+            ae = ae + xe
+        x1 = x1 * x1
+        xe = xe << 1
+        small = x1 < _F32(0.5)
+        x1 = np.where(small, x1 + x1, x1)
+        xe = np.where(small, xe - 1, xe)
+        i >>= 1
+    if y < 0:
+        a1 = _F32(1) / a1
+        ae = -ae
+    result = np.ldexp(a1, ae).astype(np.float32)
+    # pow(0, y) = 0 (y > 0); 负数的非整数次幂是 NaN
+    result = np.where(x == 0, _F32(0), result)
+    return np.where(x == 1, _F32(1), result)
+
+
+_ATAN_HI = np.array(
+    [4.6364760399e-01, 7.8539812565e-01, 9.8279368877e-01, 1.5707962513e00],
+    dtype=np.float32,
+)
+_ATAN_LO = np.array(
+    [5.0121582440e-09, 3.7748947079e-08, 3.4473217170e-08, 7.5497894159e-08],
+    dtype=np.float32,
+)
+_AT = [
+    _F32(v)
+    for v in (
+        3.3333328366e-01,
+        -1.9999158382e-01,
+        1.4253635705e-01,
+        -1.0648017377e-01,
+        6.1687607318e-02,
+    )
+]
+_PI_LO = _F32(-8.7422776573e-08)
+
+
+def _atan_abs(x):
+    """musl atanf of a non-negative finite float32 array."""
+    ix = x.view(np.uint32)
+    small = ix < 0x3EE00000
+    band = np.select([ix < 0x3F300000, ix < 0x3F980000, ix < 0x401C0000], [0, 1, 2], 3)
+    one, two, half3 = _F32(1), _F32(2), _F32(1.5)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.select(
+            [small, band == 0, band == 1, band == 2],
+            [
+                x,
+                (two * x - one) / (two + x),
+                (x - one) / (x + one),
+                (x - half3) / (one + half3 * x),
+            ],
+            -one / x,
+        )
+    z = t * t
+    w = z * z
+    s1 = z * (_AT[0] + w * (_AT[2] + w * _AT[4]))
+    s2 = w * (_AT[1] + w * _AT[3])
+    poly = t * (s1 + s2)
+    result = np.where(small, t - poly, _ATAN_HI[band] - ((poly - _ATAN_LO[band]) - t))
+    result = np.where(ix < 0x39800000, x, result)
+    return np.where(ix >= 0x4C800000, _ATAN_HI[3], result)
+
+
+def atan2_32(y, x):
+    """std.math.atan2(f32): musl atan2f, for finite float32 arrays."""
+    y, x = np.broadcast_arrays(_f32(y), _f32(x))
+    iy = y.view(np.uint32) & np.uint32(0x7FFFFFFF)
+    ix = x.view(np.uint32) & np.uint32(0x7FFFFFFF)
+    y_neg = np.signbit(y)
+    x_neg = np.signbit(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = _atan_abs(np.abs(y / x).astype(np.float32))
+    # |y/x| < 2^-26 且 x < 0 时 z 取 0
+    z = np.where(x_neg & (iy.astype(np.int64) + (26 << 23) < ix), _F32(0), z)
+    result = np.where(
+        x_neg,
+        np.where(y_neg, (z - _PI_LO) - PI, PI - (z - _PI_LO)),
+        np.where(y_neg, -z, z),
+    )
+    half_pi = np.where(y_neg, -PI / _F32(2), PI / _F32(2))
+    # |y/x| > 2^26 或 x == 0
+    result = np.where(
+        (ix.astype(np.int64) + (26 << 23) < iy) | (ix == 0), half_pi, result
+    )
+    at_zero = np.where(x_neg, np.where(y_neg, -PI, PI), y)
+    return np.where(iy == 0, at_zero, result)
+
+
+def _dot(a, b):
+    """MathUtils.dot: @reduce(.Add, a * b), summed left to right."""
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _mul(vec, mat):
+    """MathUtils.mul: ``vec`` dotted with every row of ``mat``."""
+    return [_dot(vec, row) for row in mat]
+
+
+# --- ColorUtils.zig ---
+
+SRGB_TO_XYZ = np.array(
+    [
+        [0.41233895, 0.35762064, 0.18051042],
+        [0.2126, 0.7152, 0.0722],
+        [0.01932141, 0.11916382, 0.95034478],
+    ],
+    dtype=np.float32,
+)
+WHITE_POINT_D65 = [_F32(100) * (row[0] + row[1] + row[2]) for row in SRGB_TO_XYZ]
+
+_LAB_E = _F32(216.0 / 24389.0)
+_LAB_KAPPA = _F32(24389.0 / 27.0)
+
+# linearizedLUT: 0-255 通道 -> 0-100 线性值
+_channel = np.arange(256, dtype=np.float32) / _F32(255)
+LINEARIZED = np.where(
+    _channel <= _F32(0.040449936),
+    _channel / _F32(12.92) * _F32(100),
+    pow32((_channel + _F32(0.055)) / _F32(1.055), 2.4) * _F32(100),
+).astype(np.float32)
+
+# SRGB_LUT: 线性值 * SCALE_FACTOR 四舍五入后查表得 8 位通道
+_LUT_SIZE = 2414
+_SCALE_FACTOR = (_F32(_LUT_SIZE) - _F32(1)) / _F32(100)
+_normalized = np.arange(_LUT_SIZE, dtype=np.float32) / _SCALE_FACTOR / _F32(100)
+_SRGB_LUT = _round(
+    np.where(
+        _normalized <= _F32(0.0031308),
+        _normalized * _F32(12.92),
+        _F32(1.055) * pow32(_normalized, 1.0 / 2.4) - _F32(0.055),
+    )
+    * _F32(255)
+).astype(np.uint32)
+_DELINEARIZE_SLOPE = _F32(0.1292 * 255.0)
+del _channel, _normalized
+
+
+def delinearized(linear):
+    """0-100 linear component -> 0-255 sRGB channel (uint32)."""
+    linear = _f32(linear)
+    with np.errstate(invalid="ignore"):
+        index = np.clip(_round(linear * _SCALE_FACTOR), 0, _LUT_SIZE - 1)
+        low = np.clip(_round(linear * _DELINEARIZE_SLOPE), 0, 255)
+        index = np.nan_to_num(index).astype(np.intp)
+        low = np.nan_to_num(low).astype(np.uint32)
+    return np.where(linear <= _F32(0.31308), low, _SRGB_LUT[index])
+
+
+def argb_from_linrgb(linrgb):
+    """ARGB of a [r, g, b] list of 0-100 linear component arrays."""
+    r, g, b = (delinearized(c) for c in linrgb)
+    return np.uint32(0xFF000000) | r << np.uint32(16) | g << np.uint32(8) | b
+
+
+def linrgb_from_argb(argb):
+    argb = np.asarray(argb, dtype=np.uint32)
+    return [LINEARIZED[(argb >> np.uint32(shift)) & 0xFF] for shift in (16, 8, 0)]
+
+
+def _lab_f(t):
+    with np.errstate(invalid="ignore"):
+        return np.where(
+            t > _LAB_E,
+            pow32(t, 1.0 / 3.0),
+            (_LAB_KAPPA * t + _F32(16)) / _F32(116),
+        )
+
+
+def _lab_invf(t):
+    t3 = t * t * t
+    return np.where(t3 > _LAB_E, t3, (_F32(116) * t - _F32(16)) / _LAB_KAPPA)
+
+
+def y_from_lstar(lstar):
+    return _F32(100) * _lab_invf((_f32(lstar) + _F32(16)) / _F32(116))
+
+
+def lstar_from_y(y):
+    return _F32(116) * _lab_f(_f32(y) / _F32(100)) - _F32(16)
+
+
+def lab_from_argb(argb):
+    """[L*, a*, b*] float32 arrays."""
+    xyz = _mul(linrgb_from_argb(argb), SRGB_TO_XYZ)
+    fx, fy, fz = (_lab_f(c / w) for c, w in zip(xyz, WHITE_POINT_D65))
+    return [
+        _F32(116) * fy - _F32(16),
+        _F32(500) * (fx - fy),
+        _F32(200) * (fy - fz),
+    ]
+
+
+def lstar_from_argb(argb):
+    return lstar_from_y(_mul(linrgb_from_argb(argb), SRGB_TO_XYZ)[1])
+
+
+def argb_from_lstar(lstar):
+    component = delinearized(y_from_lstar(lstar))
+    return np.uint32(0xFF000000) | component * np.uint32(0x010101)
+
+
+# --- ViewingConditions.zig: DEFAULT 在编译期以 f32 求值 ---
+
+_XYZ_TO_CAM16RGB = np.array(
+    [
+        [0.401288, 0.650173, -0.051461],
+        [-0.250268, 1.204414, 0.045854],
+        [-0.002079, 0.048952, 0.953127],
+    ],
+    dtype=np.float32,
+)
+
+
+def _viewing_conditions():
+    xyz = WHITE_POINT_D65
+    adapted_luminance = _F32(200.0 / np.pi) * _F32(y_from_lstar(50.0)) / _F32(100)
+    rgb_w = _mul(xyz, _XYZ_TO_CAM16RGB)
+    # surround 2.0: f = 1.0，c = lerp(0.59, 0.69, 1.0)
+    c = _F32(0.69)
+    d = _F32(1) - _F32(1.0 / 3.6) * _F32(
+        _exp((-adapted_luminance - _F32(42)) / _F32(92))
+    )
+    rgb_d = [d * _F32(100) / w + _F32(1) - d for w in rgb_w]
+    k = _F32(1) / (_F32(5) * adapted_luminance + _F32(1))
+    k4 = k * k * k * k
+    k4f = _F32(1) - k4
+    fl = k4 * adapted_luminance + _F32(0.1) * k4f * k4f * _F32(
+        _cbrt(_F32(5) * adapted_luminance)
+    )
+    n = _F32(y_from_lstar(50.0)) / xyz[1]
+    nbb = _F32(0.725) / _F32(pow32(n, 0.2))
+    factors = [
+        _F32(pow32(fl * d_i * w / _F32(100), 0.42)) for d_i, w in zip(rgb_d, rgb_w)
+    ]
+    rgb_a = [_F32(400) * f / (f + _F32(27.13)) for f in factors]
+    aw = (_F32(2) * rgb_a[0] + rgb_a[1] + _F32(0.05) * rgb_a[2]) * nbb
+    return dict(
+        n=n,
+        aw=aw,
+        nbb=nbb,
+        ncb=nbb,
+        c=c,
+        nc=_F32(1),
+        rgb_d=rgb_d,
+        fl=fl,
+        z=_F32(1.48) + np.sqrt(n),
+    )
+
+
+_VC = _viewing_conditions()
+
+# --- Cam16.zig ---
+
+_CZ = _VC["c"] * _VC["z"]
+_P1K = _F32(50000.0 / 13.0 * 0.25) * _VC["nc"] * _VC["ncb"]
+_ALPHAK = _F32(pow32(_F32(1.64) - _F32(pow32(_F32(0.29), _VC["n"])), 0.73))
+_A_VEC = (_F32(1), _F32(-12.0 / 11.0), _F32(1.0 / 11.0))
+_B_VEC = (_F32(1.0 / 9.0), _F32(1.0 / 9.0), _F32(-2.0 / 9.0))
+_U_VEC = (_F32(1), _F32(1), _F32(21.0 / 20.0))
+_AC_VEC = tuple(_F32(k) * _VC["nbb"] / _F32(20) / _VC["aw"] for k in (40, 20, 1))
+_SRGB_TO_CAM16RGB = [
+    [
+        _VC["fl"]
+        * _VC["rgb_d"][i]
+        * _dot(_XYZ_TO_CAM16RGB[i], SRGB_TO_XYZ[:, j])
+        / _F32(100)
+        for j in range(3)
+    ]
+    for i in range(3)
+]
+
+
+def _cam16_chroma(a, b, u, ac, hue_radians, hue_degrees):
+    """Chroma from the opponent components, shared by fromInt and maxChroma."""
+    hue_prime = np.where(
+        hue_degrees < _F32(20.14),
+        hue_radians + _TWO_PI + _F32(2),
+        hue_radians + _F32(2),
+    )
+    p1 = (_cos(hue_prime) + _F32(3.8)) * _P1K
+    t = p1 * _hypot(a, b) / (u + _F32(0.305))
+    return _ALPHAK * pow32(t, 0.9) * np.sqrt(pow32(ac, _CZ))
+
+
+def cam16_from_argb(argb):
+    """Cam16.fromInt: (hue, chroma) float32 arrays."""
+    pre = _mul(linrgb_from_argb(argb), _SRGB_TO_CAM16RGB)
+    rgb_a = []
+    for component in pre:
+        af = pow32(component, 0.42)
+        rgb_a.append(_F32(400) * af / (af + _F32(27.13)))
+    a = _dot(_A_VEC, rgb_a)
+    b = _dot(_B_VEC, rgb_a)
+    hue_radians = _mod(atan2_32(b, a), _TWO_PI)
+    hue = hue_radians * _DEG_PER_RAD
+    chroma = _cam16_chroma(
+        a, b, _dot(_U_VEC, rgb_a), _dot(_AC_VEC, rgb_a), hue_radians, hue
+    )
+    return hue, chroma
+
+
+def hct_from_argb(argb):
+    """Hct.fromInt: (hue, chroma, tone) float32 arrays."""
+    hue, chroma = cam16_from_argb(argb)
+    return hue, chroma, lstar_from_argb(argb)
+
+
+# --- HctSolver.zig ---
+
+_SCALED_DISCOUNT_FROM_LINRGB = np.array(
+    [
+        [0.001200833568784504, 0.002389694492170889, 0.0002795742885861124],
+        [0.0005891086651375999, 0.0029785502573438758, 0.0003270666104008398],
+        [0.00010146692491640572, 0.0005364214359186694, 0.0032979401770712076],
+    ],
+    dtype=np.float32,
+)
+_LINRGB_FROM_SCALED_DISCOUNT = np.array(
+    [
+        [1373.2198709594231, -1100.4251190754821, -7.278681089101213],
+        [-271.815969077903, 559.6580465940733, -32.46047482791194],
+        [1.9622899599665666, -57.173814538844006, 308.7233197812385],
+    ],
+    dtype=np.float32,
+)
+_TO_RGBA = np.array(
+    [
+        [460.0 / 1403.0, 451.0 / 1403.0, 288.0 / 1403.0],
+        [460.0 / 1403.0, -891.0 / 1403.0, -261.0 / 1403.0],
+        [460.0 / 1403.0, -220.0 / 1403.0, -6300.0 / 1403.0],
+    ],
+    dtype=np.float32,
+)
+_Y_FROM_LINRGB = np.array([0.212656, 0.715158, 0.072186], dtype=np.float32)
+_T_INNER_COEFF = _F32(1) / _ALPHAK
+
+_KR, _KG, _KB = _Y_FROM_LINRGB
+# 各亮度区间上界 (y0..y5) 与区间内色域多边形的顶点编号，不足 5 个用 -1 补齐
+_Y_BOUNDS = np.array(
+    [
+        _F32(100) * _KB,
+        _F32(100) * _KR,
+        _F32(100) * _KB + _F32(100) * _KR,
+        _F32(100) * _KG,
+        _F32(100) * _KB + _F32(100) * _KG,
+        _F32(100) * _KR + _F32(100) * _KG,
+    ],
+    dtype=np.float32,
+)
+_SEGMENT_VERTICES = np.array(
+    [
+        [0, 4, 8, -1, -1],
+        [0, 4, 6, 1, -1],
+        [1, 10, 5, 4, 6],
+        [5, 4, 6, 7, -1],
+        [5, 2, 9, 6, 7],
+        [2, 3, 7, 5, -1],
+        [3, 7, 11, -1, -1],
+    ]
+)
+
+_Y_SINGULAR = _dot(
+    (_F32(100), _F32(96.18310557389496), _F32(95.47888926024586)), _Y_FROM_LINRGB
+)
+_LSTAR_SINGULAR = _F32(lstar_from_y(_Y_SINGULAR))
+# hueOf 只在这个 Y 区间里查色适应表
+_Y_LUT_LOW = _F32(2)
+_Y_LUT_HIGH = _Y_SINGULAR - _F32(5)
+
+
+def _chromatic_adaptation(component):
+    af = pow32(component, 0.42)
+    return _F32(400) * af / (af + _F32(27.13))
+
+
+_ADAPTATION_HIGH = _dot(_SCALED_DISCOUNT_FROM_LINRGB[2], (1, 1, 1)) * _F32(100)
+_ADAPTATION_LOW = _ADAPTATION_HIGH * _F32(0.1)
+_ADAPTATION_STEP = (_ADAPTATION_HIGH - _ADAPTATION_LOW) / _F32(1023)
+_ADAPTATION_LUT = _chromatic_adaptation(
+    _ADAPTATION_LOW + np.arange(1024, dtype=np.float32) * _ADAPTATION_STEP
+)
+
+
+def _chromatic_adaptation_lut(component):
+    """getChromaticAdaptationFromLUT, exact below the table."""
+    index = _round((component - _ADAPTATION_LOW) / _ADAPTATION_STEP)
+    result = _ADAPTATION_LUT[np.clip(index, 0, 1023).astype(np.intp)]
+    low = component <= _ADAPTATION_LOW
+    if low.any():
+        result[low] = _chromatic_adaptation(component[low])
+    return result
+
+
+def _inverse_chromatic_adaptation(adapted):
+    adapted_abs = np.abs(adapted)
+    base = np.maximum(_F32(0), adapted_abs * _F32(27.13) / (_F32(400) - adapted_abs))
+    return np.sign(adapted) * pow32(base, 1.0 / 0.42)
+
+
+def _opponent_ab(y, linrgb, lut=None):
+    """rgbA and (a, b) of hueOf / maxChroma, through the table where ``lut``."""
+    scaled = _mul(linrgb, _SCALED_DISCOUNT_FROM_LINRGB)
+    if lut is None:
+        lut = (y >= _Y_LUT_LOW) & (y <= _Y_LUT_HIGH)
+    rgb_a = []
+    for component in scaled:
+        adapted = _chromatic_adaptation_lut(component)
+        exact = ~lut
+        if exact.any():
+            adapted[exact] = _chromatic_adaptation(component[exact])
+        rgb_a.append(adapted)
+    return rgb_a, _dot(_A_VEC, rgb_a), _dot(_B_VEC, rgb_a)
+
+
+def _hue_of(y, linrgb):
+    _, a, b = _opponent_ab(y, linrgb)
+    return atan2_32(b, a)
+
+
+def _nth_vertex(y, n):
+    """nthVertex for arrays of Y and vertex numbers ``n``."""
+    zero, hundred = _F32(0), _F32(100)
+    coord_a = np.where(n % 4 <= 1, zero, hundred)
+    coord_b = np.where(n % 2 == 0, zero, hundred)
+    # 三种情况分别是 (g, b)、(b, r)、(r, g) 取坐标，剩下一个由 Y 解出
+    first, second = n < 4, (n >= 4) & (n < 8)
+    r = np.where(first, zero, np.where(second, coord_b, coord_a))
+    g = np.where(first, coord_a, np.where(second, zero, coord_b))
+    b = np.where(first, coord_b, np.where(second, coord_a, zero))
+    solved_r = (y - _KG * g - _KB * b) / _KR
+    solved_g = (y - _KR * r - _KB * b) / _KG
+    solved_b = (y - _KR * r - _KG * g) / _KB
+    r = np.where(first, solved_r, r)
+    g = np.where(second, solved_g, g)
+    b = np.where(first | second, b, solved_b)
+    return [r, g, b]
+
+
+def _ccw_dist(a, b):
+    return _mod(b - a + _TWO_PI, _TWO_PI)
+
+
+def _bisect_to_segment(y, target_hue):
+    """The (biggest, smallest) ccwDist vertices of each row's Y band."""
+    target = np.where(target_hue > PI, target_hue - _TWO_PI, target_hue)
+    vertex_ids = _SEGMENT_VERTICES[np.searchsorted(_Y_BOUNDS, y, side="right")]
+    rows = len(y)
+    vertices = np.empty((3, rows, vertex_ids.shape[1]), dtype=np.float32)
+    dist = np.full((rows, vertex_ids.shape[1]), np.nan, dtype=np.float32)
+    # 所有行的所有顶点一起算，一次 hueOf
+    slot_rows, slots = np.nonzero(vertex_ids >= 0)
+    vertex = _nth_vertex(y[slot_rows], vertex_ids[slot_rows, slots])
+    vertices[:, slot_rows, slots] = vertex
+    dist[slot_rows, slots] = _ccw_dist(target[slot_rows], _hue_of(y[slot_rows], vertex))
+    valid = vertex_ids >= 0
+    # 与 pickSegment 一样取第一个最大/最小值
+    biggest = np.where(valid, dist, -np.inf).argmax(axis=1)
+    smallest = np.where(valid, dist, np.inf).argmin(axis=1)
+    index = np.arange(rows)
+    return vertices[:, index, biggest], vertices[:, index, smallest]
+
+
+def _bisect_to_limit(y, target_hue):
+    """bisectToLimit: [3, rows] linear RGB on the gamut boundary."""
+    left, right = _bisect_to_segment(y, target_hue)
+    hue_left = _hue_of(y, left)
+    half = _F32(0.5)
+    result = np.empty_like(left)
+    # 只在还没收敛的行上迭代，收敛的行写回结果后从工作数组中去掉
+    active = np.arange(len(y))
+    delta_target = _mod(target_hue - hue_left, _TWO_PI)
+    for _ in range(8):
+        done = (np.abs(right - left) <= _F32(0.1)).all(axis=0)
+        if done.any():
+            result[:, active[done]] = (left[:, done] + right[:, done]) * half
+            keep = ~done
+            active, y, left, right = (
+                active[keep],
+                y[keep],
+                left[:, keep],
+                right[:, keep],
+            )
+            hue_left, delta_target = hue_left[keep], delta_target[keep]
+            if not len(active):
+                return result
+        mid = (left + right) * half
+        delta_mid = _mod(_hue_of(y, mid) - hue_left, _TWO_PI)
+        in_order = delta_target < delta_mid
+        right = np.where(in_order, mid, right)
+        left = np.where(in_order, left, mid)
+    result[:, active] = (left + right) * half
+    return result
+
+
+def _find_result_by_j(hue_radians, chroma, y):
+    """findResultByJ: ARGB, 0 where Newton's method leaves the gamut."""
+    e_hue = _cos(hue_radians + _F32(2)) + _F32(3.8)
+    p1 = e_hue * _P1K
+    h_sin = _sin(hue_radians)
+    h_cos = _cos(hue_radians)
+    j = _F32(11) * np.sqrt(y)
+    result = np.zeros(y.shape, dtype=np.uint32)
+    active = np.arange(len(y))
+    for i in range(5):
+        j_norm = j / _F32(100)
+        c, hs, hc = chroma[active], h_sin[active], h_cos[active]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alpha = np.where(j == 0, _F32(0), c / np.sqrt(j_norm))
+            t = pow32(alpha * _T_INNER_COEFF, 1.0 / 0.9)
+            p2 = _VC["aw"] * pow32(j_norm, _F32(1) / _CZ) / _VC["nbb"]
+            gamma = (
+                _F32(23)
+                * (p2 + _F32(0.305))
+                * t
+                / (_F32(23) * p1[active] + _F32(11) * t * hc + _F32(108) * t * hs)
+            )
+            rgb_a = _mul([p2, gamma * hc, gamma * hs], _TO_RGBA)
+            linrgb = _mul(
+                [_inverse_chromatic_adaptation(v) for v in rgb_a],
+                _LINRGB_FROM_SCALED_DISCOUNT,
+            )
+        negative = (linrgb[0] < 0) | (linrgb[1] < 0) | (linrgb[2] < 0)
+        yj = _dot(linrgb, _Y_FROM_LINRGB)
+        err = yj - y[active]
+        done = negative | (np.abs(err) < _F32(0.002)) | (i == 4)
+        over = (linrgb[0] > _F32(100.01)) | (linrgb[1] > _F32(100.01))
+        over |= linrgb[2] > _F32(100.01)
+        found = done & ~negative & ~over
+        result[active[found]] = argb_from_linrgb([v[found] for v in linrgb])
+        keep = ~done
+        active = active[keep]
+        if not len(active):
+            break
+        # yj == 0 时与 zig 一样得到 inf/NaN，下一步就会退出
+        with np.errstate(divide="ignore", invalid="ignore"):
+            j = j[keep] - err[keep] * j[keep] / (_F32(2) * yj[keep])
+    return result
+
+
+def solve_to_int(hue, chroma, tone):
+    """HctSolver.solveToInt over broadcast arrays; uint32 ARGB."""
+    hue, chroma, tone = np.broadcast_arrays(_f32(hue), _f32(chroma), _f32(tone))
+    shape = hue.shape
+    hue, chroma, tone = hue.reshape(-1), chroma.reshape(-1), tone.reshape(-1)
+    grey = (
+        (chroma < _F32(0.0001))
+        | (tone < _F32(0.0001))
+        | (tone >= _LSTAR_SINGULAR - _F32(0.0001))
+    )
+    argb = argb_from_lstar(tone)
+    rows = np.nonzero(~grey)[0]
+    if len(rows):
+        hue_radians = _mod(hue[rows], _F32(360)) * _RAD_PER_DEG
+        y = y_from_lstar(tone[rows])
+        exact = _find_result_by_j(hue_radians, chroma[rows], y)
+        missed = exact == 0
+        if missed.any():
+            exact[missed] = argb_from_linrgb(
+                _bisect_to_limit(y[missed], hue_radians[missed])
+            )
+        argb[rows] = exact
+    return argb.reshape(shape)
+
+
+def max_chroma(hue, tone):
+    """HctSolver.maxChroma: chroma of the gamut boundary at (hue, tone)."""
+    hue, tone = np.broadcast_arrays(_f32(hue), _f32(tone))
+    shape = hue.shape
+    hue, tone = hue.reshape(-1), tone.reshape(-1)
+    y = y_from_lstar(tone)
+    linrgb = _bisect_to_limit(y, _mod(hue, _F32(360)) * _RAD_PER_DEG)
+    # maxChroma 的条件写成了 or，总是查表
+    rgb_a, a, b = _opponent_ab(y, linrgb, lut=np.ones(y.shape, dtype=bool))
+    hue_radians = _mod(atan2_32(b, a), _TWO_PI)
+    chroma = _cam16_chroma(
+        a,
+        b,
+        _dot(_U_VEC, rgb_a),
+        _dot(_AC_VEC, rgb_a),
+        hue_radians,
+        hue_radians * _DEG_PER_RAD,
+    )
+    return chroma.reshape(shape)
+
+
+def hct_from_hct(hue, chroma, tone):
+    """Hct.fromHct: solve, then read (hue, chroma, tone) back from the ARGB."""
+    return hct_from_argb(solve_to_int(hue, chroma, tone))
+
+
+# --- MaxChroma.zig (MaxChromaGen.zig) ---
+
+
+@lru_cache(maxsize=None)
+def max_chroma_peak():
+    """
+    (tone, chroma) float32 arrays of the maxChroma peak for hues 0-359.5
+    step 0.5: the golden-section search of MaxChromaGen.zig, for all hues
+    at once and with the generator's expf/logf.
+    """
+    with _compiler_rt_libm():
+        return _golden_section_peaks()
+
+
+def _golden_section_peaks():
+    hue = np.arange(720, dtype=np.float32) / _F32(2)
+    phi = _F32((np.sqrt(5.0) - 1.0) / 2.0)
+    a = np.full(hue.shape, 0.5, dtype=np.float32)
+    b = np.full(hue.shape, 98.5, dtype=np.float32)
+    c = b - phi * (b - a)
+    d = a + phi * (b - a)
+    fc = max_chroma(hue, c)
+    fd = max_chroma(hue, d)
+    # 区间长度的舍入因色相而异，每个色相单独判断是否结束
+    active = b - a > _F32(0.0001)
+    while active.any():
+        rows = np.nonzero(active)[0]
+        right = fc[rows] < fd[rows]
+        a[rows] = np.where(right, c[rows], a[rows])
+        b[rows] = np.where(right, b[rows], d[rows])
+        new_c = np.where(right, d[rows], b[rows] - phi * (b[rows] - a[rows]))
+        new_d = np.where(right, a[rows] + phi * (b[rows] - a[rows]), c[rows])
+        probe = max_chroma(hue[rows], np.where(right, new_d, new_c))
+        fc[rows], fd[rows] = (
+            np.where(right, fd[rows], probe),
+            np.where(right, probe, fc[rows]),
+        )
+        c[rows], d[rows] = new_c, new_d
+        active = b - a > _F32(0.0001)
+    tone = (a + b) / _F32(2)
+    return tone, max_chroma(hue, tone)
+
+
+def read_zig_peak_table(path):
+    """(tone, chroma) float32 arrays of the maxChromaPeak table of MaxChroma.zig."""
+    text = Path(path).read_text(encoding="utf-8")
+    pairs = re.findall(r"\.tone = ([0-9.]+), \.chroma = ([0-9.]+)", text)
+    table = np.array(pairs, dtype=np.float64).astype(np.float32)
+    return table[:, 0], table[:, 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "table",
+        nargs="?",
+        default=Path(__file__).parent / "../zig/src/Hct/MaxChroma.zig",
+        help="MaxChroma.zig to compare with (default: the zig build's)",
+    )
+    parser.add_argument(
+        "--max-ulps",
+        type=int,
+        default=1,
+        help="float32 ulps a peak may differ by (default: 1)",
+    )
+    args = parser.parse_args(argv)
+
+    want_tone, want_chroma = read_zig_peak_table(args.table)
+    tone, chroma = max_chroma_peak()
+    same = (tone == want_tone) & (chroma == want_chroma)
+    # 相差的 ulp 数 (同号 float32 的位模式之差)
+    ulps = np.maximum(
+        np.abs(tone.view(np.int32) - want_tone.view(np.int32)),
+        np.abs(chroma.view(np.int32) - want_chroma.view(np.int32)),
+    )
+    print(
+        f"maxChroma peaks: {same.sum()}/{len(same)} identical to {args.table}, "
+        f"at most {ulps.max()} ulp apart"
+    )
+    for i in np.nonzero(~same)[0]:
+        print(
+            f"  hue {i / 2:5.1f}: ({want_tone[i]}, {want_chroma[i]}) -> "
+            f"({tone[i]}, {chroma[i]})"
+        )
+    return bool(ulps.max() <= args.max_ulps)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Precomputed HCT -> sRGB lookup table.
+
+HctSolver solves every (hue, chroma, tone) request iteratively. For tone
+ramps of many schemes that is the slow part, so this module tabulates the
+solver's linear RGB on a regular grid (like MaxChromaGen.zig tabulates the
+chroma peaks), stores it as a ``.npy`` file that is memory-mapped on first
+use, and answers queries by trilinear interpolation.
+
+Every node stores the solver's linear RGB plus an in-gamut flag (nodes whose
+chroma is out of reach hold the bisectToLimit boundary color). Inside the
+gamut the solution is smooth and interpolates well; queries whose cell
+touches a clipped node, the darkest tone row, or falls outside the grid are
+sent to ``hct.solve_to_int``. Interpolated results are within one 8-bit step
+of the exact solver.
+
+``tonal_ramps`` is the fast path: a tonal palette is one (hue, chroma) and
+many tones, so it reads the four tone columns around (hue, chroma) once and
+blends them, instead of eight scattered nodes per color. Measured on random
+palettes (chroma 0-48, tones 0-100, one core), a color the LUT answers costs
+about 0.2 us (gather plus sRGB encoding). About 23% of the colors fall back
+to the exact solver at about 2 us each (mostly tones whose chroma is out of
+gamut), so a whole ramp averages 0.7-1.0 us per color against 1.7-1.8 us
+for ``solve_to_int``. Point queries through ``argb_from_hct`` cost about
+1 us per color.
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from color_utils import argb_from_linrgb, argb_from_lstar, y_from_lstar
+from hct import (
+    LSTAR_SINGULAR,
+    bisect_to_limit,
+    find_linrgb_by_j,
+    solve_to_int,
+    to_radians,
+)
+
+HUE_STEP = 2.0
+CHROMA_STEP = 2.0
+TONE_STEP = 1.0
+MAX_CHROMA = 150.0
+
+# 色相多存一列 (360 == 0)，插值时不必取模
+LUT_SHAPE = (
+    int(360 / HUE_STEP) + 1,
+    int(MAX_CHROMA / CHROMA_STEP) + 1,
+    int(100 / TONE_STEP) + 1,
+    4,
+)
+
+DEFAULT_LUT_PATH = Path(
+    os.environ.get("MATERIAL_HCT_LUT", Path(__file__).with_name("hct_lut.npy"))
+)
+
+_lut = None
+
+
+def build_lut():
+    """
+    Solve every grid node: float32 [hue, chroma, tone, 4] array of linear
+    RGB plus the in-gamut flag (1.0 = findResultByJ, 0.0 = bisectToLimit).
+    """
+    hue = np.arange(LUT_SHAPE[0]) * HUE_STEP
+    chroma = np.arange(LUT_SHAPE[1]) * CHROMA_STEP
+    tone = np.arange(LUT_SHAPE[2]) * TONE_STEP
+    lut = np.empty(LUT_SHAPE, dtype=np.float32)
+
+    # 逐个色相求解，控制中间数组的大小
+    c, t = np.meshgrid(chroma, tone, indexing="ij")
+    y = y_from_lstar(t)
+    for i, h in enumerate(hue):
+        hue_radians = np.full(c.shape, to_radians(h % 360.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            linrgb = find_linrgb_by_j(hue_radians, c, y)
+        in_gamut = ~np.isnan(linrgb[..., 0])
+        linrgb[~in_gamut] = bisect_to_limit(y[~in_gamut], hue_radians[~in_gamut])
+        lut[i, ..., :3] = linrgb
+        lut[i, ..., 3] = in_gamut
+    return lut
+
+
+def save_lut(lut, path=DEFAULT_LUT_PATH):
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, lut)
+    os.replace(tmp_path, path)
+
+
+def load_lut(path=DEFAULT_LUT_PATH, rebuild=False):
+    """
+    Memory-mapped LUT at ``path``, generated and saved first if it is
+    missing, has a different grid, or ``rebuild`` is set.
+    """
+    path = Path(path)
+    if not rebuild and path.exists():
+        lut = np.load(path, mmap_mode="r")
+        if lut.shape == LUT_SHAPE and lut.dtype == np.float32:
+            return lut
+    save_lut(build_lut(), path)
+    return np.load(path, mmap_mode="r")
+
+
+def get_lut():
+    """Process-wide LUT, loaded (or generated) on first use."""
+    global _lut
+    if _lut is None:
+        _lut = load_lut()
+    return _lut
+
+
+def lookup_linrgb(hue, chroma, tone, lut=None):
+    """
+    Trilinear interpolation in the LUT.
+
+    Returns:
+        [..., 3] linear RGB, NaN where the LUT cannot answer (cell straddles
+        the gamut boundary, or the query is outside the grid)
+    """
+    lut = get_lut() if lut is None else lut
+    hue, chroma, tone = np.broadcast_arrays(
+        np.asarray(hue, dtype=np.float64) % 360.0,
+        np.asarray(chroma, dtype=np.float64),
+        np.asarray(tone, dtype=np.float64),
+    )
+    # 最暗的一格 (tone < TONE_STEP) 在 J 上极不线性，交给精确求解
+    inside = (
+        (chroma >= 0) & (chroma <= MAX_CHROMA) & (tone >= TONE_STEP) & (tone <= 100)
+    )
+
+    # 扁平索引 + 8 个角点的固定偏移，每个角点只做一次 take
+    n_h, n_c, n_t = LUT_SHAPE[:3]
+    flat = np.zeros(hue.shape, dtype=np.intp)
+    weights = []
+    for value, step, n in zip(
+        (hue, chroma, tone), (HUE_STEP, CHROMA_STEP, TONE_STEP), (n_h, n_c, n_t)
+    ):
+        x = np.where(inside, value, step) / step
+        i = np.minimum(x.astype(np.intp), n - 2)
+        flat = flat * n + i
+        frac = (x - i)[..., None]
+        weights.append((1 - frac, frac))
+
+    nodes = lut.reshape(-1, 4)
+    result = np.zeros(hue.shape + (4,))
+    for dh in (0, 1):
+        for dc in (0, 1):
+            for dt in (0, 1):
+                offset = (dh * n_c + dc) * n_t + dt
+                w = weights[0][dh] * weights[1][dc] * weights[2][dt]
+                result += w * nodes.take(flat + offset, axis=0)
+    # 插值后的标志不是 0 或 1：角点有的在色域内、有的被裁剪
+    flag = result[..., 3]
+    smooth = flag > 1 - 1e-6
+    linrgb = result[..., :3]
+    linrgb[~(inside & smooth)] = np.nan
+    return linrgb
+
+
+def ramp_linrgb(hue, chroma, tones, lut=None):
+    """
+    ``lookup_linrgb`` for whole tone ramps: one bilinear (hue, chroma) blend
+    of four contiguous tone columns per palette, then a lerp along tone.
+
+    Args:
+        hue, chroma: [palette] arrays
+        tones: [tone] array, shared by every palette
+
+    Returns:
+        [palette, tone, 3] linear RGB, NaN where the LUT cannot answer
+    """
+    lut = get_lut() if lut is None else lut
+    hue, chroma = np.broadcast_arrays(
+        np.asarray(hue, dtype=np.float64) % 360.0,
+        np.asarray(chroma, dtype=np.float64),
+    )
+    tones = np.asarray(tones, dtype=np.float64)
+    n_h, n_c, n_t = LUT_SHAPE[:3]
+    inside_c = (chroma >= 0) & (chroma <= MAX_CHROMA)
+    inside_t = (tones >= TONE_STEP) & (tones <= 100)
+
+    x_h = hue / HUE_STEP
+    i_h = np.minimum(x_h.astype(np.intp), n_h - 2)
+    f_h = x_h - i_h
+    x_c = np.where(inside_c, chroma, 0.0) / CHROMA_STEP
+    i_c = np.minimum(x_c.astype(np.intp), n_c - 2)
+    f_c = x_c - i_c
+    # 四个角点的整列色调一次取出：[palette, corner, tone, 4]
+    columns = lut[i_h[:, None] + [0, 0, 1, 1], i_c[:, None] + [0, 1, 0, 1]]
+    weights = np.stack(
+        [(1 - f_h) * (1 - f_c), (1 - f_h) * f_c, f_h * (1 - f_c), f_h * f_c], axis=-1
+    )
+    # 与 LUT 同为 float32：混合的舍入误差远小于 8 位的一级
+    column = weights.astype(np.float32)[:, None, :] @ columns.reshape(len(hue), 4, -1)
+    column = column.reshape(len(hue), n_t, 4)
+
+    x_t = np.where(inside_t, tones, TONE_STEP) / TONE_STEP
+    i_t = x_t.astype(np.intp)
+    if (x_t == i_t).all():
+        # 整数色调正好落在节点上，不必插值
+        result = column[:, i_t]
+    else:
+        i_t = np.minimum(i_t, n_t - 2)
+        f_t = (x_t - i_t)[:, None]
+        result = column[:, i_t] * (1 - f_t) + column[:, i_t + 1] * f_t
+    smooth = result[..., 3] > 1 - 1e-6
+    linrgb = result[..., :3]
+    linrgb[~(inside_c[:, None] & inside_t & smooth)] = np.nan
+    return linrgb
+
+
+def _argb_from_lookup(hue, chroma, tone, lookup):
+    """
+    ARGB of broadcast (hue, chroma, tone) arrays, with ``lookup(solve)``
+    giving the LUT's linear RGB of the ``solve`` queries (NaN = no answer).
+    """
+    result = np.asarray(argb_from_lstar(tone), dtype=np.uint32).copy()
+    solve = ~((chroma < 0.0001) | (tone < 0.0001) | (tone >= LSTAR_SINGULAR))
+    if not solve.any():
+        return result
+
+    linrgb = lookup(solve)
+    found = ~np.isnan(linrgb).any(axis=-1)
+    answer = np.empty(found.shape, dtype=np.uint32)
+    answer[found] = argb_from_linrgb(linrgb[found])
+    missing = ~found
+    if missing.any():
+        answer[missing] = solve_to_int(
+            hue[solve][missing], chroma[solve][missing], tone[solve][missing]
+        )
+    result[solve] = answer
+    return result
+
+
+def argb_from_hct(hue, chroma, tone, lut=None):
+    """
+    LUT-backed ``hct.argb_from_hct``: (hue, chroma, tone) arrays -> ARGB.
+
+    Achromatic and extreme tones take the same argbFromLstar shortcut as the
+    solver; everything the LUT cannot answer is solved exactly.
+    """
+    hue, chroma, tone = np.broadcast_arrays(
+        np.asarray(hue, dtype=np.float64),
+        np.asarray(chroma, dtype=np.float64),
+        np.asarray(tone, dtype=np.float64),
+    )
+    return _argb_from_lookup(
+        hue,
+        chroma,
+        tone,
+        lambda solve: lookup_linrgb(hue[solve], chroma[solve], tone[solve], lut),
+    )
+
+
+def tonal_ramps(hue, chroma, tones=np.arange(101.0), lut=None):
+    """
+    ARGB [palette, tone] of the tonal palettes ``(hue[i], chroma[i])`` at
+    ``tones``: ``argb_from_hct`` with the LUT read once per palette
+    (``ramp_linrgb``) instead of once per color.
+    """
+    hue = np.asarray(hue, dtype=np.float64).reshape(-1)
+    chroma = np.broadcast_to(np.asarray(chroma, dtype=np.float64), hue.shape)
+    tones = np.asarray(tones, dtype=np.float64).reshape(-1)
+    shape = (len(hue), len(tones))
+    h, c, t = (
+        np.broadcast_to(hue[:, None], shape),
+        np.broadcast_to(chroma[:, None], shape),
+        np.broadcast_to(tones, shape),
+    )
+    return _argb_from_lookup(
+        h, c, t, lambda solve: ramp_linrgb(hue, chroma, tones, lut)[solve]
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=DEFAULT_LUT_PATH,
+        help=f"LUT file (default: {DEFAULT_LUT_PATH}, or $MATERIAL_HCT_LUT)",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="regenerate the LUT even if it exists"
+    )
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=200000,
+        metavar="N",
+        help="compare N tonal-palette queries with the exact solver (default: 200000)",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    lut = load_lut(args.path, rebuild=args.rebuild)
+    print(
+        f"LUT {args.path}: {lut.shape[:3]} grid, {lut.nbytes / 2**20:.1f} MiB, "
+        f"{1 - lut[..., 3].mean():.1%} nodes clipped to the gamut, "
+        f"ready in {time.perf_counter() - start:.2f}s"
+    )
+    if not args.check:
+        return True
+
+    # 随机色调盘：每个 (hue, chroma) 取 0-100 的全部整数色调
+    rng = np.random.default_rng(0)
+    tones = np.arange(101.0)
+    n_palettes = -(-args.check // len(tones))
+    n_colors = n_palettes * len(tones)
+    palette_hue = rng.uniform(0, 360, n_palettes)
+    palette_chroma = rng.uniform(0, 48, n_palettes)
+    hue = np.repeat(palette_hue, len(tones))
+    chroma = np.repeat(palette_chroma, len(tones))
+    tone = np.tile(tones, n_palettes)
+
+    timings = {}
+
+    def timed(name, func, *func_args):
+        start = time.perf_counter()
+        result = func(*func_args)
+        timings[name] = (time.perf_counter() - start) / n_colors * 1e6
+        return result
+
+    linrgb = timed("lookup", ramp_linrgb, palette_hue, palette_chroma, tones, lut)
+    found = ~np.isnan(linrgb[..., 0])
+    timed("convert", argb_from_linrgb, linrgb[found])
+    ramps = timed("ramps", tonal_ramps, palette_hue, palette_chroma, tones, lut)
+    points = timed("points", argb_from_hct, hue, chroma, tone, lut)
+    exact = timed("exact", solve_to_int, hue, chroma, tone)
+
+    def channel_error(argb):
+        return np.abs(
+            argb.reshape(-1).view(np.uint8).reshape(-1, 4).astype(np.int16)
+            - exact.view(np.uint8).reshape(-1, 4)
+        ).max(axis=-1)
+
+    diff = np.maximum(channel_error(ramps), channel_error(points))
+    print(
+        f"{n_colors} colors in {n_palettes} tone ramps: "
+        f"tonal_ramps {timings['ramps']:.2f} us/color, "
+        f"argb_from_hct {timings['points']:.2f} us/color, "
+        f"exact {timings['exact']:.2f} us/color"
+    )
+    print(
+        f"  LUT gather {timings['lookup']:.2f} + sRGB {timings['convert']:.2f} "
+        f"us/color; {1 - found.mean():.1%} of colors fall back to the exact solver"
+    )
+    print(f"  identical {np.mean(diff == 0):.2%}, max channel error {diff.max()}")
+    return diff.max() <= 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Indexed-color output of the rendered figures (``--image-format``).
+
+The figures are flat UI colors plus antialiased edges: a few thousand
+distinct colors, of which the 256 most frequent cover over 99% of the
+pixels. Instead of a 32-bit RGBA PNG, ``save_figure`` reduces the rendered
+buffer to a palette of at most ``MAX_COLORS`` colors and writes an 8-bit
+indexed PNG or a lossless WebP:
+
+* The palette starts with the seed colors (the scheme tokens of the
+  figure) that occur in the image, so no flat token color is ever shifted,
+  then the most frequent other colors; its last ``TAIL_COLORS`` entries
+  are a Wu palette of all the colors left over, mostly edge pixels. Those
+  map to their nearest palette entry in L*a*b*. An image with at most
+  ``MAX_COLORS`` colors stays lossless.
+* Colors are counted over runs of equal pixels, which in these images are
+  a few percent of the pixels.
+* PNG data is deflated in strips of rows on a thread pool (zlib releases
+  the GIL) and the strips are joined into one zlib stream with sync
+  flushes, as pigz does. WebP is a single libwebp call per image.
+
+``image_format="svg"`` has ``save_figure`` write matplotlib's own SVG
+instead, so the figures drawn with matplotlib also exist as vector files.
+
+``python indexed_image.py`` converts the PNGs in example/visualization and
+reports sizes, times and color errors.
+"""
+
+import argparse
+import concurrent.futures
+import io
+import os
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from color_f32 import int_to_lab
+from desktop_raster import PNG_SIGNATURE, png_chunk
+from scheme_table import rgb8_view
+from wsmeans import nearest_clusters
+from wu import moments_from_colors, quantize_wu_moments
+
+# png / svg: matplotlib 原样输出；indexed / webp: 调色板量化后输出
+IMAGE_FORMATS = ("png", "indexed", "webp", "svg")
+INDEXED_FORMATS = ("indexed", "webp")
+SUFFIXES = {"png": ".png", "indexed": ".png", "webp": ".webp", "svg": ".svg"}
+
+MAX_COLORS = 256
+# 调色板末尾留给其余颜色 (边缘像素) 的 Wu 量化结果
+TAIL_COLORS = 64
+DEFAULT_COMPRESS_LEVEL = 6
+
+# 每个压缩条带至少这么多字节：条带之间不共享字典，太小会损失压缩率
+MIN_STRIP_BYTES = 1 << 20
+
+_image_format = "png"
+_compress_level = DEFAULT_COMPRESS_LEVEL
+_threads = None
+_executor = None
+
+
+def configure(image_format="png", compress_level=DEFAULT_COMPRESS_LEVEL, threads=None):
+    """
+    Select what ``save_figure`` writes in this process.
+
+    ``compress_level`` is the zlib level (0-9) of indexed PNGs and is mapped
+    onto the effort of lossless WebP. ``threads`` sizes the encoding pool
+    (default: one per CPU).
+    """
+    global _image_format, _compress_level, _threads, _executor
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"unknown image format: {image_format!r}")
+    if not 0 <= compress_level <= 9:
+        raise ValueError(f"compress level must be 0-9, got {compress_level}")
+    _image_format = image_format
+    _compress_level = compress_level
+    if threads != _threads and _executor is not None:
+        _executor.shutdown()
+        _executor = None
+    _threads = threads
+
+
+def settings():
+    """Arguments of ``configure`` that reproduce this process's output."""
+    return _image_format, _compress_level, _threads
+
+
+def cache_tag():
+    """Distinguishes cached figures of different formats; empty for plain PNG."""
+    if _image_format in INDEXED_FORMATS:
+        return f"{_image_format}{_compress_level}"
+    return "" if _image_format == "png" else _image_format
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_threads or os.cpu_count(), thread_name_prefix="encode"
+        )
+    return _executor
+
+
+def _bgr_from_argb(argb):
+    argb = np.asarray(argb, dtype=np.uint32)
+    return (argb >> 16) & 0xFF | argb & 0xFF00 | (argb & 0xFF) << 16
+
+
+def _argb_from_bgr(codes):
+    return np.uint32(0xFF000000) | _bgr_from_argb(codes)
+
+
+def _bgr_codes(image):
+    """0xBBGGRR code of every pixel of an opaque uint8 [h, w, 3 | 4] image."""
+    if image.shape[-1] == 4:
+        words = np.ascontiguousarray(image).view("<u4").reshape(-1)
+        # alpha 是小端字的最高字节
+        if (words < 0xFF000000).any():
+            raise ValueError("indexed output needs an opaque image")
+        return words & np.uint32(0xFFFFFF)
+    rgb = image.reshape(-1, 3)
+    codes = rgb[:, 2].astype(np.uint32) << 16
+    codes |= rgb[:, 1].astype(np.uint32) << 8
+    codes |= rgb[:, 0]
+    return codes
+
+
+def color_runs(codes):
+    """(value, length) of every run of equal consecutive ``codes``."""
+    starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(starts, append=len(codes))
+    return codes[starts], lengths
+
+
+def choose_palette(colors, counts, seeds=(), max_colors=MAX_COLORS):
+    """
+    Indices into ``colors`` (sorted BGR codes) of the palette: the ``seeds``
+    (BGR codes) that occur, then the most frequent other colors, ordered by
+    pixel count.
+    """
+    if len(colors) <= max_colors:
+        return np.argsort(-counts, kind="stable")
+    seeds = np.unique(np.asarray(seeds, dtype=np.uint32))
+    positions = np.searchsorted(colors, seeds).clip(max=len(colors) - 1)
+    seeded = positions[colors[positions] == seeds]
+    # 种子颜色排在所有颜色之前，再按像素数从多到少
+    priority = counts.astype(np.float64)
+    priority[seeded] += counts.sum() + 1
+    chosen = np.argsort(-priority, kind="stable")[:max_colors]
+    return chosen[np.argsort(-counts[chosen], kind="stable")]
+
+
+def quantize(image, seeds=(), max_colors=MAX_COLORS):
+    """
+    Reduce an opaque uint8 [h, w, 3 | 4] image to at most ``max_colors``
+    colors, keeping ``seeds`` (ARGB) exact wherever they occur.
+
+    Returns:
+        (uint8 [h, w] palette indices, uint32 ARGB palette)
+    """
+    height, width = image.shape[:2]
+    values, lengths = color_runs(_bgr_codes(image))
+    colors, run_color = np.unique(values, return_inverse=True)
+    counts = np.bincount(run_color, weights=lengths).astype(np.int64)
+
+    if len(colors) <= max_colors:
+        chosen = choose_palette(colors, counts)
+        palette = _argb_from_bgr(colors[chosen])
+        mapping = np.empty(len(colors), dtype=np.intp)
+    else:
+        tail = min(TAIL_COLORS, max_colors // 2)
+        seeds = _bgr_from_argb(seeds)
+        chosen = choose_palette(colors, counts, seeds, max_colors - tail)
+        rest = np.ones(len(colors), dtype=bool)
+        rest[chosen] = False
+        moments = moments_from_colors(_argb_from_bgr(colors[rest]), counts[rest])
+        palette = np.concatenate(
+            [
+                _argb_from_bgr(colors[chosen]),
+                np.asarray(quantize_wu_moments(moments, tail), dtype=np.uint32),
+            ]
+        )
+        points = np.ascontiguousarray(int_to_lab(_argb_from_bgr(colors)).T)
+        clusters = np.ascontiguousarray(int_to_lab(palette).T)
+        mapping, _ = nearest_clusters(points, clusters)
+    mapping[chosen] = np.arange(len(chosen))
+    indices = np.repeat(mapping.astype(np.uint8)[run_color], lengths)
+    return indices.reshape(height, width), palette
+
+
+def _deflate(data, level, last):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(data)
+    return data + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def deflate_parallel(raw, level, executor=None):
+    """
+    ``zlib.compress(raw, level)`` of a 2-D uint8 buffer, compressed in strips
+    of rows on ``executor``. The output is a valid zlib stream, slightly
+    larger than a single-stream one.
+    """
+    rows = max(1, MIN_STRIP_BYTES // raw.shape[1])
+    if executor is None or rows >= len(raw):
+        return zlib.compress(raw, level)
+    strips = [raw[i : i + rows] for i in range(0, len(raw), rows)]
+    last = [False] * (len(strips) - 1) + [True]
+    parts = executor.map(_deflate, strips, [level] * len(strips), last)
+    checksum = zlib.adler32(raw)
+    header = zlib.compress(b"", level)[:2]
+    return header + b"".join(parts) + checksum.to_bytes(4, "big")
+
+
+def write_indexed_png(path, indices, palette, level=DEFAULT_COMPRESS_LEVEL):
+    """Write uint8 [h, w] ``indices`` into an ARGB ``palette`` as an 8-bit indexed PNG."""
+    height, width = indices.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = indices
+    header = (
+        width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, 3, 0, 0, 0])
+    )
+    data = deflate_parallel(raw, level, _pool())
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", header))
+        f.write(png_chunk(b"PLTE", rgb8_view(palette).tobytes()))
+        f.write(png_chunk(b"IDAT", data))
+        f.write(png_chunk(b"IEND", b""))
+
+
+def write_webp(path, indices, palette, level=DEFAULT_COMPRESS_LEVEL):
+    """
+    Write a palette image as lossless WebP; libwebp codes it with its own
+    color-indexing transform. ``level`` 0-9 sets method and effort.
+    """
+    from PIL import Image
+
+    image = Image.fromarray(rgb8_view(palette)[indices])
+    image.save(
+        path,
+        "WEBP",
+        lossless=True,
+        method=round(level * 6 / 9),
+        quality=round(level * 100 / 9),
+    )
+
+
+def write_image(path, image, seeds=()):
+    """
+    Quantize a uint8 [h, w, 3 | 4] image and write it in the configured
+    format (an indexed one).
+
+    Returns:
+        the written path, with the suffix of the format
+    """
+    path = Path(path).with_suffix(SUFFIXES[_image_format])
+    indices, palette = quantize(image, seeds)
+    if _image_format == "webp":
+        _pool().submit(write_webp, path, indices, palette, _compress_level).result()
+    else:
+        write_indexed_png(path, indices, palette, _compress_level)
+    return path
+
+
+def enabled():
+    """Whether figures are written as indexed images."""
+    return _image_format in INDEXED_FORMATS
+
+
+def save_figure(fig, path, seeds=(), **savefig_kwargs):
+    """
+    ``fig.savefig(path, **savefig_kwargs)`` in the configured format.
+
+    Returns:
+        the written path (``.webp`` / ``.svg`` instead of ``.png`` for WebP
+        and SVG)
+    """
+    if not enabled():
+        path = Path(path).with_suffix(SUFFIXES[_image_format])
+        fig.savefig(path, **savefig_kwargs)
+        return path
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="rgba", **savefig_kwargs)
+    # bbox_inches="tight" 裁剪后的尺寸只在最后一次绘制的 renderer 上
+    renderer = fig.canvas.renderer
+    shape = (int(renderer.height), int(renderer.width), 4)
+    rgba = np.frombuffer(buffer.getbuffer(), dtype=np.uint8).reshape(shape)
+    return write_image(path, rgba, seeds)
+
+
+def main(argv=None):
+    from PIL import Image
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "images",
+        nargs="*",
+        type=Path,
+        help="PNGs to convert (default: example/visualization/*.png)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("/tmp/indexed_image"),
+        help="where the converted images are written (default: /tmp/indexed_image)",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=DEFAULT_COMPRESS_LEVEL,
+        help=f"zlib level / WebP effort, 0-9 (default: {DEFAULT_COMPRESS_LEVEL})",
+    )
+    parser.add_argument(
+        "--threads", type=int, help="encoding threads (default: one per CPU)"
+    )
+    args = parser.parse_args(argv)
+
+    images = args.images or sorted(
+        Path(__file__).with_name("visualization").glob("*.png")
+    )
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    totals = dict.fromkeys(INDEXED_FORMATS, 0)
+    total_png = 0
+    ok = True
+    for source in images:
+        rgb = np.asarray(Image.open(source).convert("RGB"))
+        png_size = source.stat().st_size
+        total_png += png_size
+        line = f"  {source.name:<36} {png_size / 1024:7.0f} KiB"
+        for image_format in INDEXED_FORMATS:
+            configure(image_format, args.compress_level, args.threads)
+            start = time.perf_counter()
+            path = write_image(args.output_dir / source.name, rgb)
+            elapsed = time.perf_counter() - start
+            size = path.stat().st_size
+            totals[image_format] += size
+            line += f" | {image_format} {size / 1024:6.0f} KiB {elapsed * 1000:5.0f} ms"
+            decoded = np.asarray(Image.open(path).convert("RGB"))
+            if image_format == "indexed":
+                # 与原图相比：变动的像素比例和最大通道误差
+                diff = np.abs(decoded.astype(np.int16) - rgb).max(axis=-1)
+                line += f" ({(diff > 0).mean():.2%} px changed, max {diff.max()})"
+                indexed = decoded
+            else:
+                ok &= np.array_equal(decoded, indexed)
+        print(line)
+    print(
+        f"  {'total':<36} {total_png / 1024:7.0f} KiB"
+        + "".join(
+            f" | {name} {size / 1024:6.0f} KiB (x{total_png / size:.1f})"
+            for name, size in totals.items()
+        )
+    )
+    if not ok:
+        print("  WebP differs from the indexed PNG")
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,32 @@
+"""
+Deferred imports for the fast command-line paths.
+
+``parse`` and ``html`` of generate_visualization.py need neither NumPy
+(about 120 ms of cold start) nor matplotlib. ``lazy_import`` registers a
+module that is only executed the first time one of its attributes is used,
+so the render code can keep a plain module-level ``np`` while those
+subcommands never load it.
+"""
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    ``name`` as a module that is imported on first attribute access.
+
+    Later ``import name`` statements anywhere in the process get the same
+    lazy module until then. A module that is already imported is returned
+    as is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Python port of zig/src/Extract/load_image.zig.
+
+Images are reduced to about ``TARGET_PIXELS`` pixels before quantization,
+the way the native extraction does: every ``step``-th pixel of the
+flattened image is kept, with ``step = total // TARGET_PIXELS``. Decoding
+is kept as cheap as possible:
+
+* JPEG is decoded at a reduced size with libjpeg's DCT scaling (PIL's
+  ``draft``), at the smallest scale that still has ``TARGET_PIXELS``
+  pixels, as ``loadJpegSubsample`` does with turbojpeg.
+* Binary PPM (P6) and ``.npy`` RGB arrays are memory-mapped; only the
+  sampled pixels are ever read.
+* Everything else (PNG, ...) is decoded in full and then sampled.
+
+The result is a contiguous ``uint8[N, 3]`` array that ``wu.unique_colors``
+and ``wsmeans.quantize_celebi`` use as is.
+"""
+
+import argparse
+import mmap
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+# Material/Extract/futhark/src/target_pixels.h
+TARGET_PIXELS = 16384
+
+# libjpeg 只支持 1/1, 1/2, 1/4, 1/8 缩放 (turbojpeg 还有 M/8)
+JPEG_SCALES = (8, 4, 2, 1)
+
+LoadedImage = namedtuple(
+    "LoadedImage",
+    ("pixels", "width", "height", "decoded_size", "step", "decode_seconds"),
+)
+LoadedImage.__doc__ = """
+Subsampled pixels of an image.
+
+Attributes:
+    pixels: contiguous uint8 [N, 3] RGB samples
+    width, height: size of the image file
+    decoded_size: (width, height) actually decoded
+    step: sampling stride over the flattened decoded image
+    decode_seconds: time spent opening, decoding and sampling
+"""
+
+
+def calculate_step(total_pixels, target_pixels=TARGET_PIXELS):
+    if target_pixels >= total_pixels:
+        return 1
+    return max(total_pixels // target_pixels, 1)
+
+
+def sample(pixels, target_pixels=TARGET_PIXELS):
+    """Every ``step``-th pixel of a flattened [n, 3] image, contiguous."""
+    step = calculate_step(len(pixels), target_pixels)
+    # 切片只是视图；ascontiguousarray 只拷贝采样到的像素 (step == 1 时不拷贝)
+    return np.ascontiguousarray(pixels[::step], dtype=np.uint8), step
+
+
+def _jpeg_scale(width, height, target_pixels):
+    """Largest libjpeg reduction that still decodes ``target_pixels`` pixels."""
+    for scale in JPEG_SCALES:
+        # TJSCALED: 向上取整
+        w, h = -(-width // scale), -(-height // scale)
+        if w * h >= target_pixels or scale == 1:
+            return scale, (w, h)
+
+
+def _read_ppm_header(buf):
+    """
+    (width, height, data offset) of a binary PPM, or None if ``buf`` is not
+    one with 8-bit samples.
+
+    Raises:
+        ValueError: the header is truncated or malformed
+    """
+    if buf[:2] != b"P6":
+        return None
+    fields = []
+    pos = 2
+    while len(fields) < 3:
+        while pos < len(buf) and buf[pos : pos + 1].isspace():
+            pos += 1
+        if buf[pos : pos + 1] == b"#":
+            end = buf.find(b"\n", pos)
+            pos = len(buf) if end < 0 else end
+            continue
+        end = pos
+        while end < len(buf) and not buf[end : end + 1].isspace():
+            end += 1
+        # 头部之后至少还要有一个空白字符
+        if end >= len(buf):
+            raise ValueError("truncated PPM header")
+        if not buf[pos:end].isdigit():
+            raise ValueError(f"malformed PPM header field {bytes(buf[pos:end])!r}")
+        fields.append(int(buf[pos:end]))
+        pos = end
+    width, height, maxval = fields
+    if maxval != 255:
+        return None
+    # 头部最后恰好有一个空白字符
+    return width, height, pos + 1
+
+
+def _load_ppm(path, target_pixels):
+    with open(path, "rb") as f:
+        # 空文件不能 mmap
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{path}: empty file")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        header = _read_ppm_header(buf)
+        if header is not None:
+            width, height, offset = header
+            if len(buf) - offset < width * height * 3:
+                raise ValueError(
+                    f"truncated PPM data: {width}x{height} needs "
+                    f"{width * height * 3} bytes, {len(buf) - offset} follow the header"
+                )
+    except ValueError as e:
+        buf.close()
+        raise ValueError(f"{path}: {e}") from None
+    if header is None:
+        buf.close()
+        return None
+    # 缓冲区由数组持有，随数组一起释放
+    pixels = np.frombuffer(buf, dtype=np.uint8, count=width * height * 3, offset=offset)
+    pixels, step = sample(pixels.reshape(-1, 3), target_pixels)
+    return pixels, (width, height), (width, height), step
+
+
+def _load_npy(path, target_pixels):
+    array = np.load(path, mmap_mode="r")
+    if array.dtype != np.uint8 or array.shape[-1] != 3:
+        raise ValueError(f"{path}: expected a uint8 [..., 3] RGB array")
+    height, width = (
+        (array.shape[0], array.shape[1]) if array.ndim == 3 else (1, len(array))
+    )
+    pixels, step = sample(array.reshape(-1, 3), target_pixels)
+    return pixels, (width, height), (width, height), step
+
+
+def _load_pil(path, target_pixels):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        size = image.size
+        if image.format == "JPEG":
+            _, draft_size = _jpeg_scale(*size, target_pixels)
+            image.draft("RGB", draft_size)
+        decoded = np.asarray(image.convert("RGB"))
+    pixels, step = sample(decoded.reshape(-1, 3), target_pixels)
+    return pixels, size, (decoded.shape[1], decoded.shape[0]), step
+
+
+def load_image_subsample(path, target_pixels=TARGET_PIXELS):
+    """
+    About ``target_pixels`` evenly strided RGB samples of an image.
+
+    Args:
+        path: JPEG, PNG (or anything PIL reads), binary PPM or ``.npy``
+        target_pixels: lower bound on the number of samples, unless the
+            image is smaller; 0 keeps every pixel
+
+    Returns:
+        ``LoadedImage``
+    """
+    path = Path(path)
+    target_pixels = target_pixels or np.iinfo(np.int64).max
+    start = time.perf_counter()
+    if path.suffix.lower() == ".npy":
+        loaded = _load_npy(path, target_pixels)
+    else:
+        loaded = None
+        if path.suffix.lower() in (".ppm", ".pnm"):
+            loaded = _load_ppm(path, target_pixels)
+        if loaded is None:
+            loaded = _load_pil(path, target_pixels)
+    pixels, (width, height), decoded_size, step = loaded
+    return LoadedImage(
+        pixels, width, height, decoded_size, step, time.perf_counter() - start
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "images",
+        nargs="*",
+        default=[Path(__file__).with_name("example.jpg")],
+        help="images to load (default: example.jpg)",
+    )
+    parser.add_argument(
+        "--target-pixels",
+        type=int,
+        default=TARGET_PIXELS,
+        help=f"samples to aim for, 0 = all (default: {TARGET_PIXELS})",
+    )
+    args = parser.parse_args(argv)
+
+    for path in args.images:
+        loaded = load_image_subsample(path, args.target_pixels)
+        decoded_w, decoded_h = loaded.decoded_size
+        print(
+            f"{path}: {loaded.width}x{loaded.height}, decoded {decoded_w}x{decoded_h}, "
+            f"step {loaded.step}, {len(loaded.pixels)} samples "
+            f"in {loaded.decode_seconds * 1000:.1f} ms"
+        )
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
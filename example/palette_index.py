@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Nearest-palette search over the images of a scheme store, in CAM16-UCS.
+
+``PaletteIndex`` packs the extracted colors of every image (the source
+color is the first of them) into one float32 [image, color, 3] matrix of
+CAM16-UCS coordinates (cam16ucs.py), plus the source colors alone. A
+KD-tree indexes points, not sets of colors, so palettes are compared by an
+exact brute-force pass over the packed matrix, vectorized over images:
+
+* ``nearest(palette, k)``: the ``k`` images whose palette is closest,
+  by the symmetric mean nearest-color distance (``palette_distance``);
+* ``nearest_sources(argb, k)``: the ``k`` closest source colors;
+* ``duplicates(threshold)``: groups of near-identical themes, from a grid
+  of the source colors and a palette check of the candidate pairs.
+
+The matrices are saved next to the store columns (``palette_*.npy``) and
+memory-mapped on the next open. ``python palette_index.py --store DIR``
+indexes a store, ``--synthetic N`` times a catalog of N random clustered
+palettes instead.
+"""
+
+import argparse
+import itertools
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cam16ucs import ucs_from_argb
+from scheme_table import hex_from_argb
+
+# 以 J*=50 为原点，float32 展开 |p|²+|q|²-2p·q 时舍入误差更小
+UCS_CENTER = np.array([50.0, 0.0, 0.0], dtype=np.float32)
+
+# 一次处理的图片数，中间矩阵保持在几十 MB 以内
+SEARCH_CHUNK = 65536
+
+INDEX_FILES = ("palette_ucs.npy", "palette_weights.npy", "source_ucs.npy")
+
+
+def palette_distance(p, p_weights, q, q_weights):
+    """
+    Symmetric mean nearest-color distance of two UCS palettes.
+
+    Every color of one palette is matched to the closest color of the
+    other; the weighted mean of those distances is taken both ways and
+    averaged. Zero for identical palettes, whatever their order.
+
+    Args:
+        p, q: [..., colors, 3] UCS palettes (broadcast against each other)
+        p_weights, q_weights: [..., colors] weights summing to one
+
+    Returns:
+        [...] distances
+    """
+    d = np.linalg.norm(p[..., :, None, :] - q[..., None, :, :], axis=-1)
+    forward = (d.min(axis=-1) * p_weights).sum(axis=-1)
+    backward = (d.min(axis=-2) * q_weights).sum(axis=-1)
+    return 0.5 * (forward + backward)
+
+
+def pack_palettes(argb, counts):
+    """
+    Zero-padded ARGB palettes (as ``extracted.npy``) -> centered float32 UCS
+    [image, color, 3] and weights [image, color].
+
+    The padding repeats the first (source) color with weight zero, so it is
+    never closer than a real color and adds nothing to the mean.
+    """
+    argb = np.asarray(argb, dtype=np.uint32)
+    counts = np.asarray(counts)
+    real = np.arange(argb.shape[1]) < counts[:, None]
+    argb = np.where(real, argb, argb[:, :1])
+    ucs = (ucs_from_argb(argb) - UCS_CENTER).astype(np.float32)
+    weights = (real / np.maximum(counts, 1)[:, None]).astype(np.float32)
+    return ucs, weights
+
+
+class PaletteIndex:
+    """Packed CAM16-UCS palettes of a catalog, searched by brute force."""
+
+    def __init__(self, palettes, weights, sources, names=None):
+        self.palettes = palettes
+        self.weights = weights
+        self.sources = sources
+        self.names = names
+        self._columns = None
+
+    @classmethod
+    def from_palettes(cls, argb, counts, names=None):
+        """Index ARGB palettes [image, color] with ``counts`` colors each."""
+        palettes, weights = pack_palettes(argb, counts)
+        return cls(palettes, weights, np.ascontiguousarray(palettes[:, 0]), names)
+
+    @classmethod
+    def from_store(cls, store, rebuild=False):
+        """
+        Index of a ``scheme_store.SchemeStore``: loaded from its directory
+        if it was saved there after the store was built, else built in chunks
+        and saved.
+        """
+        root = store.root
+        built = (root / "extracted.npy").stat().st_mtime
+        if not rebuild and all(
+            (root / name).exists() and (root / name).stat().st_mtime >= built
+            for name in INDEX_FILES
+        ):
+            palettes, weights, sources = (
+                np.load(root / name, mmap_mode="r") for name in INDEX_FILES
+            )
+            if len(palettes) == len(store):
+                return cls(palettes, weights, sources, store.images)
+        palettes = np.empty((len(store), store.extracted_argb.shape[1], 3), np.float32)
+        weights = np.empty(palettes.shape[:2], np.float32)
+        for first in range(0, len(store), SEARCH_CHUNK):
+            rows = slice(first, first + SEARCH_CHUNK)
+            palettes[rows], weights[rows] = pack_palettes(
+                store.extracted_argb[rows], store.extracted_count[rows]
+            )
+        index = cls(
+            palettes, weights, np.ascontiguousarray(palettes[:, 0]), store.images
+        )
+        index.save(root)
+        return index
+
+    def save(self, directory):
+        for name, array in zip(
+            INDEX_FILES, (self.palettes, self.weights, self.sources)
+        ):
+            np.save(Path(directory) / name, array)
+
+    def __len__(self):
+        return len(self.palettes)
+
+    def name(self, index):
+        return self.names[index] if self.names is not None else f"#{index}"
+
+    def columns(self):
+        """
+        Planar copies computed once: coordinates [color, 3, image], their
+        squared norms and the weights [color, image], so that every step of
+        ``distances`` is an elementwise operation over contiguous images.
+        """
+        if self._columns is None:
+            planar = np.ascontiguousarray(np.transpose(self.palettes, (1, 2, 0)))
+            norms = np.einsum("kcn,kcn->kn", planar, planar)
+            weights = np.ascontiguousarray(np.transpose(self.weights))
+            self._columns = planar, norms, weights
+        return self._columns
+
+    def distances(self, palette_argb):
+        """``palette_distance`` from an ARGB palette to every image, float32 [image]."""
+        argb = np.asarray(palette_argb, dtype=np.uint32).reshape(-1)
+        query = (ucs_from_argb(argb) - UCS_CENTER).astype(np.float32)
+        planar, norms, weights = self.columns()
+        result = np.empty(len(self), dtype=np.float32)
+        for first in range(0, len(self), SEARCH_CHUNK):
+            rows = slice(first, first + SEARCH_CHUNK)
+            size = len(result[rows])
+            d2 = np.empty(size, dtype=np.float32)
+            forward = np.zeros(size, dtype=np.float32)
+            backward = np.full((len(query), size), np.inf, dtype=np.float32)
+            for k in range(len(planar)):
+                x, y, z = planar[k, :, rows]
+                nearest = np.full(size, np.inf, dtype=np.float32)
+                for j, (q0, q1, q2) in enumerate(query):
+                    # |p-q|² = |p|² - 2p·q + |q|²
+                    np.multiply(x, -2.0 * q0, out=d2)
+                    d2 += y * (-2.0 * q1)
+                    d2 += z * (-2.0 * q2)
+                    d2 += norms[k, rows] + (q0 * q0 + q1 * q1 + q2 * q2)
+                    np.minimum(nearest, d2, out=nearest)
+                    np.minimum(backward[j], d2, out=backward[j])
+                forward += np.sqrt(np.maximum(nearest, 0.0)) * weights[k, rows]
+            backward = np.sqrt(np.maximum(backward, 0.0)).mean(axis=0)
+            result[rows] = 0.5 * (forward + backward)
+        return result
+
+    def nearest(self, palette_argb, k=50, exclude=None):
+        """
+        The ``k`` images whose palette is closest to ``palette_argb``.
+
+        Returns:
+            (indices, distances), nearest first
+        """
+        distances = self.distances(palette_argb)
+        if exclude is not None:
+            distances[exclude] = np.inf
+        return _top_k(distances, k)
+
+    def nearest_sources(self, source_argb, k=50):
+        """The ``k`` images whose source color is closest: (indices, distances)."""
+        query = ucs_from_argb(np.uint32(source_argb)) - UCS_CENTER
+        distances = np.linalg.norm(self.sources - query.astype(np.float32), axis=1)
+        return _top_k(distances, k)
+
+    def pair_distances(self, i, j):
+        """``palette_distance`` of images ``i`` and ``j`` (index arrays), float32."""
+        planar, _, weights = self.columns()
+        p, q = planar[:, :, i], planar[:, :, j]
+        forward = np.zeros(len(i), dtype=np.float32)
+        backward = np.full((len(q), len(i)), np.inf, dtype=np.float32)
+        for k in range(len(p)):
+            nearest = np.full(len(i), np.inf, dtype=np.float32)
+            for l in range(len(q)):
+                diff = p[k] - q[l]
+                d2 = np.einsum("cn,cn->n", diff, diff)
+                np.minimum(nearest, d2, out=nearest)
+                np.minimum(backward[l], d2, out=backward[l])
+            forward += np.sqrt(nearest) * weights[k, i]
+        backward = np.einsum("kn,kn->n", np.sqrt(backward), weights[:, j])
+        return 0.5 * (forward + backward)
+
+    def duplicate_pairs(self, threshold):
+        """
+        Pairs (i, j), i < j, of images whose source colors lie within
+        ``threshold`` of each other and whose palettes within ``threshold``
+        by ``palette_distance``, as an int64 [pair, 2] array sorted by i.
+        """
+        found = []
+        for i, j in _neighbor_pairs(np.asarray(self.sources), threshold):
+            close = self.pair_distances(i, j) <= threshold
+            found.append(np.stack([i[close], j[close]], axis=1))
+        pairs = np.concatenate(found) if found else np.empty((0, 2), np.int64)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def duplicates(self, threshold=1.0):
+        """
+        Groups of near-identical themes, largest first, as index arrays.
+
+        Images are taken in catalog order; an image not yet grouped leads a
+        new group of itself and its ``duplicate_pairs`` not yet grouped. Every
+        member is thus within ``threshold`` of its leader, and a chain of
+        slightly different themes does not collapse into one group.
+        """
+        pairs = self.duplicate_pairs(threshold)
+        leaders = np.full(len(self), -1, dtype=np.int64)
+        starts = np.searchsorted(pairs[:, 0], np.arange(len(self) + 1))
+        for i in np.unique(pairs[:, 0]).tolist():
+            if leaders[i] >= 0:
+                continue
+            members = pairs[starts[i] : starts[i + 1], 1]
+            members = members[leaders[members] < 0]
+            if len(members):
+                leaders[i] = i
+                leaders[members] = i
+        grouped = np.flatnonzero(leaders >= 0)
+        order = np.argsort(leaders[grouped], kind="stable")
+        groups = np.split(
+            grouped[order], np.flatnonzero(np.diff(leaders[grouped][order])) + 1
+        )
+        return sorted((g for g in groups if len(g)), key=len, reverse=True)
+
+
+def _neighbor_pairs(points, radius, block=SEARCH_CHUNK):
+    """
+    Yield (i, j) index arrays of all pairs i < j of [n, 3] ``points`` within
+    ``radius``, a block of ``i`` at a time.
+
+    The points are hashed into a grid of ``radius``-sized cells; pairs can
+    only lie in the same or adjacent cells, and half of the 26 adjacent
+    offsets cover every pair of different cells once.
+    """
+    cells = np.floor(points / radius).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    offsets = [
+        (d0 * dims[1] + d1) * dims[2] + d2
+        for d0, d1, d2 in itertools.product((-1, 0, 1), repeat=3)
+        if (d0, d1, d2) >= (0, 0, 0)
+    ]
+    for first in range(0, len(points), block):
+        block_i = np.arange(first, min(first + block, len(points)))
+        for offset in offsets:
+            neighbor = keys[block_i] + offset
+            lo = np.searchsorted(sorted_keys, neighbor, side="left")
+            counts = np.searchsorted(sorted_keys, neighbor, side="right") - lo
+            i = np.repeat(block_i, counts)
+            # 每个 i 的 [lo, hi) 区间展开成连续下标
+            j = order[
+                np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(len(i))
+            ]
+            if offset == 0:
+                keep = i < j
+            else:
+                keep = np.ones(len(i), dtype=bool)
+            diff = points[i] - points[j]
+            keep &= np.einsum("nc,nc->n", diff, diff) <= radius * radius
+            i, j = i[keep], j[keep]
+            yield np.minimum(i, j), np.maximum(i, j)
+
+
+def _top_k(distances, k):
+    k = min(k, len(distances))
+    top = np.argpartition(distances, k - 1)[:k]
+    top = top[np.argsort(distances[top], kind="stable")]
+    return top, distances[top]
+
+
+def synthetic_palettes(n_images, n_themes, max_colors=5, seed=0):
+    """
+    ``n_images`` ARGB palettes (zero padded, as ``extracted.npy``) and their
+    color counts: ``n_themes`` random palettes, each image one of them with
+    a few RGB steps of noise and possibly fewer colors.
+    """
+    rng = np.random.default_rng(seed)
+    themes = rng.integers(0, 256, (n_themes, max_colors, 3))
+    rgb = themes[rng.integers(0, n_themes, n_images)]
+    rgb = np.clip(rgb + rng.integers(-3, 4, rgb.shape), 0, 255).astype(np.uint32)
+    argb = np.uint32(0xFF000000) | rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+    counts = rng.integers(1, max_colors + 1, n_images)
+    argb[np.arange(max_colors) >= counts[:, None]] = 0
+    return argb, counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", type=Path, help="scheme_store.py store directory")
+    source.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="N",
+        help="index N synthetic palettes instead of a store",
+    )
+    parser.add_argument(
+        "--themes",
+        type=int,
+        default=20000,
+        help="--synthetic: distinct palettes (default: 20000)",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="rebuild a saved store index"
+    )
+    parser.add_argument(
+        "-k", type=int, default=50, help="neighbors per query (default: 50)"
+    )
+    parser.add_argument(
+        "--queries", type=int, default=20, help="queries timed (default: 20)"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.0,
+        help="CAM16-UCS distance of near-identical themes (default: 1.0)",
+    )
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=2000,
+        help="images checked against a float64 reference (default: 2000)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.store:
+        from scheme_store import SchemeStore
+
+        store = SchemeStore(args.store)
+        index = PaletteIndex.from_store(store, rebuild=args.rebuild)
+
+        def query_palette(i):
+            return store.extracted(i)
+
+    else:
+        argb, counts = synthetic_palettes(args.synthetic, args.themes, seed=args.seed)
+        index = PaletteIndex.from_palettes(argb, counts)
+
+        def query_palette(i):
+            return argb[i, : counts[i]]
+
+    index.columns()
+    print(
+        f"Indexed {len(index)} palettes of up to {index.palettes.shape[1]} colors "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+    rng = np.random.default_rng(args.seed)
+    queries = rng.integers(0, len(index), args.queries)
+    times = []
+    for i in queries:
+        start = time.perf_counter()
+        found, distances = index.nearest(query_palette(i), args.k, exclude=i)
+        times.append(time.perf_counter() - start)
+    print(
+        f"  nearest {args.k}: {np.median(times) * 1000:.1f} ms median, "
+        f"{max(times) * 1000:.1f} ms max over {args.queries} queries"
+    )
+    i = queries[-1]
+    colors = " ".join(hex_from_argb(c) for c in query_palette(i).tolist())
+    print(f"  closest to {index.name(i)} ({colors}):")
+    for j, d in zip(found[:5], distances[:5]):
+        print(f"    {index.name(j)}  {d:.2f}")
+
+    start = time.perf_counter()
+    found, distances = index.nearest_sources(query_palette(i)[0], args.k)
+    print(f"  nearest {args.k} sources: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    groups = index.duplicates(args.threshold)
+    print(
+        f"  {len(groups)} groups of near-identical themes "
+        f"({sum(map(len, groups))} images, largest {len(groups[0]) if groups else 0}) "
+        f"within {args.threshold}: {time.perf_counter() - start:.2f}s"
+    )
+
+    # 对照：前 --check 张图片用 float64 直接算
+    subset = slice(0, min(args.check, len(index)))
+    palettes, weights = (
+        np.asarray(a[subset], np.float64) for a in (index.palettes, index.weights)
+    )
+    query = ucs_from_argb(query_palette(i)) - UCS_CENTER
+    expected = palette_distance(
+        palettes, weights, query, np.full(len(query), 1.0 / len(query))
+    )
+    error = np.abs(index.distances(query_palette(i))[subset] - expected).max()
+    print(f"  largest error against float64 over {len(expected)} images: {error:.1e}")
+    return error < 1e-2
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
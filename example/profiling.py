@@ -0,0 +1,314 @@
+"""
+Per-stage profiling of generate_visualization.py (``--profile``).
+
+Spans are timed with ``span(name, **args)``. Each figure is one span, and
+its sub-phases are spans nested inside it:
+
+* ``layout``: ``tight_layout`` and the extra draw plus ``get_tightbbox`` of
+  ``bbox_inches="tight"``
+* ``rasterize``: the Agg draw (or ``RasterDesktop.render``)
+* ``encode``: PNG encoding (``matplotlib.image.imsave``, ``write_png``, and
+  quantization plus encoding in ``indexed_image.write_image``)
+
+The sub-phases are measured by wrapping those functions, but only while
+profiling is enabled. When it is off, ``span`` hands out one shared
+do-nothing context manager and nothing is patched, so the cost is one
+function call per figure.
+
+Worker processes of a ``--jobs`` pool append their events to files in a
+spool directory, and the parent merges them into one Chrome trace-event
+JSON (``chrome://tracing`` or https://ui.perfetto.dev).
+"""
+
+import contextlib
+import functools
+import json
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+SUB_PHASES = ("layout", "rasterize", "encode")
+
+_NULL_SPAN = contextlib.nullcontext()
+
+_profiler = None
+
+
+class Profiler:
+    """Trace events of one process, in Chrome trace-event form."""
+
+    def __init__(self, spool_dir, owns_spool=False):
+        self.events = []
+        self.spool_dir = spool_dir
+        self.owns_spool = owns_spool
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        # 各进程的时间戳对齐到同一时钟 (单位微秒)
+        self._offset = time.time() * 1e6
+
+    def _now(self):
+        return self._offset + (time.perf_counter() - self._origin) * 1e6
+
+    def stack(self):
+        """Names of the spans open in the current thread, outermost first."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, category="stage", **args):
+        stack = self.stack()
+        stack.append(name)
+        start = self._now()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        try:
+            yield event["args"]
+        finally:
+            event["dur"] = self._now() - start
+            stack.pop()
+            self.events.append(event)
+
+    def counter(self, name, **values):
+        self.events.append(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": self._now(),
+                "pid": self.pid,
+                "args": values,
+            }
+        )
+
+    def flush(self):
+        """Worker side: append the events so far to the spool directory."""
+        if self.owns_spool or not self.events:
+            return
+        path = Path(self.spool_dir) / f"events.{self.pid}.jsonl"
+        with open(path, "a", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event) + "\n")
+        self.events = []
+
+    def collect(self):
+        """Own events plus everything spooled by worker processes."""
+        events = list(self.events)
+        if self.owns_spool:
+            for path in sorted(Path(self.spool_dir).glob("events.*.jsonl")):
+                with open(path, "r", encoding="utf-8") as f:
+                    events.extend(json.loads(line) for line in f)
+        return events
+
+
+def enable(spool_dir=None):
+    """
+    Start profiling this process and instrument matplotlib.
+
+    In the main process ``spool_dir`` is left as None and a fresh spool
+    directory is created for the workers; workers get that directory.
+    """
+    global _profiler
+    owns_spool = spool_dir is None
+    if owns_spool:
+        spool_dir = tempfile.mkdtemp(prefix="material-profile-")
+    _profiler = Profiler(spool_dir, owns_spool)
+    _instrument()
+    return _profiler
+
+
+def active():
+    return _profiler
+
+
+def spool_dir():
+    """Spool directory to hand to worker processes, None when profiling is off."""
+    return None if _profiler is None else _profiler.spool_dir
+
+
+def span(name, category="stage", **args):
+    """Context manager timing ``name``; free when profiling is off."""
+    if _profiler is None:
+        return _NULL_SPAN
+    return _profiler.span(name, category, **args)
+
+
+def peak_rss_mib():
+    # Linux 上 ru_maxrss 的单位是 KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def figure_done(args):
+    """Record peak RSS and open figures on a figure span and as counters."""
+    if _profiler is None:
+        return
+    import matplotlib.pyplot as plt
+
+    args["peak_rss_mib"] = round(peak_rss_mib(), 1)
+    args["open_figures"] = len(plt.get_fignums())
+    _profiler.counter("peak RSS (MiB)", rss=args["peak_rss_mib"])
+    _profiler.flush()
+
+
+def _wrap(owner, attribute, phase, before=None):
+    """Replace ``owner.attribute`` by a version timed as a ``phase`` span."""
+    original = getattr(owner, attribute)
+    if getattr(original, "_profiled", False):
+        return
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        # 阶段之间只计最外层 (例如 Agg 绘制里的 Figure.draw)；只有 encode
+        # 可以嵌在 rasterize 里 (RasterDesktop.render 自己写 PNG)
+        if _profiler is None:
+            return original(*args, **kwargs)
+        stack = _profiler.stack()
+        if phase in stack or (
+            phase != "encode" and any(name in SUB_PHASES for name in stack)
+        ):
+            return original(*args, **kwargs)
+        with _profiler.span(phase, "phase") as span_args:
+            if before is not None:
+                before(span_args, *args)
+            return original(*args, **kwargs)
+
+    timed._profiled = True
+    setattr(owner, attribute, timed)
+
+
+def _count_artists(span_args, canvas, *args):
+    span_args["artists"] = sum(1 for _ in canvas.figure.findobj())
+
+
+def _instrument():
+    import matplotlib.backend_bases
+    import matplotlib.image
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    import desktop_raster
+    import indexed_image
+
+    # bbox_inches="tight" 先取一个 renderer 再空画一遍 (Figure.draw)，
+    # 都不经过 FigureCanvasAgg.draw 的正式绘制，归入 layout
+    _wrap(matplotlib.backend_bases, "_get_renderer", "layout")
+    _wrap(Figure, "draw", "layout")
+    _wrap(FigureCanvasAgg, "draw", "rasterize", before=_count_artists)
+    _wrap(Figure, "tight_layout", "layout")
+    _wrap(Figure, "get_tightbbox", "layout")
+    _wrap(matplotlib.image, "imsave", "encode")
+    _wrap(desktop_raster.RasterDesktop, "render", "rasterize")
+    _wrap(desktop_raster, "write_png", "encode")
+    # 索引色输出：量化和编码都算 encode
+    _wrap(indexed_image, "write_image", "encode")
+
+
+def _self_times(events):
+    """
+    Per figure span (category "figure"): its own time, the exclusive time
+    of each sub-phase nested in it and the artists drawn, from the
+    timestamps of one thread.
+    """
+    by_thread = defaultdict(list)
+    for event in events:
+        if event.get("ph") == "X":
+            by_thread[event["pid"], event["tid"]].append(event)
+
+    rows = []
+    for thread_events in by_thread.values():
+        # 按开始时间排序，开始相同时外层 (更长) 的在前
+        thread_events.sort(key=lambda e: (e["ts"], -e["dur"]))
+        stack = []
+        for event in thread_events:
+            while stack and event["ts"] >= stack[-1][0]["ts"] + stack[-1][0]["dur"]:
+                stack.pop()
+            if stack:
+                stack[-1][1]["child"] += event["dur"]
+            times = {"child": 0.0}
+            stack.append((event, times))
+            if event["cat"] == "figure":
+                rows.append((event, times))
+            event["_times"] = times
+
+    summary = []
+    for figure, _ in rows:
+        end = figure["ts"] + figure["dur"]
+        phases = defaultdict(float)
+        artists = 0
+        for event in by_thread[figure["pid"], figure["tid"]]:
+            if event["cat"] == "phase" and figure["ts"] <= event["ts"] < end:
+                phases[event["name"]] += event["dur"] - event["_times"]["child"]
+                artists += event["args"].get("artists", 0)
+        build = figure["dur"] - sum(phases.values())
+        summary.append((figure, build, phases, artists))
+    for event in events:
+        event.pop("_times", None)
+    summary.sort(key=lambda row: row[0]["ts"])
+    return summary
+
+
+def write_trace(path):
+    """Write every event as Chrome trace JSON; returns the events."""
+    events = _profiler.collect()
+    names = {event["pid"] for event in events}
+    metadata = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": "main" if pid == _profiler.pid else f"worker {pid}"},
+        }
+        for pid in sorted(names)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+    return events
+
+
+def print_summary(events):
+    """Table of every figure: build / layout / rasterize / encode times."""
+    rows = _self_times(events)
+    header = f"  {'figure':<28} {'total':>8} {'build':>8}"
+    header += "".join(f" {phase:>9}" for phase in SUB_PHASES)
+    header += f" {'artists':>8} {'RSS MiB':>8}"
+    print("\nProfile (ms):")
+    print(header)
+    totals = defaultdict(float)
+    for figure, build, phases, artists in rows:
+        args = figure["args"]
+        line = f"  {figure['name']:<28} {figure['dur'] / 1000:8.1f} {build / 1000:8.1f}"
+        line += "".join(f" {phases[phase] / 1000:9.1f}" for phase in SUB_PHASES)
+        line += f" {artists:>8} {args.get('peak_rss_mib', ''):>8}"
+        print(line)
+        totals["total"] += figure["dur"]
+        totals["build"] += build
+        for phase in SUB_PHASES:
+            totals[phase] += phases[phase]
+    line = f"  {'all figures':<28} {totals['total'] / 1000:8.1f}"
+    line += f" {totals['build'] / 1000:8.1f}"
+    line += "".join(f" {totals[phase] / 1000:9.1f}" for phase in SUB_PHASES)
+    print(line)
+    print(f"  peak RSS of the main process: {peak_rss_mib():.0f} MiB")
+
+
+def finish(path):
+    """Write the trace to ``path``, print the summary and stop profiling."""
+    global _profiler
+    events = write_trace(path)
+    print_summary(events)
+    print(f"Wrote Chrome trace ({len(events)} events) to {path}")
+    if _profiler.owns_spool:
+        shutil.rmtree(_profiler.spool_dir, ignore_errors=True)
+    _profiler = None
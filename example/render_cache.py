@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of rendered figures.
+
+A render task ``(kind, name, func, args)`` is keyed by a hash of the plot
+function, its color data, the source of the module that draws it (DPI and
+layout live there) and the matplotlib version. Finished PNGs are kept under
+the cache root, one directory per key, and copied out again the next time
+any input produces the same colors. The cache is bounded in size and evicts
+the least recently used entries.
+"""
+
+import argparse
+import json
+import os
+import sys
+import types
+from functools import lru_cache
+from pathlib import Path
+
+from lazy_import import lazy_import
+from scheme_table import SchemeTable
+
+# generate_visualization.py 的 parse / html 只用到 DEFAULT_* 常量，
+# 缓存真正用到时才导入这些模块
+np = lazy_import("numpy")
+hashlib = lazy_import("hashlib")
+shutil = lazy_import("shutil")
+uuid = lazy_import("uuid")
+
+# 渲染结果改变但源码哈希捕捉不到时（比如换了字体）手动加一
+RENDER_CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("MATERIAL_RENDER_CACHE", Path(__file__).with_name(".render_cache"))
+)
+DEFAULT_MAX_BYTES = 512 * 2**20
+STATS_FILE = "stats.json"
+
+
+@lru_cache(maxsize=None)
+def _source_digest(filename):
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _local_sources(func):
+    """
+    Source files of the modules next to ``func``'s own that its module
+    refers to (itself included), e.g. a renderer it delegates to.
+    """
+    module_file = func.__globals__.get("__file__", "")
+    if not module_file:
+        return []
+    here = os.path.dirname(os.path.abspath(module_file))
+    files = {os.path.abspath(module_file)}
+    for value in list(func.__globals__.values()):
+        if isinstance(value, types.ModuleType):
+            module = value
+        else:
+            module = sys.modules.get(getattr(value, "__module__", None) or "")
+        filename = getattr(module, "__file__", None)
+        if filename and os.path.dirname(os.path.abspath(filename)) == here:
+            files.add(os.path.abspath(filename))
+    return sorted(files)
+
+
+def _update_digest(h, value):
+    """Feed a render argument into ``h`` in a type-tagged, canonical form."""
+    if isinstance(value, SchemeTable):
+        h.update(b"table")
+        _update_digest(h, list(value.names))
+        _update_digest(h, list(value.tokens))
+        _update_digest(h, value.argb)
+        _update_digest(h, value.extracted)
+    elif isinstance(value, np.ndarray):
+        h.update(f"array{value.dtype.str}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"list{len(value)}".encode())
+        for item in value:
+            _update_digest(h, item)
+    elif isinstance(value, dict):
+        h.update(f"dict{len(value)}".encode())
+        for k in sorted(value):
+            _update_digest(h, k)
+            _update_digest(h, value[k])
+    elif isinstance(value, (str, int, float, type(None))):
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+    else:
+        raise TypeError(f"cannot hash render argument of type {type(value)}")
+
+
+def task_key(func, args, variant=""):
+    """
+    Cache key of ``func(*args, output_dir)``: everything but the output
+    directory, plus what decides how the function draws (the source of its
+    module and of the local modules that module uses) and ``variant``, the
+    output settings of the process.
+    """
+    import matplotlib
+
+    h = hashlib.sha256()
+    h.update(
+        f"v{RENDER_CACHE_VERSION};mpl{matplotlib.__version__};"
+        f"{func.__qualname__};".encode()
+    )
+    if variant:
+        h.update(f"{variant};".encode())
+    for filename in _local_sources(func):
+        h.update(_source_digest(filename).encode())
+    _update_digest(h, list(args))
+    return h.hexdigest()
+
+
+def _place(src, dest):
+    """Atomically put a copy of ``src`` at ``dest``."""
+    # 不用硬链接：savefig 会原地覆盖输出文件，硬链接会把缓存一起改掉
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+class RenderCache:
+    """
+    Size-bounded LRU cache of rendered figures.
+
+    ``variant`` (e.g. ``indexed_image.cache_tag()``) keeps figures written
+    with different output settings apart.
+
+    Lookups and eviction run in the main process; misses are rendered and
+    stored by ``render_and_store`` wherever the task runs, so the cache can
+    be sent to worker processes as is.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, variant=""):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.variant = variant
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry(self, key):
+        return self.root / key
+
+    def fetch(self, key, output_dir):
+        """
+        Place the cached figure of ``key`` in ``output_dir``.
+
+        Returns:
+            the output path, or None on a miss
+        """
+        entry = self._entry(key)
+        try:
+            (src,) = entry.iterdir()
+            dest = Path(output_dir) / src.name
+            _place(src, dest)
+            # 目录的 mtime 就是 LRU 的最近使用时间
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dest
+
+    def store(self, key, path):
+        """Add the rendered file ``path`` under ``key`` (first writer wins)."""
+        path = Path(path)
+        tmp = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp.mkdir(parents=True)
+        try:
+            _place(path, tmp / path.name)
+            os.rename(tmp, self._entry(key))
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def wrap(self, task):
+        """
+        Turn a render task into one that returns the cached figure on a hit,
+        or renders and stores it on a miss. The last argument of every task
+        is its output directory.
+        """
+        kind, name, func, args = task
+        *data, output_dir = args
+        key = task_key(func, data, self.variant)
+        path = self.fetch(key, output_dir)
+        if path is not None:
+            return kind, name, _cached_output, (path,)
+        return kind, name, render_and_store, (self, key, func, args)
+
+    def entries(self):
+        """[(mtime, bytes, entry dir)] of every finished entry."""
+        entries = []
+        if not self.root.is_dir():
+            return entries
+        for entry in self.root.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits in
+        ``max_bytes``.
+
+        Returns:
+            (entries left, bytes left)
+        """
+        entries = sorted(self.entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            _, size, entry = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+        return len(entries), total
+
+    def save_stats(self):
+        """Add this run's counters to the cumulative ``stats.json``."""
+        path = self.root / STATS_FILE
+        stats = self.load_stats()
+        stats["hits"] += self.hits
+        stats["misses"] += self.misses
+        stats["evictions"] += self.evictions
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp, path)
+        return stats
+
+    def load_stats(self):
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+        try:
+            with open(self.root / STATS_FILE, "r", encoding="utf-8") as f:
+                stats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    def close(self):
+        """Evict, persist the counters and print a one-line summary."""
+        n_entries, n_bytes = self.evict()
+        self.save_stats()
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        print(
+            f"Render cache {self.root}: {self.hits} hits, {self.misses} misses "
+            f"({rate:.0%}), {self.evictions} evicted, "
+            f"{n_entries} entries / {n_bytes / 2**20:.1f} MiB"
+        )
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _cached_output(path):
+    return path
+
+
+def render_and_store(cache, key, func, args):
+    """Render ``func(*args)`` and store the figure in the cache."""
+    path = Path(func(*args))
+    cache.store(key, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"cache root (default: {DEFAULT_CACHE_DIR}, or $MATERIAL_RENDER_CACHE)",
+    )
+    parser.add_argument(
+        "--clear", action="store_true", help="delete every cached figure"
+    )
+    args = parser.parse_args(argv)
+
+    cache = RenderCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.root}")
+        return True
+    entries = cache.entries()
+    stats = cache.load_stats()
+    lookups = stats["hits"] + stats["misses"]
+    print(
+        f"{cache.root}: {len(entries)} entries, "
+        f"{sum(size for _, size, _ in entries) / 2**20:.1f} MiB"
+    )
+    print(
+        f"  {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hits'] / lookups if lookups else 0.0:.0%} hit rate), "
+        f"{stats['evictions']} evicted"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
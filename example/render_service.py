@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Local render service for the figures of generate_visualization.py.
+
+Running the script for every preview pays for the interpreter, NumPy and
+matplotlib each time. This service keeps a pool of worker processes that
+have imported matplotlib and built the desktop scene once, and serves the
+figures over HTTP on localhost (``--port``) or on a Unix socket
+(``--socket``, e.g. ``curl --unix-socket``):
+
+* ``POST /render/extracted``, ``/render/overview``, ``/render/comparison``
+  and ``/render/scheme/<Name>``: the body is the output of the ``material``
+  executable or the JSON of ``generate_visualization.py parse --json``; the
+  response is the figure. ``?format=`` is ``png`` (default), ``indexed``,
+  ``webp`` or ``svg``, and ``?backend=`` the impression backend
+  (``--backend`` of generate_visualization.py; ``svg`` implies it).
+* ``GET /stats``: queue depth, figures in flight, counters and latency
+  percentiles, as JSON. ``GET /health`` answers ``ok``.
+
+Requests wait in a queue of at most ``--queue`` figures, served by one
+dispatcher per worker. When it is full the request is refused at once
+with ``503 Service Unavailable`` and ``Retry-After``, so a burst from the
+portal backs off instead of piling up latency.
+
+Every figure is rendered exactly as ``generate_visualization.py`` renders
+it for the same input (scheme figures reseed the RNG by their position).
+
+``python render_service.py --self-test`` starts the service on a free
+port, sends bursts of concurrent requests and prints the statistics.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import generate_visualization as gv
+import indexed_image
+
+PLOTS = ("extracted", "scheme", "overview", "comparison")
+FORMATS = ("png", "indexed", "webp", "svg")
+CONTENT_TYPES = {".png": "image/png", ".webp": "image/webp", ".svg": "image/svg+xml"}
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 16
+MAX_BODY_BYTES = 4 << 20
+# 延迟分位数按最近这么多个请求统计
+LATENCY_WINDOW = 1000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class RequestError(Exception):
+    """A request the service answers with ``status`` and a plain-text message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- worker side ---
+
+
+def _init_service_worker():
+    gv._init_render_worker()
+    # 预热：桌面场景的几百个 artist 只建一次
+    gv.get_desktop_scene()
+
+
+def _ping():
+    return os.getpid()
+
+
+def render_figure(blocks, plot, name, image_format, backend):
+    """
+    Render one figure of ``blocks`` (``iter_color_blocks`` blocks) in a
+    worker process.
+
+    Returns:
+        (suffix, image bytes, render seconds)
+    """
+    start = time.perf_counter()
+    indexed_image.configure(image_format, threads=1)
+    output_dir = Path(tempfile.mkdtemp(prefix="material-render-"))
+    try:
+        for kind, task_name, func, args in gv.iter_render_tasks(
+            iter(blocks), output_dir, backend
+        ):
+            if kind == plot and (plot != "scheme" or task_name == name):
+                # 图表函数会打印生成的路径，服务里不需要
+                with contextlib.redirect_stdout(io.StringIO()):
+                    path = Path(func(*args))
+                return path.suffix, path.read_bytes(), time.perf_counter() - start
+        raise LookupError(f"no {plot} figure {name or ''} in the input")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+# --- service side ---
+
+
+def blocks_from_body(body):
+    """
+    ``iter_color_blocks`` blocks of a request body: ``material`` output text
+    or the JSON of ``parse --json``.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise RequestError(400, "body is not UTF-8 text")
+    if text.lstrip().startswith("{"):
+        try:
+            data = json.loads(text)
+            blocks = [(None, "extracted", list(data.get("extracted", [])))]
+            for scheme_name, variants in data["schemes"].items():
+                for variant in ("light", "dark"):
+                    blocks.append((scheme_name, variant, dict(variants[variant])))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise RequestError(400, f"bad token JSON: {e!r}")
+    else:
+        blocks = list(gv.iter_color_blocks(text.splitlines()))
+    if len(blocks) < 2:
+        raise RequestError(400, "no schemes in the body")
+    return blocks
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles of ``values`` in milliseconds, None when empty."""
+    values = sorted(values)
+    if not values:
+        return dict.fromkeys((f"p{p}" for p in points))
+    return {
+        f"p{p}": round(values[max(0, -(-len(values) * p // 100) - 1)] * 1000, 1)
+        for p in points
+    }
+
+
+class RenderService:
+    """
+    Bounded queue of render jobs in front of a process pool of ``jobs``
+    pre-warmed workers.
+    """
+
+    def __init__(self, jobs=1, queue_size=DEFAULT_QUEUE):
+        self.jobs = jobs
+        self.queue_size = queue_size
+        self.pool = None
+        self.queue = None
+        self.dispatchers = []
+        self.in_flight = 0
+        self.counts = dict.fromkeys(("requests", "rendered", "rejected", "failed"), 0)
+        self.latency = {
+            name: deque(maxlen=LATENCY_WINDOW) for name in ("queue", "render", "total")
+        }
+        self.started = time.perf_counter()
+
+    async def start(self):
+        """Start the workers and wait until every one of them is warm."""
+        loop = asyncio.get_running_loop()
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.jobs, initializer=_init_service_worker
+        )
+        start = time.perf_counter()
+        # 每个 ping 都要等初始化完成的进程来接
+        await asyncio.gather(
+            *(loop.run_in_executor(self.pool, _ping) for _ in range(self.jobs))
+        )
+        self.warmup_seconds = time.perf_counter() - start
+        self.queue = asyncio.Queue(self.queue_size)
+        self.dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.jobs)
+        ]
+
+    async def close(self):
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, future, queued = await self.queue.get()
+            self.latency["queue"].append(time.perf_counter() - queued)
+            self.in_flight += 1
+            try:
+                result = await loop.run_in_executor(self.pool, render_figure, *job)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def render(self, blocks, plot, name=None, image_format="png", backend=None):
+        """
+        Queue one figure and wait for it; ``RequestError`` 503 when the
+        queue is full.
+
+        Returns:
+            (suffix, image bytes)
+        """
+        backend = backend or ("svg" if image_format == "svg" else "matplotlib")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(
+                (
+                    (blocks, plot, name, image_format, backend),
+                    future,
+                    time.perf_counter(),
+                )
+            )
+        except asyncio.QueueFull:
+            self.counts["rejected"] += 1
+            raise RequestError(503, f"render queue is full ({self.queue_size})")
+        try:
+            suffix, data, seconds = await future
+        except LookupError as e:
+            raise RequestError(404, str(e))
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        self.counts["rendered"] += 1
+        self.latency["render"].append(seconds)
+        return suffix, data
+
+    def stats(self):
+        return {
+            "workers": self.jobs,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            **self.counts,
+            "uptime_s": round(time.perf_counter() - self.started, 1),
+            "warmup_s": round(self.warmup_seconds, 2),
+            "latency_ms": {
+                name: {"count": len(values), **percentiles(values)}
+                for name, values in self.latency.items()
+            },
+        }
+
+    # --- HTTP ---
+
+    async def handle(self, method, target, body):
+        """
+        One HTTP request.
+
+        Returns:
+            (status, content type, body bytes, extra headers)
+        """
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        if parts == ["health"]:
+            return 200, "text/plain", b"ok\n", {}
+        if parts == ["stats"]:
+            data = json.dumps(self.stats(), indent=2).encode() + b"\n"
+            return 200, "application/json", data, {}
+        if parts[0] != "render":
+            raise RequestError(404, f"no such endpoint: {url.path}")
+        if method != "POST":
+            raise RequestError(405, "POST the result text or token JSON")
+
+        plot = parts[1] if len(parts) > 1 else None
+        name = parts[2] if len(parts) > 2 else None
+        if plot not in PLOTS or len(parts) != (3 if plot == "scheme" else 2):
+            raise RequestError(
+                404,
+                "render one of /render/extracted, /render/overview, "
+                "/render/comparison, /render/scheme/<Name>",
+            )
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        image_format = query.get("format", "png")
+        if image_format not in FORMATS:
+            raise RequestError(400, f"format must be one of {', '.join(FORMATS)}")
+        backend = query.get("backend")
+        if backend is not None and backend not in gv.IMPRESSION_BACKENDS:
+            raise RequestError(
+                400, f"backend must be one of {', '.join(gv.IMPRESSION_BACKENDS)}"
+            )
+
+        blocks = blocks_from_body(body)
+        start = time.perf_counter()
+        suffix, data = await self.render(blocks, plot, name, image_format, backend)
+        self.latency["total"].append(time.perf_counter() - start)
+        return 200, CONTENT_TYPES[suffix], data, {}
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive; one request at a time per connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                keep_alive = version == "HTTP/1.1" and (
+                    headers.get("connection", "").lower() != "close"
+                )
+
+                self.counts["requests"] += 1
+                extra = {}
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise RequestError(413, f"body over {MAX_BODY_BYTES} bytes")
+                    body = await reader.readexactly(length) if length else b""
+                    status, content_type, data, extra = await self.handle(
+                        method, target, body
+                    )
+                except RequestError as e:
+                    status, content_type = e.status, "text/plain"
+                    data = f"{e}\n".encode()
+                    if status == 503:
+                        extra = {"Retry-After": "1"}
+                except (asyncio.IncompleteReadError, ValueError) as e:
+                    status, content_type, data = 400, "text/plain", f"{e}\n".encode()
+                    keep_alive = False
+                except Exception as e:
+                    status, content_type = 500, "text/plain"
+                    data = f"{type(e).__name__}: {e}\n".encode()
+
+                head = [
+                    f"HTTP/1.1 {status} {REASONS[status]}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(data)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                head += [f"{key}: {value}" for key, value in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=DEFAULT_PORT, socket=None):
+    """An asyncio server of ``service`` on ``host:port`` or the Unix ``socket``."""
+    if socket is not None:
+        return await asyncio.start_unix_server(service.serve_connection, socket)
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+# --- client (self-test) ---
+
+
+async def http_request(address, method, target, body=b""):
+    """
+    One request on a fresh connection to ``(host, port)`` or a Unix socket
+    path.
+
+    Returns:
+        (status, headers, body)
+    """
+    if isinstance(address, tuple):
+        reader, writer = await asyncio.open_connection(*address)
+    else:
+        reader, writer = await asyncio.open_unix_connection(address)
+    try:
+        writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        data = await reader.readexactly(int(headers["content-length"]))
+        return status, headers, data
+    finally:
+        writer.close()
+
+
+async def self_test(args):
+    """
+    Serve on a free port, render every plot type once and compare with
+    generate_visualization.py run in-process, then send bursts of
+    ``--burst`` concurrent requests.
+    """
+    data_file = Path(__file__).with_name("example_result.txt")
+    body = data_file.read_bytes()
+    blocks = blocks_from_body(body)
+    scheme = next(name for name, _, _ in blocks if name is not None)
+
+    service = RenderService(args.jobs, args.queue)
+    start = time.perf_counter()
+    await service.start()
+    print(f"{args.jobs} worker(s) warm in {time.perf_counter() - start:.2f}s")
+    server = await start_server(service, port=0)
+    address = server.sockets[0].getsockname()[:2]
+    ok = True
+    try:
+        # 1. 与本进程直接渲染的结果逐字节比较 (PNG；matplotlib 的 SVG 带时间戳)
+        gv._import_matplotlib()
+        for plot in PLOTS:
+            target = f"/render/{plot}" + (f"/{scheme}" if plot == "scheme" else "")
+            start = time.perf_counter()
+            status, headers, data = await http_request(address, "POST", target, body)
+            elapsed = time.perf_counter() - start
+            expected = render_figure(blocks, plot, scheme, "png", "matplotlib")[1]
+            same = status == 200 and data == expected
+            ok &= same
+            print(
+                f"  {target:<28} {status} {headers['content-type']:<10} "
+                f"{len(data) / 1024:6.0f} KiB {elapsed * 1000:7.0f} ms, "
+                f"{'identical' if same else 'DIFFERENT'} to a direct render"
+            )
+
+        status, headers, data = await http_request(
+            address, "POST", f"/render/scheme/{scheme}?format=svg", body
+        )
+        ok &= status == 200 and data.startswith(b"<svg")
+        print(f"  svg impression: {status} {headers['content-type']} {len(data)} B")
+
+        # 2. 突发请求：超出队列的立即 503
+        names = dict.fromkeys(name for name, _, _ in blocks if name is not None)
+        targets = [f"/render/scheme/{name}?backend=raster" for name in names]
+        targets = (targets * (args.burst // len(targets) + 1))[: args.burst]
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(http_request(address, "POST", target, body) for target in targets)
+        )
+        elapsed = time.perf_counter() - start
+        statuses = [status for status, _, _ in results]
+        print(
+            f"  burst of {args.burst}: {statuses.count(200)} rendered, "
+            f"{statuses.count(503)} refused with 503 in {elapsed:.2f}s"
+        )
+        ok &= set(statuses) <= {200, 503} and 200 in statuses
+        ok &= statuses.count(200) >= min(args.burst, args.queue)
+
+        status, _, data = await http_request(address, "GET", "/stats")
+        print(data.decode().rstrip())
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+    return ok
+
+
+async def serve(args):
+    service = RenderService(args.jobs, args.queue)
+    await service.start()
+    server = await start_server(service, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(
+        f"Serving on {where} with {args.jobs} warm worker(s) "
+        f"(queue {args.queue}, warm-up {service.warmup_seconds:.2f}s)"
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+        if args.socket:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(args.socket)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="(default: 127.0.0.1)")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"(default: {DEFAULT_PORT})"
+    )
+    parser.add_argument("--socket", help="serve on this Unix socket instead")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) - 1),
+        help="render worker processes (default: one per CPU but one)",
+    )
+    parser.add_argument(
+        "--queue",
+        type=int,
+        default=DEFAULT_QUEUE,
+        help=f"figures that may wait for a worker before requests get 503 "
+        f"(default: {DEFAULT_QUEUE})",
+    )
+    parser.add_argument(
+        "--self-test",
+        action="store_true",
+        help="serve on a free port, check the figures and exercise backpressure",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=24,
+        help="--self-test: concurrent requests of the burst (default: 24)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return asyncio.run(self_test(args))
+    try:
+        return asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
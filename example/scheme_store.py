@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Columnar store of many result files, for catalog-scale queries.
+
+``parse_color_file`` answers questions about one image. ``build_store``
+ingests any number of result files into a directory of ``.npy`` columns,
+one row per image:
+
+* ``argb.npy``: uint32 [scheme, variant, token, image]. Every (scheme,
+  variant, token) is one contiguous column, so a predicate on one role
+  reads a few pages of the file, not the whole catalog.
+* ``present.npy``: bool, same layout; False where the result file has no
+  such role (its ``argb`` is ``MISSING_ARGB``, indistinguishable from a
+  real black token).
+* ``extracted.npy``: uint32 [image, max extracted colors], zero padded, and
+  ``extracted_count.npy``.
+* ``meta.json``: scheme names, tokens and the image (result file) names.
+
+``SchemeStore`` memory-maps the columns. ``where`` filters on the RGB or
+HCT of a role, skipping images without it ("Vibrant dark primary with a hue in 200-240" is
+``store.where("Vibrant", "dark", "primary", hue=(200, 240))``), and
+``table`` returns the ``SchemeTable`` of one image, which every plot
+function of generate_visualization.py takes as is.
+
+``python scheme_store.py build INPUT... --store DIR`` converts result files
+(``--synthetic N`` writes N of them first), ``python scheme_store.py query
+DIR --where Vibrant.dark.primary.hue=200:240`` filters a store and can plot
+the first match.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hct import hct_from_argb
+from scheme_table import (
+    MISSING_ARGB,
+    TOKENS,
+    VARIANT_INDEX,
+    VARIANTS,
+    SchemeTable,
+    hex_from_argb,
+    rgb8_view,
+)
+
+STORE_VERSION = 2
+META_FILE = "meta.json"
+
+# 每批写入这么多个图像：按列存储时逐个图像写入是跨页的散写
+BUILD_CHUNK = 1024
+
+# where() 可过滤的量：HCT 三个分量和 8 位 RGB 通道
+HCT_FIELDS = ("hue", "chroma", "tone")
+RGB_FIELDS = ("red", "green", "blue")
+
+_QUERY = re.compile(r"^(\w+)\.(light|dark)\.(\w+)\.(\w+)=(-?[\d.]+):(-?[\d.]+)$")
+
+
+def _parse_table(path):
+    """(``SchemeTable``, bool [scheme, variant, token] mask of the roles the file has)."""
+    # 延迟导入：构建仓库的工作进程只需要解析器
+    from generate_visualization import parse_color_file
+
+    extracted_colors, schemes = parse_color_file(path)
+    table = SchemeTable.from_schemes(schemes, extracted_colors)
+    present = np.zeros(table.argb.shape, dtype=bool)
+    for s, scheme_data in enumerate(schemes.values()):
+        for variant, colors in scheme_data.items():
+            t = [table.token_index[token] for token in colors]
+            present[s, VARIANT_INDEX[variant], t] = True
+    return table, present
+
+
+def _union(lists):
+    """Names of all ``lists`` in order of first appearance."""
+    return list(dict.fromkeys(name for names in lists for name in names))
+
+
+def build_store(inputs, store_dir, jobs=1, verbose=True):
+    """
+    Parse result files (paths) into a store at ``store_dir``.
+
+    Scheme names and tokens are the union over all files, in order of
+    appearance; roles a file does not have are ``MISSING_ARGB`` and False in
+    ``present.npy``. Files are parsed on ``jobs`` processes.
+
+    Returns:
+        the ``SchemeStore``
+    """
+    inputs = [Path(path) for path in inputs]
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed_files = list(pool.map(_parse_table, inputs, chunksize=64))
+    else:
+        parsed_files = [_parse_table(path) for path in inputs]
+    tables = [table for table, _ in parsed_files]
+    parsed = time.perf_counter() - start
+
+    names = _union(table.names for table in tables)
+    tokens = _union([TOKENS] + [table.tokens for table in tables])
+    scheme_index = {name: i for i, name in enumerate(names)}
+    token_index = {name: i for i, name in enumerate(tokens)}
+    n_images = len(tables)
+    max_extracted = max((len(table.extracted) for table in tables), default=0)
+
+    argb = np.lib.format.open_memmap(
+        store_dir / "argb.npy",
+        mode="w+",
+        dtype=np.uint32,
+        shape=(len(names), len(VARIANTS), len(tokens), n_images),
+    )
+    present = np.lib.format.open_memmap(
+        store_dir / "present.npy", mode="w+", dtype=bool, shape=argb.shape
+    )
+    extracted = np.lib.format.open_memmap(
+        store_dir / "extracted.npy",
+        mode="w+",
+        dtype=np.uint32,
+        shape=(n_images, max_extracted),
+    )
+    counts = np.zeros(n_images, dtype=np.int32)
+
+    # 先按行拼出一批 [image, scheme, variant, token]，再整体转置写入各列
+    for first in range(0, n_images, BUILD_CHUNK):
+        batch = parsed_files[first : first + BUILD_CHUNK]
+        shape = (len(batch), len(names), len(VARIANTS), len(tokens))
+        rows = np.full(shape, MISSING_ARGB, dtype=np.uint32)
+        has = np.zeros(shape, dtype=bool)
+        for i, (table, table_present) in enumerate(batch):
+            s = [scheme_index[name] for name in table.names]
+            t = [token_index[name] for name in table.tokens]
+            cells = np.ix_(s, range(len(VARIANTS)), t)
+            rows[i][cells] = table.argb
+            has[i][cells] = table_present
+            counts[first + i] = len(table.extracted)
+            extracted[first + i, : len(table.extracted)] = table.extracted
+        argb[..., first : first + len(batch)] = np.moveaxis(rows, 0, -1)
+        present[..., first : first + len(batch)] = np.moveaxis(has, 0, -1)
+    argb.flush()
+    present.flush()
+    extracted.flush()
+    del argb, present, extracted
+    np.save(store_dir / "extracted_count.npy", counts)
+
+    meta = {
+        "version": STORE_VERSION,
+        "schemes": names,
+        "variants": list(VARIANTS),
+        "tokens": tokens,
+        "images": [str(path) for path in inputs],
+    }
+    # meta.json 最后写：有它的目录才是完整的仓库
+    with open(store_dir / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    if verbose:
+        print(
+            f"Stored {n_images} images x {len(names)} schemes x {len(tokens)} tokens "
+            f"in {store_dir} (parsed in {parsed:.2f}s, total "
+            f"{time.perf_counter() - start:.2f}s)"
+        )
+    return SchemeStore(store_dir)
+
+
+class SchemeStore:
+    """
+    Read side of a store directory; the columns are memory-mapped, so only
+    the pages a query touches are read.
+    """
+
+    def __init__(self, store_dir):
+        self.root = Path(store_dir)
+        with open(self.root / META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.root}: unsupported store version")
+        self.names = meta["schemes"]
+        self.tokens = tuple(meta["tokens"])
+        self.images = meta["images"]
+        self.scheme_index = {name: i for i, name in enumerate(self.names)}
+        self.token_index = {name: i for i, name in enumerate(self.tokens)}
+        self.argb = np.load(self.root / "argb.npy", mmap_mode="r")
+        self.present = np.load(self.root / "present.npy", mmap_mode="r")
+        self.extracted_argb = np.load(self.root / "extracted.npy", mmap_mode="r")
+        self.extracted_count = np.load(self.root / "extracted_count.npy")
+        self._hct = {}
+
+    def __len__(self):
+        return len(self.images)
+
+    def locate(self, scheme_name, variant, token):
+        """(scheme, variant, token) names -> indices of the leading axes of ``argb``."""
+        for name, index, what in (
+            (scheme_name, self.scheme_index, "scheme"),
+            (variant, VARIANT_INDEX, "variant"),
+            (token, self.token_index, "token"),
+        ):
+            if name not in index:
+                raise ValueError(f"unknown {what} {name!r} in {self.root}")
+        return (
+            self.scheme_index[scheme_name],
+            VARIANT_INDEX[variant],
+            self.token_index[token],
+        )
+
+    def column(self, scheme_name, variant, token):
+        """uint32 ARGB of one role over all images (a memory-mapped view)."""
+        return self.argb[self.locate(scheme_name, variant, token)]
+
+    def hct(self, scheme_name, variant, token):
+        """(hue, chroma, tone) arrays of one role over all images, cached."""
+        key = self.locate(scheme_name, variant, token)
+        if key not in self._hct:
+            self._hct[key] = hct_from_argb(np.asarray(self.argb[key]))
+        return self._hct[key]
+
+    def where(self, scheme_name, variant, token, **ranges):
+        """
+        Boolean mask of the images whose role lies in every given range.
+
+        ``ranges`` are ``hue``, ``chroma``, ``tone`` (HCT) or ``red``,
+        ``green``, ``blue`` (0-255) as inclusive ``(low, high)`` pairs. A hue
+        range with low > high wraps around 360 (e.g. ``(330, 30)``).
+        Images whose result file lacks the role never match. Combine masks
+        with ``&`` / ``|``.
+        """
+        mask = np.array(self.present[self.locate(scheme_name, variant, token)])
+        for field, (low, high) in ranges.items():
+            if field in HCT_FIELDS:
+                values = self.hct(scheme_name, variant, token)[HCT_FIELDS.index(field)]
+            elif field in RGB_FIELDS:
+                rgb = rgb8_view(np.asarray(self.column(scheme_name, variant, token)))
+                values = rgb[:, RGB_FIELDS.index(field)]
+            else:
+                raise ValueError(f"unknown field {field!r}")
+            if field == "hue" and low > high:
+                mask &= (values >= low) | (values <= high)
+            else:
+                mask &= (values >= low) & (values <= high)
+        return mask
+
+    def query(self, expressions):
+        """
+        Indices of the images matching every ``Scheme.variant.token.field=low:high``
+        expression (the ``--where`` syntax).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for expression in expressions:
+            match = _QUERY.match(expression.replace(" ", ""))
+            if match is None:
+                raise ValueError(
+                    f"bad query {expression!r}, expected Scheme.variant.token.field=low:high"
+                )
+            scheme_name, variant, token, field, low, high = match.groups()
+            mask &= self.where(
+                scheme_name, variant, token, **{field: (float(low), float(high))}
+            )
+        return np.flatnonzero(mask)
+
+    def extracted(self, index):
+        """uint32 ARGB colors extracted from image ``index``."""
+        return np.array(self.extracted_argb[index, : self.extracted_count[index]])
+
+    def table(self, index):
+        """``SchemeTable`` of image ``index``, ready for the plot functions."""
+        return SchemeTable(
+            self.names,
+            np.array(self.argb[..., index]),
+            self.tokens,
+            self.extracted(index),
+        )
+
+
+def result_lines(table):
+    """Lines of a ``material`` result file holding ``table``."""
+    lines = [f"Extracted {len(table.extracted)} Colors:"]
+    lines += [hex_from_argb(c) for c in table.extracted.tolist()]
+    lines.append(
+        f"Use source color {hex_from_argb(table.extracted[0])} to create scheme"
+    )
+    lines.append("")
+    for name, variants in table.to_schemes().items():
+        for variant, tokens in variants.items():
+            lines.append(f"Scheme {name} {variant.title()}:")
+            lines += [f"{token}: Color {color}" for token, color in tokens.items()]
+            lines.append("")
+    return lines
+
+
+def write_synthetic_results(output_dir, n_images, seed=0):
+    """
+    ``n_images`` result files of random source colors, generated with
+    ``dynamic_scheme`` (as ``material`` would print them).
+    """
+    from dynamic_scheme import generate_schemes
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    sources = (rng.integers(0, 1 << 24, n_images) | 0xFF000000).astype(np.uint32)
+    paths = []
+    for i, table in enumerate(generate_schemes(sources)):
+        path = output_dir / f"image{i:05d}.txt"
+        path.write_text("\n".join(result_lines(table)), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+PLOTS = ("extracted", "impression", "overview", "comparison")
+
+
+def plot_image(store, index, plot, output_dir):
+    """Render ``plot`` of image ``index`` with the plot functions of generate_visualization.py."""
+    import generate_visualization as gv
+
+    gv._import_matplotlib()
+    table = store.table(index)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if plot == "extracted":
+        return gv.plot_extracted_colors(
+            [hex_from_argb(c) for c in table.extracted.tolist()], output_dir
+        )
+    if plot == "impression":
+        gv._seed_scheme_rng(0)
+        return gv.draw_material_you_impression(table.names[0], table, output_dir)
+    if plot == "overview":
+        return gv.plot_all_schemes_overview(table, output_dir)
+    return gv.plot_scheme_comparison(table, output_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    build = commands.add_parser("build", help="convert result files into a store")
+    build.add_argument(
+        "inputs",
+        nargs="*",
+        help="result files, directories or glob patterns (as --batch)",
+    )
+    build.add_argument("--store", type=Path, required=True, help="store directory")
+    build.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="N",
+        help="first write N result files of random source colors and store those",
+    )
+    build.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="parser processes (default: one per CPU)",
+    )
+
+    query = commands.add_parser("query", help="filter the images of a store")
+    query.add_argument("store", type=Path, help="store directory")
+    query.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        metavar="Scheme.variant.token.field=LOW:HIGH",
+        help="keep images whose role lies in the range; field is one of "
+        f"{', '.join(HCT_FIELDS + RGB_FIELDS)} (repeatable, all must hold)",
+    )
+    query.add_argument(
+        "--limit", type=int, default=10, help="matches to list (default: 10)"
+    )
+    query.add_argument(
+        "--plot", choices=PLOTS, help="render this figure of the first match"
+    )
+    query.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("visualization"),
+        help="--plot: where the figure is written (default: visualization)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        inputs = list(args.inputs)
+        if args.synthetic:
+            directory = tempfile.mkdtemp(prefix="material-results-")
+            start = time.perf_counter()
+            write_synthetic_results(directory, args.synthetic)
+            inputs.append(directory)
+            print(
+                f"Wrote {args.synthetic} synthetic result files to {directory} "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        from generate_visualization import expand_result_inputs
+
+        files = expand_result_inputs(inputs)
+        if not files:
+            parser.error("no result files to store")
+        store = build_store(files, args.store, args.jobs)
+        size = sum(path.stat().st_size for path in store.root.iterdir())
+        print(f"  {size / 2**20:.1f} MiB on disk")
+        return True
+
+    try:
+        store = SchemeStore(args.store)
+        start = time.perf_counter()
+        matches = store.query(args.where)
+    except (OSError, ValueError) as e:
+        query.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(matches)} of {len(store)} images match "
+        f"({elapsed * 1000:.1f} ms): {' and '.join(args.where) or 'no filter'}"
+    )
+    for index in matches[: args.limit]:
+        roles = []
+        for role in dict.fromkeys(tuple(e.split(".")[:3]) for e in args.where):
+            scheme_name, variant, token = role
+            argb = store.column(scheme_name, variant, token)[index]
+            hue, chroma, tone = (
+                values[index] for values in store.hct(scheme_name, variant, token)
+            )
+            roles.append(
+                f"{scheme_name} {variant} {token} {hex_from_argb(argb)} "
+                f"(H{hue:.0f} C{chroma:.0f} T{tone:.0f})"
+            )
+        print(f"  {store.images[index]}  {'; '.join(roles)}")
+    if args.plot and len(matches):
+        path = plot_image(store, matches[0], args.plot, args.output_dir)
+        print(f"Plotted {args.plot} of {store.images[matches[0]]}: {path}")
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
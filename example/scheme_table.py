@@ -0,0 +1,244 @@
+"""
+Compact, array-backed storage for Material You scheme results.
+
+A ``SchemeTable`` holds every scheme x {light, dark} x token color of a
+result file as one packed ``uint32`` ARGB NumPy array, the same packing the
+Lean and zig code use for colors. Token and scheme names map to fixed
+indices, so looking up a role is plain array indexing instead of a dict walk
+plus ``int(x, 16)`` on a hex string.
+"""
+
+from lazy_import import lazy_import
+
+# 只解析结果文件时用不到 NumPy (parse / html 子命令)，第一次访问时才导入
+np = lazy_import("numpy")
+
+# Token order of DynamicScheme.showAllColors (allMaterialDynamicColors)
+TOKENS = (
+    "primaryPaletteKeyColor",
+    "secondaryPaletteKeyColor",
+    "tertiaryPaletteKeyColor",
+    "neutralPaletteKeyColor",
+    "neutralVariantPaletteKeyColor",
+    "background",
+    "onBackground",
+    "surface",
+    "surfaceDim",
+    "surfaceBright",
+    "surfaceContainerLowest",
+    "surfaceContainerLow",
+    "surfaceContainer",
+    "surfaceContainerHigh",
+    "surfaceContainerHighest",
+    "onSurface",
+    "surfaceVariant",
+    "onSurfaceVariant",
+    "inverseSurface",
+    "inverseOnSurface",
+    "outline",
+    "outlineVariant",
+    "shadow",
+    "scrim",
+    "surfaceTint",
+    "primary",
+    "onPrimary",
+    "primaryContainer",
+    "onPrimaryContainer",
+    "inversePrimary",
+    "secondary",
+    "onSecondary",
+    "secondaryContainer",
+    "onSecondaryContainer",
+    "tertiary",
+    "onTertiary",
+    "tertiaryContainer",
+    "onTertiaryContainer",
+    "error",
+    "onError",
+    "errorContainer",
+    "onErrorContainer",
+    "primaryFixed",
+    "primaryFixedDim",
+    "onPrimaryFixed",
+    "onPrimaryFixedVariant",
+    "secondaryFixed",
+    "secondaryFixedDim",
+    "onSecondaryFixed",
+    "onSecondaryFixedVariant",
+    "tertiaryFixed",
+    "tertiaryFixedDim",
+    "onTertiaryFixed",
+    "onTertiaryFixedVariant",
+)
+TOKEN_INDEX = {name: i for i, name in enumerate(TOKENS)}
+
+VARIANTS = ("light", "dark")
+VARIANT_INDEX = {name: i for i, name in enumerate(VARIANTS)}
+
+# 缺失的 token 与旧代码的 colors.get(key, "#000000") 一致：不透明黑
+MISSING_ARGB = 0xFF000000
+
+
+def argb_from_hex(hex_color):
+    """'#RRGGBB' (or '#RGB') -> opaque ARGB int."""
+    hex_color = hex_color.lstrip("#")
+    if len(hex_color) == 3:
+        hex_color = "".join(c * 2 for c in hex_color)
+    return 0xFF000000 | int(hex_color, 16)
+
+
+def hex_from_argb(argb):
+    """ARGB int -> '#RRGGBB', the format of StringUtils.hexFromArgb."""
+    return f"#{int(argb) & 0xFFFFFF:06X}"
+
+
+def pack_hex(hex_colors):
+    """List of hex colors -> ``uint32`` ARGB array."""
+    return np.array([argb_from_hex(c) for c in hex_colors], dtype=np.uint32)
+
+
+def rgb8_view(argb):
+    """
+    Zero-copy ``uint8`` [..., 3] R, G, B view of a ``uint32`` ARGB array.
+
+    On little-endian machines the ARGB word is stored as bytes B, G, R, A, so
+    reading the first three bytes backwards gives R, G, B without copying.
+    """
+    argb = np.ascontiguousarray(argb, dtype=np.uint32)
+    channels = argb.view(np.uint8).reshape(argb.shape + (4,))
+    return channels[..., 2::-1] if np.little_endian else channels[..., 1:]
+
+
+def rgba_from_argb(argb):
+    """``uint32`` ARGB array -> float64 [..., 4] RGBA in 0-1 (one vectorized pass)."""
+    argb = np.asarray(argb, dtype=np.uint32)
+    out = np.empty(argb.shape + (4,), dtype=np.float64)
+    out[..., 0] = (argb >> 16) & 0xFF
+    out[..., 1] = (argb >> 8) & 0xFF
+    out[..., 2] = argb & 0xFF
+    out[..., 3] = argb >> 24
+    out /= 255
+    return out
+
+
+class SchemeTable:
+    """
+    All schemes x {light, dark} x tokens as one packed ARGB array.
+
+    Attributes:
+        names: scheme names, in result-file order
+        tokens: token names (``TOKENS`` plus any unknown ones, appended)
+        argb: ``uint32`` array of shape (len(names), 2, len(tokens))
+        extracted: ``uint32`` ARGB array of the colors extracted from the image
+    """
+
+    def __init__(self, names, argb, tokens=TOKENS, extracted=()):
+        self.names = list(names)
+        self.tokens = tuple(tokens)
+        self.argb = np.ascontiguousarray(argb, dtype=np.uint32)
+        self.extracted = np.asarray(extracted, dtype=np.uint32).reshape(-1)
+        self.scheme_index = {name: i for i, name in enumerate(self.names)}
+        self.token_index = (
+            TOKEN_INDEX
+            if self.tokens == TOKENS
+            else {name: i for i, name in enumerate(self.tokens)}
+        )
+        self._rgba = None
+
+        expected = (len(self.names), len(VARIANTS), len(self.tokens))
+        if self.argb.shape != expected:
+            raise ValueError(f"argb has shape {self.argb.shape}, expected {expected}")
+
+    @classmethod
+    def from_schemes(cls, schemes, extracted_colors=()):
+        """
+        Build a table from the ``parse_color_file`` dict layout
+        ``schemes[name][variant][token] -> '#RRGGBB'``.
+        """
+        tokens = list(TOKENS)
+        token_index = dict(TOKEN_INDEX)
+        for scheme_data in schemes.values():
+            for colors in scheme_data.values():
+                for token in colors:
+                    if token not in token_index:
+                        token_index[token] = len(tokens)
+                        tokens.append(token)
+
+        argb = np.full(
+            (len(schemes), len(VARIANTS), len(tokens)), MISSING_ARGB, dtype=np.uint32
+        )
+        for s, scheme_data in enumerate(schemes.values()):
+            for variant, colors in scheme_data.items():
+                v = VARIANT_INDEX[variant]
+                for token, hex_color in colors.items():
+                    argb[s, v, token_index[token]] = argb_from_hex(hex_color)
+        return cls(schemes.keys(), argb, tokens, pack_hex(extracted_colors))
+
+    @classmethod
+    def coerce(cls, schemes):
+        """Return ``schemes`` as a table, converting the dict layout if needed."""
+        if isinstance(schemes, cls):
+            return schemes
+        return cls.from_schemes(schemes)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, scheme_name):
+        return scheme_name in self.scheme_index
+
+    def __getstate__(self):
+        # 只序列化紧凑的 uint32 数组，浮点缓存在接收端按需重建
+        state = self.__dict__.copy()
+        state["_rgba"] = None
+        return state
+
+    def subset(self, scheme_names):
+        """A table with only ``scheme_names`` (e.g. to send one scheme to a worker)."""
+        rows = [self.scheme_index[name] for name in scheme_names]
+        return SchemeTable(scheme_names, self.argb[rows], self.tokens, self.extracted)
+
+    @property
+    def rgba(self):
+        """
+        float64 [scheme, variant, token, 4] RGBA in 0-1.
+
+        Converted once for the whole table on first access; every lookup
+        below returns a view into this array.
+        """
+        if self._rgba is None:
+            self._rgba = rgba_from_argb(self.argb)
+        return self._rgba
+
+    def locate(self, scheme_name, variant, token):
+        """(scheme, variant, token) names -> integer indices into ``argb``."""
+        return (
+            self.scheme_index[scheme_name],
+            VARIANT_INDEX[variant],
+            self.token_index[token],
+        )
+
+    def variant_rgba(self, scheme_name, variant):
+        """[token, 4] RGBA view for one scheme variant."""
+        return self.rgba[self.scheme_index[scheme_name], VARIANT_INDEX[variant]]
+
+    def color(self, scheme_name, variant, token):
+        """RGBA view (length 4) of one role."""
+        return self.rgba[self.locate(scheme_name, variant, token)]
+
+    def hex(self, scheme_name, variant, token):
+        """'#RRGGBB' of one role."""
+        return hex_from_argb(self.argb[self.locate(scheme_name, variant, token)])
+
+    def to_schemes(self):
+        """Back to the ``parse_color_file`` dict layout."""
+        return {
+            name: {
+                variant: {
+                    token: hex_from_argb(self.argb[s, v, t])
+                    for t, token in enumerate(self.tokens)
+                }
+                for v, variant in enumerate(VARIANTS)
+            }
+            for s, name in enumerate(self.names)
+        }
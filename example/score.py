@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Batched port of the final ranking step of color extraction.
+
+``ranked_suggestions`` follows Material/Extract/futhark/src/score.fut and
+``choose_colors`` the hue-deduplicating pick of extract.zig (and
+color_extract_ffi.c), but for a whole batch of quantized palettes at once.
+Palettes are stored ragged: one flat array of colors and counts for the
+batch plus ``offsets`` where each image's palette starts, so scoring is a
+handful of array operations regardless of the number of images.
+
+The CAM hue/chroma of every color and the per-image excited hue
+proportions do not depend on the weights, so they are computed once per
+batch; re-ranking a catalog with other ``ScoreWeights`` only redoes the
+cheap scoring and selection.
+"""
+
+import argparse
+import time
+from collections import namedtuple
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+from color_f32 import int_to_cam
+from load_image import TARGET_PIXELS, load_image_subsample
+from scheme_table import hex_from_argb
+
+ScoreWeights = namedtuple(
+    "ScoreWeights",
+    (
+        "target_chroma",
+        "weight_proportion",
+        "weight_chroma_above",
+        "weight_chroma_below",
+        "cutoff_chroma",
+        "cutoff_excited_proportion",
+    ),
+    defaults=(48.0, 0.7, 0.3, 0.1, 5.0, 0.01),
+)
+
+# score.fut 把每个色相的占比累加到它前 14、后 15 度的范围内
+EXCITED_HUE_OFFSETS = np.arange(30) - 14
+
+# extract.zig: 色相间隔从 90 度逐步放宽到 15 度
+DIFFERENCE_DEGREES = np.arange(90, 14, -1, dtype=np.float32)
+FALLBACK_COLOR = 0xFF808080
+
+
+def _excitation_matrix():
+    # band[h, j] = 1 当 j 落在 h 的 30 度窗口内 (按 360 取模)
+    band = np.zeros((360, 360), dtype=np.float32)
+    hues = np.arange(360)
+    for offset in EXCITED_HUE_OFFSETS:
+        band[hues, (hues + offset) % 360] = 1.0
+    return band
+
+
+class PaletteBatch:
+    """
+    Quantized palettes of many images in a ragged layout.
+
+    Attributes:
+        colors, counts: flat uint32 ARGB colors and int64 pixel counts
+        offsets: int64 [n_images + 1]; image ``i`` owns
+            ``colors[offsets[i]:offsets[i + 1]]``
+        names: one label per image
+    """
+
+    def __init__(self, colors, counts, offsets, names=None):
+        self.colors = np.asarray(colors, dtype=np.uint32)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        n_images = len(self.offsets) - 1
+        self.names = (
+            list(names) if names is not None else [str(i) for i in range(n_images)]
+        )
+
+    @classmethod
+    def from_palettes(cls, palettes, names=None):
+        """Build from a list of (colors, counts) pairs, e.g. ``quantize_celebi``."""
+        palettes = list(palettes)
+        lengths = [len(colors) for colors, _ in palettes]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        colors = np.concatenate([c for c, _ in palettes] or [np.zeros(0)])
+        counts = np.concatenate([n for _, n in palettes] or [np.zeros(0)])
+        return cls(colors, counts, offsets, names)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def save(self, path):
+        np.savez(
+            path,
+            colors=self.colors,
+            counts=self.counts,
+            offsets=self.offsets,
+            names=np.array(self.names),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["colors"], data["counts"], data["offsets"], data["names"])
+
+    @cached_property
+    def image(self):
+        """Image index of every color."""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    @cached_property
+    def cam(self):
+        """float32 (hue, chroma) of every color, as ``int_to_cam``."""
+        return int_to_cam(self.colors)
+
+    @cached_property
+    def hue_index(self):
+        # i64.f32：向零截断
+        return self.cam[0].astype(np.int64)
+
+    @cached_property
+    def excited_proportions(self):
+        """float32 [n_images, 360] share of pixels within each hue's window."""
+        population = np.zeros((len(self), 360), dtype=np.float32)
+        # hist 会丢掉越界的下标 (hue == 360)
+        inside = self.hue_index < 360
+        np.add.at(
+            population,
+            (self.image[inside], self.hue_index[inside]),
+            self.counts[inside].astype(np.float32),
+        )
+        totals = (
+            np.add.reduceat(self.counts, self.offsets[:-1]) if len(self.colors) else 0
+        )
+        totals = np.where(np.diff(self.offsets) > 0, totals, 0).astype(np.float32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            proportions = population / totals[:, None]
+        return proportions @ _excitation_matrix()
+
+
+RankedBatch = namedtuple("RankedBatch", ("colors", "hues", "scores", "offsets"))
+
+
+def ranked_suggestions(batch, weights=ScoreWeights()):
+    """
+    Filter and sort every palette of ``batch`` by score, as score.fut does.
+
+    Returns:
+        ``RankedBatch`` of flat arrays (highest score first within each
+        image) and new ``offsets``
+    """
+    hue, chroma = batch.cam
+    hue_index = np.minimum(batch.hue_index, 359)
+    excited = batch.excited_proportions[batch.image, hue_index]
+    excited = np.where(batch.hue_index < 360, excited, 0.0).astype(np.float32)
+    keep = (chroma >= np.float32(weights.cutoff_chroma)) & (
+        excited > np.float32(weights.cutoff_excited_proportion)
+    )
+
+    target = np.float32(weights.target_chroma)
+    proportion_score = (
+        excited * np.float32(100.0) * np.float32(weights.weight_proportion)
+    )
+    chroma_weight = np.where(
+        chroma < target,
+        np.float32(weights.weight_chroma_below),
+        np.float32(weights.weight_chroma_above),
+    ).astype(np.float32)
+    scores = proportion_score + (chroma - target) * chroma_weight
+
+    (kept,) = np.nonzero(keep)
+    # 稳定排序：先按图片，再按分数降序，同分保持原顺序 (与基数排序一致)
+    order = kept[np.lexsort((-scores[kept], batch.image[kept]))]
+    lengths = np.bincount(batch.image[kept], minlength=len(batch))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return RankedBatch(batch.colors[order], hue[order], scores[order], offsets)
+
+
+def _diff_degrees(a, b):
+    return np.float32(180) - np.abs(np.abs(a - b) - np.float32(180))
+
+
+def choose_colors(ranked, desired=4, fallback=FALLBACK_COLOR):
+    """
+    Pick up to ``desired`` colors per image with well separated hues.
+
+    Like extract.zig, every image first requires 90 degrees between chosen
+    hues and relaxes the gap one degree at a time down to 15 until it gets
+    ``desired`` colors; all gaps are tried at once here, for every image.
+
+    Returns:
+        (uint32 [n_images, desired] colors, int64 [n_images] number chosen);
+        an image with no usable color gets ``fallback``
+    """
+    n_images = len(ranked.offsets) - 1
+    lengths = np.diff(ranked.offsets)
+    width = int(lengths.max(initial=0))
+    n_gaps = len(DIFFERENCE_DEGREES)
+
+    chosen_hue = np.zeros((n_images, n_gaps, desired), dtype=np.float32)
+    chosen = np.zeros((n_images, n_gaps, desired), dtype=np.int64)
+    count = np.zeros((n_images, n_gaps), dtype=np.int64)
+    slots = np.arange(desired)
+    rows = np.arange(n_images)[:, None]
+    gaps = np.arange(n_gaps)[None, :]
+    for i in range(width):
+        present = lengths > i
+        position = ranked.offsets[:-1] + np.minimum(i, np.maximum(lengths - 1, 0))
+        hue = ranked.hues[position] if len(ranked.hues) else np.zeros(n_images)
+        distance = _diff_degrees(chosen_hue, hue[:, None, None])
+        duplicate = (
+            (distance < DIFFERENCE_DEGREES[None, :, None]) & (slots < count[..., None])
+        ).any(axis=-1)
+        accept = present[:, None] & ~duplicate & (count < desired)
+        if not accept.any():
+            if (count >= desired).all():
+                break
+            continue
+        r, g = np.nonzero(accept)
+        slot = count[r, g]
+        chosen_hue[r, g, slot] = hue[r]
+        chosen[r, g, slot] = position[r]
+        count += accept
+
+    # 第一个凑够 desired 的间隔；都凑不够时用最后一个 (15 度)
+    enough = count >= desired
+    gap = np.where(enough.any(axis=1), enough.argmax(axis=1), n_gaps - 1)
+    n_chosen = count[np.arange(n_images), gap]
+    picked = chosen[np.arange(n_images), gap]
+    colors = np.zeros((n_images, desired), dtype=np.uint32)
+    valid = slots < n_chosen[:, None]
+    colors[valid] = ranked.colors[picked[valid]]
+    empty = n_chosen == 0
+    colors[empty, 0] = fallback
+    n_chosen[empty] = 1
+    return colors, n_chosen
+
+
+def fix_disliked(colors):
+    """``DislikeAnalyzer.fixIfDisliked`` for an ARGB array."""
+    # 延迟导入：只有用到时才加载 HCT 求解器
+    from dynamic_scheme import fix_if_disliked
+    from hct_f32 import hct_from_argb, solve_to_int
+
+    colors = np.asarray(colors, dtype=np.uint32)
+    hue, chroma, tone = hct_from_argb(colors)
+    fixed = fix_if_disliked(hue, chroma, tone)
+    changed = fixed[2] != tone
+    result = colors.copy()
+    if changed.any():
+        result[changed] = solve_to_int(
+            fixed[0][changed], fixed[1][changed], fixed[2][changed]
+        )
+    return result
+
+
+def extract_top(
+    batch,
+    desired=4,
+    weights=ScoreWeights(),
+    fix_dislikes=False,
+    fallback=FALLBACK_COLOR,
+):
+    """
+    Rank every palette of ``batch`` and keep its top ``desired`` colors.
+
+    ``fix_dislikes`` moves disliked (dark yellow-green) picks to tone 70;
+    the native extraction does not do this, so it is off by default.
+
+    Returns:
+        (uint32 [n_images, desired] colors, int64 [n_images] number chosen)
+    """
+    colors, n_chosen = choose_colors(
+        ranked_suggestions(batch, weights), desired, fallback
+    )
+    if fix_dislikes:
+        valid = np.arange(desired) < n_chosen[:, None]
+        colors[valid] = fix_disliked(colors[valid])
+    return colors, n_chosen
+
+
+def quantize_images(paths, max_colors=128, target_pixels=TARGET_PIXELS):
+    """
+    ``PaletteBatch`` of ``quantize_celebi`` over every image, subsampled to
+    about ``target_pixels`` pixels like the native extraction (0 = all).
+    """
+    from wsmeans import quantize_celebi
+
+    palettes = [
+        quantize_celebi(load_image_subsample(p, target_pixels).pixels, max_colors)
+        for p in paths
+    ]
+    return PaletteBatch.from_palettes(palettes, [str(p) for p in paths])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "images",
+        nargs="*",
+        help="images to quantize (default: example.jpg, or the --palettes batch)",
+    )
+    parser.add_argument(
+        "--palettes",
+        type=Path,
+        metavar="NPZ",
+        help="load the quantized batch from here (or save it here after quantizing)",
+    )
+    parser.add_argument(
+        "--desired", type=int, default=4, help="colors per image (default: 4)"
+    )
+    parser.add_argument(
+        "--max-colors",
+        type=int,
+        default=128,
+        help="quantizer palette size (default: 128)",
+    )
+    parser.add_argument(
+        "--target-pixels",
+        type=int,
+        default=TARGET_PIXELS,
+        help=f"pixels sampled per image, 0 = all (default: {TARGET_PIXELS})",
+    )
+    parser.add_argument(
+        "--fix-dislikes",
+        action="store_true",
+        help="apply DislikeAnalyzer.fixIfDisliked to the chosen colors",
+    )
+    for field, default in ScoreWeights._field_defaults.items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}",
+            type=float,
+            default=default,
+            help=f"score.fut {field} (default: {default})",
+        )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=0,
+        metavar="N",
+        help="also time ranking the batch tiled N times, as a catalog stand-in",
+    )
+    args = parser.parse_args(argv)
+
+    weights = ScoreWeights(*(getattr(args, f) for f in ScoreWeights._fields))
+    if args.palettes and args.palettes.exists() and not args.images:
+        batch = PaletteBatch.load(args.palettes)
+        print(f"Loaded {len(batch)} palettes from {args.palettes}")
+    else:
+        images = args.images or [Path(__file__).with_name("example.jpg")]
+        start = time.perf_counter()
+        batch = quantize_images(images, args.max_colors, args.target_pixels)
+        print(f"Quantized {len(batch)} images in {time.perf_counter() - start:.2f}s")
+        if args.palettes:
+            batch.save(args.palettes)
+
+    start = time.perf_counter()
+    colors, n_chosen = extract_top(batch, args.desired, weights, args.fix_dislikes)
+    elapsed = time.perf_counter() - start
+    for name, row, n in zip(batch.names, colors, n_chosen):
+        print(f"  {name}: {' '.join(hex_from_argb(c) for c in row[:n])}")
+    print(f"Ranked {len(batch)} palettes in {elapsed * 1000:.1f} ms")
+
+    if args.repeat:
+        tiled = PaletteBatch(
+            np.tile(batch.colors, args.repeat),
+            np.tile(batch.counts, args.repeat),
+            np.concatenate(
+                [[0]]
+                + [
+                    batch.offsets[1:] + k * batch.offsets[-1]
+                    for k in range(args.repeat)
+                ]
+            ),
+        )
+        start = time.perf_counter()
+        extract_top(tiled, args.desired, weights, args.fix_dislikes)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        extract_top(tiled, args.desired, weights._replace(target_chroma=36.0))
+        again = time.perf_counter() - start
+        print(
+            f"{len(tiled)} palettes: first ranking {first:.2f}s, "
+            f"re-ranking with other weights {again:.2f}s"
+        )
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
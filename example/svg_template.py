@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+SVG templates of the desktop impression and the scheme comparison chart.
+
+Every ``desktop_concept_*.png`` has the same geometry and only the role
+colors change, so the geometry is written out once as SVG text whose colors
+are ``str.format`` fields named after the tokens:
+
+* desktop: ``{light[primary]}``, ``{dark[surfaceContainerHigh]}``, ... for
+  the light and dark screens;
+* comparison: ``{0[primary]}`` is the color of column 0,
+  ``{0[primary/text]}`` the color of the text written on it and
+  ``{0[scheme]}`` the scheme name.
+
+The image of a scheme is then a single ``format_map`` over the template,
+tens of microseconds instead of a matplotlib render. A page can do the same
+substitution itself: ``write_template`` saves a template as a plain SVG
+file with the placeholders left in, ``page_values`` gives the values of
+every scheme as one JSON-able mapping, and ``FILL_SCRIPT`` is the
+JavaScript ``fillTemplate(template, values)`` that fills them in.
+
+The desktop scene is laid out exactly like ``desktop_raster`` (same figure
+size, DPI and subplot boxes, shapes in pixel coordinates with the quadratic
+Bezier corners of ``BoxStyle.Round``).
+"""
+
+import argparse
+import re
+import string
+import time
+from operator import itemgetter
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from contrast import pick_on_color
+from desktop_raster import RasterScreen, axes_boxes
+from scheme_table import VARIANT_INDEX, VARIANTS, pack_hex
+
+# 页面端的替换，与 str.format 的字段语法一致：{light[primary]}、{0[scheme]}
+FILL_SCRIPT = r"""function fillTemplate(template, values) {
+    return template.replace(/\{(\w+)\[([\w\/]+)\]\}/g, (field, group, key) =>
+        values[group][key]);
+}"""
+
+_PAGE_FIELD = re.compile(r"\{(\w+)\[([\w/]+)\]\}")
+
+SVG_HEADER = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" '
+    'viewBox="0 0 {w} {h}">'
+)
+
+
+def _num(value):
+    """Short decimal for SVG attributes (0.01 px is far below visible)."""
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _braces(text):
+    """Escape literal text for a ``str.format`` template."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def rrect_path(left, top, right, bottom, rx, ry):
+    """
+    SVG path of a ``round`` box in pixel coordinates (y down), corners of
+    size ``(rx, ry)`` drawn as the quadratic Beziers matplotlib uses.
+    """
+    if rx <= 0 or ry <= 0:
+        points = ((left, top), (right, top), (right, bottom), (left, bottom))
+        return "M" + "L".join(f"{_num(x)},{_num(y)}" for x, y in points) + "Z"
+    n = _num
+    return (
+        f"M{n(left + rx)},{n(top)}H{n(right - rx)}"
+        f"Q{n(right)},{n(top)} {n(right)},{n(top + ry)}V{n(bottom - ry)}"
+        f"Q{n(right)},{n(bottom)} {n(right - rx)},{n(bottom)}H{n(left + rx)}"
+        f"Q{n(left)},{n(bottom)} {n(left)},{n(bottom - ry)}V{n(top + ry)}"
+        f"Q{n(left)},{n(top)} {n(left + rx)},{n(top)}Z"
+    )
+
+
+def page_template(template):
+    """
+    ``str.format`` template -> SVG text for a page to fill: the fields stay
+    as they are, escaped literal braces become plain braces.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        parts.append(literal)
+        if field is not None:
+            if spec or conversion:
+                raise ValueError(f"field {field!r} has a format spec or conversion")
+            parts.append(f"{{{field}}}")
+    return "".join(parts)
+
+
+def compile_template(template):
+    """
+    ``str.format`` template -> ``%`` pattern and its ``(name, key)`` fields,
+    in order. ``pattern % values`` is several times faster than formatting
+    fields with an index lookup each.
+    """
+    pattern, fields = [], []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        pattern.append(literal.replace("%", "%%"))
+        if field is not None:
+            name, key = field[:-1].split("[")
+            pattern.append("%s")
+            fields.append((name, key))
+    return "".join(pattern), fields
+
+
+def _hex_colors(argb):
+    """uint32 ARGB array -> list of '#RRGGBB' (``hex_from_argb`` format)."""
+    return [f"#{v:06X}" for v in (np.asarray(argb) & 0xFFFFFF).tolist()]
+
+
+class DesktopSvg:
+    """
+    The desktop impression as an SVG template.
+
+    ``scene`` is ``DesktopScene`` (the class is enough), as for
+    ``desktop_raster.RasterDesktop``. The terminal code lines are random in
+    the PNGs; a template has fixed geometry, so their widths are given as
+    one list per screen in ``code_line_widths`` (default: the maximum width
+    the scene is built with).
+    """
+
+    def __init__(self, scene, code_line_widths=None):
+        self.scene = scene
+        width = int(round(scene.FIGSIZE[0] * scene.DPI))
+        height = int(round(scene.FIGSIZE[1] * scene.DPI))
+        self.size = (width, height)
+        boxes = axes_boxes(
+            scene.FIGSIZE, scene.DPI, len(VARIANTS), **scene.SUBPLOTS_ADJUST
+        )
+        shapes, code_lines = scene.build_shapes()
+        # matplotlib 按 zorder 稳定排序后绘制
+        order = sorted(range(len(shapes)), key=lambda i: shapes[i].zorder)
+        if code_line_widths is None:
+            code_line_widths = [
+                [shapes[i].geometry[2] for i in code_lines] for _ in VARIANTS
+            ]
+
+        parts = [
+            SVG_HEADER.format(w=width, h=height),
+            f'<rect width="{width}" height="{height}" fill="{scene.FACECOLOR}"/>',
+        ]
+        self.tokens = set()
+        for variant, box, line_widths in zip(VARIANTS, boxes, code_line_widths):
+            screen = RasterScreen(box, (scene.W, scene.H), self.size)
+            x0, y0, x1, y1 = box
+            # 与 Agg 一样裁剪到坐标轴范围
+            parts.append(
+                f'<clipPath id="{variant}-screen"><rect x="{_num(x0)}" '
+                f'y="{_num(y0)}" width="{_num(x1 - x0)}" height="{_num(y1 - y0)}"/>'
+                f'</clipPath><g clip-path="url(#{variant}-screen)">'
+            )
+            widths = dict(zip(code_lines, line_widths))
+            for i in order:
+                shape = shapes[i]
+                if i in widths:
+                    x, y, _, h, r = shape.geometry
+                    shape = shape._replace(geometry=(x, y, widths[i], h, r))
+                parts.append(self._element(screen, shape, variant))
+            parts.append("</g>")
+        parts.append("</svg>")
+        self.template = "".join(parts)
+        self.tokens = sorted(self.tokens)
+
+        # 每个 (variant, token) 只转一次十六进制，再按字段顺序展开
+        self._pattern, fields = compile_template(self.template)
+        self._keys = sorted(set(fields))
+        self._expand = itemgetter(*[self._keys.index(field) for field in fields])
+
+    def _paint(self, shape, color, variant, attribute):
+        """``fill``/``stroke`` attributes of a ``ColorRole`` or literal color."""
+        if isinstance(color, str):
+            if color.lower() == "none":
+                return f' {attribute}="none"'
+            value, alpha = color, 1.0
+        else:
+            self.tokens.add(color.key)
+            value, alpha = f"{{{variant}[{color.key}]}}", color.alpha
+        # 与 matplotlib 一样：图元自己的 alpha 覆盖颜色里的 alpha
+        if shape.alpha is not None:
+            alpha = shape.alpha
+        paint = f' {attribute}="{value}"'
+        if alpha != 1.0:
+            paint += f' {attribute}-opacity="{_num(alpha)}"'
+        return paint
+
+    def _element(self, screen, shape, variant):
+        paint = self._paint(shape, shape.color, variant, "fill")
+        if shape.kind == "circle":
+            x, y, r = shape.geometry
+            cx, cy = screen.to_pixels(x, y)
+            return (
+                f'<ellipse cx="{_num(cx)}" cy="{_num(cy)}" rx="{_num(r * screen.sx)}" '
+                f'ry="{_num(r * screen.sy)}"{paint}/>'
+            )
+        if shape.kind == "polygon":
+            points = " ".join(
+                f"{_num(px)},{_num(py)}"
+                for px, py in (screen.to_pixels(x, y) for x, y in shape.geometry)
+            )
+            element = f'<polygon points="{points}"{paint}'
+        else:
+            x, y, w, h = shape.geometry[:4]
+            r = shape.geometry[4] if shape.kind == "rrect" else 0.0
+            left, top = screen.to_pixels(x, y + h)
+            right, bottom = screen.to_pixels(x + w, y)
+            path = rrect_path(left, top, right, bottom, r * screen.sx, r * screen.sy)
+            element = f'<path d="{path}"{paint}'
+        if shape.edge_color is not None and shape.linewidth:
+            stroke = self._paint(shape, shape.edge_color, variant, "stroke")
+            if stroke != ' stroke="none"':
+                # 线宽单位是磅，按图像 DPI 换算成像素
+                width = shape.linewidth * self.scene.DPI / 72.0
+                element += f'{stroke} stroke-width="{_num(width)}"'
+        return element + "/>"
+
+    def colors(self, table, scheme_name):
+        """``format_map`` mapping of ``scheme_name`` of a ``SchemeTable``."""
+        s = table.scheme_index[scheme_name]
+        ids = [table.token_index[token] for token in self.tokens]
+        return {
+            variant: dict(zip(self.tokens, _hex_colors(table.argb[s, v, ids])))
+            for v, variant in enumerate(VARIANTS)
+        }
+
+    def fill(self, table, scheme_name):
+        """SVG text of ``scheme_name``, same as ``template.format_map(colors())``."""
+        argb = table.argb[table.scheme_index[scheme_name]]
+        n_tokens = argb.shape[1]
+        ids = [
+            VARIANT_INDEX[variant] * n_tokens + table.token_index[token]
+            for variant, token in self._keys
+        ]
+        return self._pattern % self._expand(_hex_colors(argb.reshape(-1)[ids]))
+
+    def write(self, table, scheme_name, output_path):
+        Path(output_path).write_text(self.fill(table, scheme_name), encoding="utf-8")
+        return output_path
+
+    def write_template(self, output_path):
+        """Save the template with its placeholders, for ``FILL_SCRIPT``."""
+        Path(output_path).write_text(page_template(self.template), encoding="utf-8")
+        return output_path
+
+
+class ComparisonSvg:
+    """
+    The scheme comparison chart of ``plot_scheme_comparison`` as an SVG
+    template with ``n_schemes`` columns.
+
+    Args:
+        n_schemes: number of columns
+        display_tokens: (token, height weight) of the stacked blocks, top first
+        on_colors: text color candidates, the one with the best WCAG contrast
+            against each block is used
+    """
+
+    # 布局：每个方案一列，单位高度对应的像素，最小画布宽度；字号按 DPI 从磅换算
+    DPI = 100
+    COLUMN_WIDTH = 240
+    UNIT_HEIGHT = 100
+    MIN_WIDTH = 400
+    PAD_X = 0.2
+    BLOCK_GAP = 0.05
+    ROUNDING = 0.05
+
+    def __init__(self, n_schemes, display_tokens, on_colors=("#FFFFFF", "#1C1B1F")):
+        self.n_schemes = n_schemes
+        self.tokens = [token for token, _ in display_tokens]
+        self.on_colors = tuple(on_colors)
+
+        total_weight = sum(weight for _, weight in display_tokens)
+        width = max(n_schemes * self.COLUMN_WIDTH, self.MIN_WIDTH)
+        # 与 matplotlib 版一样：顶部留 1.5 放标题，底部留出方案名
+        y_top, y_bottom = total_weight + 1.5, -1.0
+        height = (y_top - y_bottom) * self.UNIT_HEIGHT
+        sx = width / max(n_schemes, 1)
+
+        def to_px(x, y):
+            return x * sx, (y_top - y) * self.UNIT_HEIGHT
+
+        def text(x, y, content, size, color, baseline="central", extra=""):
+            px, py = to_px(x, y)
+            return (
+                f'<text x="{_num(px)}" y="{_num(py)}" text-anchor="middle" '
+                f'dominant-baseline="{baseline}" font-size="{_num(size * self.DPI / 72)}"'
+                f' fill="{color}"{extra}>{content}</text>'
+            )
+
+        parts = [
+            SVG_HEADER.format(w=_num(width), h=_num(height)),
+            f'<rect width="{_num(width)}" height="{_num(height)}" fill="#FFFFFF"/>',
+            '<g font-family="sans-serif">',
+        ]
+        col_width = 1.0 - self.PAD_X * 2
+        for col in range(n_schemes):
+            center_x = col + 0.5
+            current_y = 0.0
+            # 倒序堆叠："Surface" 在最下面，"Primary" 在最上面
+            for token, weight in reversed(display_tokens):
+                block_h = weight - self.BLOCK_GAP
+                left, top = to_px(center_x - col_width / 2, current_y + block_h)
+                right, bottom = to_px(center_x + col_width / 2, current_y)
+                path = rrect_path(
+                    left,
+                    top,
+                    right,
+                    bottom,
+                    self.ROUNDING * sx,
+                    self.ROUNDING * self.UNIT_HEIGHT,
+                )
+                parts.append(f'<path d="{path}" fill="{{{col}[{token}]}}"/>')
+                on = f"{{{col}[{token}/text]}}"
+                middle = current_y + block_h / 2
+                parts.append(
+                    text(center_x, middle + 0.15, token, 8, on, extra=' opacity="0.8"')
+                )
+                parts.append(
+                    text(
+                        center_x,
+                        middle - 0.15,
+                        f"{{{col}[{token}]}}",
+                        10,
+                        on,
+                        extra=' font-weight="bold" font-family="monospace"',
+                    )
+                )
+                current_y += weight
+            parts.append(
+                text(
+                    center_x,
+                    -0.5,
+                    f"{{{col}[scheme]}}",
+                    12,
+                    "#333333",
+                    baseline="hanging",
+                    extra=' font-weight="bold"',
+                )
+            )
+
+        title_x = n_schemes / 2
+        parts.append(
+            text(
+                title_x,
+                total_weight + 0.8,
+                "Color Scheme Palette Comparison",
+                20,
+                "#1f1f1f",
+                extra=' font-weight="bold"',
+            )
+        )
+        parts.append(
+            text(
+                title_x,
+                total_weight + 0.4,
+                _braces(
+                    escape(
+                        "Key roles extraction: Primary, Tertiary, Containers & "
+                        "Tinted Surface"
+                    )
+                ),
+                12,
+                "#666666",
+            )
+        )
+        parts.append("</g></svg>")
+        self.template = "".join(parts)
+
+    def columns(self, table):
+        """``format`` arguments (one mapping per column) of a ``SchemeTable``."""
+        if len(table) != self.n_schemes:
+            raise ValueError(
+                f"template has {self.n_schemes} columns, table has {len(table)} schemes"
+            )
+        ids = [table.token_index[token] for token in self.tokens]
+        # 默认展示 Light 模式
+        light = table.argb[:, 0, ids]
+        on_index = pick_on_color(light, pack_hex(self.on_colors))[0]
+        columns = []
+        for name, colors, text in zip(table.names, light, on_index):
+            column = dict(zip(self.tokens, _hex_colors(colors)))
+            for token, i in zip(self.tokens, text.tolist()):
+                column[f"{token}/text"] = self.on_colors[i]
+            column["scheme"] = escape(name)
+            columns.append(column)
+        return columns
+
+    def fill(self, table):
+        """SVG text of the comparison chart of every scheme of ``table``."""
+        return self.template.format(*self.columns(table))
+
+    def write(self, table, output_path):
+        Path(output_path).write_text(self.fill(table), encoding="utf-8")
+        return output_path
+
+    def write_template(self, output_path):
+        """Save the template with its placeholders, for ``FILL_SCRIPT``."""
+        Path(output_path).write_text(page_template(self.template), encoding="utf-8")
+        return output_path
+
+
+def fill_page(text, values):
+    """What ``FILL_SCRIPT`` does in the page: fill a ``write_template`` file."""
+    if isinstance(values, list):
+        values = {str(i): value for i, value in enumerate(values)}
+    return _PAGE_FIELD.sub(lambda m: values[m[1]][m[2]], text)
+
+
+def page_values(desktop, comparison, table):
+    """
+    Values of both templates for every scheme of ``table``:
+    ``{"desktop": {scheme: desktop.colors()}, "comparison": comparison.columns()}``,
+    the ``values`` argument of ``fillTemplate``.
+    """
+    return {
+        "desktop": {name: desktop.colors(table, name) for name in table.names},
+        "comparison": comparison.columns(table),
+    }
+
+
+def main(argv=None):
+    import generate_visualization as gv
+    from xml.dom import minidom
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default=Path(__file__).with_name("example_result.txt"),
+        help="result file with the schemes (default: example_result.txt)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("/tmp/svg_template"),
+        help="where the filled SVGs are written (default: /tmp/svg_template)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1000,
+        help="substitutions timed per scheme (default: 1000)",
+    )
+    args = parser.parse_args(argv)
+
+    table = gv.parse_color_table(args.input)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    desktop = DesktopSvg(gv.DesktopScene)
+    comparison = ComparisonSvg(len(table), gv.COMPARISON_TOKENS, gv.ON_COLOR_CANDIDATES)
+    print(
+        f"templates built in {(time.perf_counter() - start) * 1000:.0f} ms: desktop "
+        f"{len(desktop.template) / 1024:.0f} KiB ({len(desktop.tokens)} tokens), "
+        f"comparison {len(comparison.template) / 1024:.0f} KiB"
+    )
+
+    ok = True
+    for name in table.names:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            svg = desktop.fill(table, name)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        path = args.output_dir / f"desktop_concept_{name.lower()}.svg"
+        path.write_text(svg, encoding="utf-8")
+        # 快速填充必须与 format_map 一致，且是合法的 XML
+        ok &= svg == desktop.template.format_map(desktop.colors(table, name))
+        minidom.parseString(svg)
+        print(f"  {name:<12} {elapsed * 1e6:6.1f} us -> {path}")
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        svg = comparison.fill(table)
+    elapsed = (time.perf_counter() - start) / args.repeat
+    path = comparison.write(table, args.output_dir / "scheme_comparison.svg")
+    minidom.parseString(svg)
+    print(f"  {'comparison':<12} {elapsed * 1e6:6.1f} us -> {path}")
+
+    # 页面模板按 FILL_SCRIPT 的规则填色，结果必须与 Python 填色一致
+    values = page_values(desktop, comparison, table)
+    page_ok = True
+    for template, stem, filled in (
+        (desktop, "desktop_concept", [desktop.fill(table, n) for n in table.names]),
+        (comparison, "scheme_comparison", [comparison.fill(table)]),
+    ):
+        path = template.write_template(args.output_dir / f"{stem}.template.svg")
+        text = path.read_text(encoding="utf-8")
+        if template is desktop:
+            pages = [fill_page(text, values["desktop"][n]) for n in table.names]
+        else:
+            pages = [fill_page(text, values["comparison"])]
+        page_ok &= pages == filled
+        print(f"  {'page':<12} {len(_PAGE_FIELD.findall(text))} placeholders -> {path}")
+    if not ok:
+        print("  fast fill differs from format_map")
+    if not page_ok:
+        print("  page template fill differs")
+    return ok and page_ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
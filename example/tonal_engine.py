@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tonal ramps and temperature colors for arrays of source colors.
+
+Material/Palettes/TonalPalette.lean solves one tone at a time and
+Material/Temperature/TemperatureCache.lean rebuilds a 360-color hue ring
+for every input. ``source_palettes`` does both for a whole array of source
+colors in one vectorized call:
+
+* the six palettes of a scheme variant (``dynamic_scheme.DynamicScheme``)
+  of every source as full 0-100 ramps, from one ``hct_f32.solve_to_int`` call
+  over the distinct (hue, chroma) pairs;
+* the complement and analogous colors of every source, from the hue rings
+  of the shared ``dynamic_scheme.HUE_RINGS`` LRU cache (or the given
+  ``HueRingCache``), so sources seen before skip the ring construction.
+
+``python tonal_engine.py`` times a synthetic wallpaper catalog against a
+cold and a warm ring cache.
+"""
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from dynamic_scheme import (
+    HUE_RINGS,
+    PALETTES,
+    DynamicScheme,
+    HueRing,
+    HueRingCache,
+    _unique_rows,
+    hct_from_argb,
+    max_chroma_peak,
+    solve_to_int,
+    temperature_colors,
+)
+
+TONES = np.arange(101)
+
+# TonalPalette.tone 99 在黄色色相上取 98 与 100 的平均 (Hct.isYellow)
+_YELLOW_HUES = (105.0, 125.0)
+
+SourcePalettes = namedtuple("SourcePalettes", ["ramps", "complement", "analogous"])
+SourcePalettes.__doc__ = """
+Result of ``source_palettes``: uint32 ARGB ``ramps`` [source, palette,
+tone] (palettes in ``PALETTES`` order, tones 0-100), ``complement``
+[source] and ``analogous`` [source, count].
+"""
+
+
+def average_argb(a, b):
+    """TonalPalette.averageArgb: per-channel average of two ARGB arrays."""
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    average = (a | b) - (((a ^ b) & np.uint32(0xFEFEFEFE)) >> np.uint32(1))
+    return average | np.uint32(0xFF000000)
+
+
+def tonal_ramps(hue, chroma):
+    """
+    TonalPalette.tone for tones 0-100 of arrays of palettes.
+
+    Returns:
+        uint32 ARGB array [palette, 101]
+    """
+    (hue, chroma), inverse = _unique_rows(hue, chroma)
+    argb = solve_to_int(hue[:, None], chroma[:, None], TONES.astype(np.float32))
+    yellow = (hue >= _YELLOW_HUES[0]) & (hue <= _YELLOW_HUES[1])
+    argb[yellow, 99] = average_argb(argb[yellow, 98], argb[yellow, 100])
+    return argb[inverse]
+
+
+def source_palettes(
+    source_argb, variant="TonalSpot", count=5, divisions=12, rings=HUE_RINGS
+):
+    """
+    Tonal ramps of the palettes of ``variant`` and the temperature colors
+    of every source color.
+
+    Args:
+        source_argb: ARGB source colors
+        variant: scheme variant whose palettes are ramped, as in
+            ``dynamic_scheme.SCHEME_VARIANTS``
+        count, divisions: of Temperature.getAnalogousColors
+        rings: ``HueRingCache`` the hue rings come from
+
+    Returns:
+        ``SourcePalettes``
+    """
+    sources = np.asarray(source_argb, dtype=np.uint32).reshape(-1)
+    scheme = DynamicScheme(sources, [variant])
+    # 调色板与明暗无关，每个来源取 light 那一行
+    hue = np.stack([scheme.palettes[name].hue[::2] for name in PALETTES], axis=1)
+    chroma = np.stack([scheme.palettes[name].chroma[::2] for name in PALETTES], axis=1)
+    ramps = tonal_ramps(hue.reshape(-1), chroma.reshape(-1))
+
+    _, source_chroma, source_tone = hct_from_argb(sources)
+    ring = rings.get(source_chroma, source_tone)
+    complement, analogous = temperature_colors(sources, count, divisions, ring)
+    return SourcePalettes(
+        ramps.reshape(len(sources), len(PALETTES), len(TONES)), complement, analogous
+    )
+
+
+def synthetic_catalog(n_sources, n_themes, seed=0):
+    """
+    ``n_sources`` ARGB source colors drawn from ``n_themes`` distinct ones: a
+    catalog of similar wallpapers, which quantize to the same source color.
+    """
+    rng = np.random.default_rng(seed)
+    themes = rng.integers(0, 256, (n_themes, 3)).astype(np.uint32)
+    rgb = themes[rng.integers(0, n_themes, n_sources)]
+    return np.uint32(0xFF000000) | rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sources", type=int, default=1000, help="catalog size (default: 1000)"
+    )
+    parser.add_argument(
+        "--themes",
+        type=int,
+        default=200,
+        help="distinct source colors of the catalog (default: 200)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=int,
+        default=50,
+        help="sources timed one at a time without the cache (default: 50)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sources = synthetic_catalog(args.sources, args.themes, args.seed)
+    max_chroma_peak()
+    print(f"{args.sources} source colors, {args.themes} distinct:")
+
+    cache = HueRingCache()
+    results = []
+    for run in ("cold", "warm"):
+        start = time.perf_counter()
+        results.append(source_palettes(sources, rings=cache))
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {run} ring cache: {elapsed * 1000:7.1f} ms "
+            f"({elapsed / args.sources * 1e6:6.1f} us per source), "
+            f"{len(cache)} rings cached, {cache.hits} hits / {cache.misses} misses"
+        )
+
+    # 对照：逐个来源各自构建色环 (Lean 的做法)
+    baseline = sources[: args.baseline]
+    start = time.perf_counter()
+    complement = np.empty_like(baseline)
+    for i, source in enumerate(baseline[:, None]):
+        ring = HueRing(*hct_from_argb(source)[1:])
+        complement[i] = temperature_colors(source, ring=ring)[0][0]
+    per_source = (time.perf_counter() - start) / len(baseline)
+    print(f"  one source at a time: {per_source * 1e6:.0f} us per source (rings only)")
+
+    cold, warm = results
+    ok = all(
+        np.array_equal(getattr(cold, name), getattr(warm, name))
+        for name in SourcePalettes._fields
+    )
+    ok &= np.array_equal(cold.complement[: len(baseline)], complement)
+    print(f"  cached and per-source results match: {ok}")
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
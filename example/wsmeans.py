@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+NumPy port of Material/Extract/futhark/src/wsmeans.fut (and celebi.fut).
+
+Weighted k-means in L*a*b* over the distinct colors of an image, started
+from the Wu palette. The iteration follows ``quantize_wsmeans``: the first
+round assigns every color to its nearest cluster, later rounds only move a
+color when that shortens its distance by more than ``MIN_DELTA_E``, and the
+loop stops as soon as nothing moves.
+
+Later rounds skip most color-to-cluster distances with the triangle
+inequality: when two clusters are more than twice as far apart as a color is
+from its current cluster, the other cluster cannot be nearer. Distances are
+float32 like the Futhark code; full distance matrices are only built in
+chunks of ``chunk_size`` colors.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from color_f32 import int_to_lab, lab_to_int
+from wu import load_pixels, moments_from_colors, quantize_wu_moments, unique_colors
+
+MAX_ITERATIONS = 100
+MIN_DELTA_E = np.float32(3.0)
+DEFAULT_CHUNK_SIZE = 2048
+
+# 剪枝条件留一点余量，保证 float32 舍入下也不会漏掉真正更近的聚类
+_PRUNE_MARGIN = np.float32(1.0 + 1e-4)
+
+
+def _dist_sq(p, c):
+    """
+    dist_sq of wsmeans.fut for points ``p`` and clusters ``c`` given as
+    (L, a, b) tuples of float32 arrays that broadcast against each other.
+    """
+    d = p[0] - c[0]
+    d *= d
+    for i in (1, 2):
+        e = p[i] - c[i]
+        e *= e
+        d += e
+    return d
+
+
+def nearest_clusters(points, clusters, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Nearest cluster of every point (lowest index on ties) by brute force,
+    ``chunk_size`` points at a time.
+
+    Args:
+        points, clusters: float32 [3, n] and [3, k] L*a*b* columns
+
+    Returns:
+        (int64 indices, float32 squared distances)
+    """
+    n = points.shape[1]
+    indices = np.empty(n, dtype=np.int64)
+    dists = np.empty(n, dtype=np.float32)
+    for start in range(0, n, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        d = _dist_sq(points[:, chunk, None], clusters[:, None, :])
+        indices[chunk] = d.argmin(axis=1)
+        dists[chunk] = np.take_along_axis(d, indices[chunk, None], axis=1)[:, 0]
+    return indices, dists
+
+
+def moves_pruned(points, clusters, current, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Which points a WSMeans round moves, and where, without the full search.
+
+    A point moves only if some cluster is more than ``MIN_DELTA_E`` nearer
+    than its current cluster ``a``. By the triangle inequality such a
+    cluster lies within ``2 |p - c_a| - MIN_DELTA_E`` of ``c_a``, so only
+    those neighbours of ``a`` (sorted by distance once per round) are
+    visited; the nearest of them is the brute-force nearest cluster.
+
+    Returns:
+        (bool moved, int64 nearest cluster, distances evaluated)
+    """
+    n_clusters = clusters.shape[1]
+    between = _dist_sq(clusters[:, :, None], clusters[:, None, :])
+    order = np.argsort(between, axis=1, kind="stable")
+    radius = np.sqrt(np.take_along_axis(between, order, axis=1).astype(np.float64))
+    # 每行加一个偏移量拼成一个递增数组，一次 searchsorted 查完所有点
+    offset = 2.0 * radius.max() + 1.0
+    rows = np.arange(n_clusters) * offset
+    flat_radius = (radius + rows[:, None]).ravel()
+
+    n = points.shape[1]
+    moved = np.zeros(n, dtype=bool)
+    best = current.copy()
+    d_home = _dist_sq(points, clusters[:, current])
+    reach = (2.0 * np.sqrt(d_home.astype(np.float64)) - MIN_DELTA_E) * _PRUNE_MARGIN
+    reach += 1e-3
+    # 大多数点连最近的邻居聚类都够不着，直接跳过
+    (survivors,) = np.nonzero(reach >= radius[current, 1])
+    n_evaluated = n
+
+    for start in range(0, len(survivors), chunk_size):
+        chunk = survivors[start : start + chunk_size]
+        home = current[chunk]
+        k = np.searchsorted(flat_radius, reach[chunk] + rows[home], side="right")
+        k = np.minimum(k - home * n_clusters, n_clusters)
+
+        # 展开成 (点, 候选) 对：第 i 个点的候选是它所在聚类的前 k[i] 个邻居
+        starts = np.cumsum(k) - k
+        owner = np.repeat(np.arange(len(k)), k)
+        rank = np.arange(len(owner)) - starts[owner]
+        candidate = order[home[owner], rank]
+        d = _dist_sq(points[:, chunk[owner]], clusters[:, candidate])
+        n_evaluated += len(d)
+
+        d_min = np.minimum.reduceat(d, starts)
+        # 距离相同时取下标最小的聚类，与 argmin 一致
+        tied = np.where(d == d_min[owner], candidate, n_clusters)
+        nearest = np.minimum.reduceat(tied, starts)
+        move = np.abs(np.sqrt(d_min) - np.sqrt(d_home[chunk])) > MIN_DELTA_E
+        moved[chunk[move]] = True
+        best[chunk[move]] = nearest[move]
+    return moved, best, n_evaluated
+
+
+def _update_clusters(indices, points, counts, n_clusters):
+    weights = np.bincount(indices, weights=counts, minlength=n_clusters)
+    sums = np.stack(
+        [
+            np.bincount(indices, weights=points[i] * counts, minlength=n_clusters)
+            for i in range(3)
+        ]
+    )
+    # 空聚类和 Futhark 一样落到 (0, 0, 0)
+    safe = np.where(weights == 0, 1, weights)
+    return np.where(weights == 0, 0, sums / safe).astype(np.float32)
+
+
+def quantize_wsmeans(
+    colors,
+    counts,
+    starting_clusters,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    prune=True,
+    stats=None,
+):
+    """
+    Weighted k-means refinement of ``starting_clusters``.
+
+    Args:
+        colors, counts: distinct ARGB colors and their pixel counts, as
+            returned by ``wu.unique_colors``
+        starting_clusters: ARGB starting palette (the Wu palette)
+        chunk_size: points per block of the brute-force distance matrix
+        prune: skip distances with the triangle inequality after the first
+            round (False computes every distance, like the Futhark code)
+        stats: optional dict that receives iteration and distance counts
+
+    Returns:
+        (ARGB colors sorted ascending, int64 pixel counts) of the non-empty
+        clusters, duplicates merged
+    """
+    # 按列存放 (3, n)，距离计算时每个分量都是连续内存
+    points = np.ascontiguousarray(int_to_lab(colors).reshape(-1, 3).T)
+    counts = np.asarray(counts, dtype=np.int64)
+    clusters = np.ascontiguousarray(int_to_lab(starting_clusters).reshape(-1, 3).T)
+    n_clusters = clusters.shape[1]
+    n_points = points.shape[1]
+
+    indices, _ = nearest_clusters(points, clusters, chunk_size)
+    n_evaluated = n_points * n_clusters
+    iteration = 1
+    clusters = _update_clusters(indices, points, counts, n_clusters)
+    while iteration < MAX_ITERATIONS:
+        if prune:
+            moved, best, n = moves_pruned(points, clusters, indices, chunk_size)
+            n_evaluated += n
+        else:
+            best, best_dist = nearest_clusters(points, clusters, chunk_size)
+            n_evaluated += n_points * n_clusters
+            current_dist = _dist_sq(points, clusters[:, indices])
+            moved = np.abs(np.sqrt(best_dist) - np.sqrt(current_dist)) > MIN_DELTA_E
+        iteration += 1
+        if not moved.any():
+            break
+        indices = np.where(moved, best, indices)
+        clusters = _update_clusters(indices, points, counts, n_clusters)
+
+    if stats is not None:
+        stats["iterations"] = iteration
+        stats["distances"] = n_evaluated
+        stats["brute_force_distances"] = iteration * n_points * n_clusters
+
+    final_counts = np.bincount(indices, weights=counts, minlength=n_clusters)
+    final_colors = lab_to_int(clusters.T)
+    keep = final_counts > 0
+    unique, inverse = np.unique(final_colors[keep], return_inverse=True)
+    merged = np.bincount(inverse, weights=final_counts[keep], minlength=len(unique))
+    return unique.astype(np.uint32), merged.astype(np.int64)
+
+
+def quantize_celebi(pixels, max_colors, chunk_size=DEFAULT_CHUNK_SIZE, prune=True):
+    """Wu palette refined by WSMeans, as ``quantize_celebi`` in celebi.fut."""
+    colors, counts = unique_colors(pixels)
+    palette = quantize_wu_moments(moments_from_colors(colors, counts), max_colors)
+    return quantize_wsmeans(colors, counts, palette, chunk_size, prune)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "image",
+        nargs="?",
+        default=Path(__file__).with_name("example.jpg"),
+        help="image to quantize (default: example.jpg)",
+    )
+    parser.add_argument(
+        "--max-colors",
+        type=int,
+        default=256,
+        help="number of starting clusters from Wu (default: 256)",
+    )
+    parser.add_argument(
+        "--megapixels",
+        type=float,
+        default=0.0,
+        help="tile the image up to this many megapixels (default: as is)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"colors per brute-force distance block (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    args = parser.parse_args(argv)
+
+    pixels = load_pixels(args.image, args.megapixels)
+    start = time.perf_counter()
+    colors, counts = unique_colors(pixels)
+    palette = quantize_wu_moments(moments_from_colors(colors, counts), args.max_colors)
+    t_wu = time.perf_counter() - start
+    print(
+        f"{len(pixels) / 1e6:.2f} MP, {len(colors)} distinct colors, "
+        f"{len(palette)} Wu clusters in {t_wu * 1000:.0f} ms"
+    )
+
+    results = {}
+    for prune in (True, False):
+        stats = {}
+        start = time.perf_counter()
+        results[prune] = quantize_wsmeans(
+            colors, counts, palette, args.chunk_size, prune, stats
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {'pruned' if prune else 'brute force':<12} {elapsed * 1000:6.0f} ms, "
+            f"{stats['iterations']} iterations, {len(results[prune][0])} colors, "
+            f"{stats['distances'] / stats['brute_force_distances']:.1%} of distances"
+        )
+    same = all(np.array_equal(a, b) for a, b in zip(results[True], results[False]))
+    print(f"  results {'identical' if same else 'DIFFERENT'}")
+    return same
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
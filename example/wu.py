@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+NumPy port of Material/Extract/futhark/src/wu.fut.
+
+Wu's color quantizer: a 33x33x33 cube of color moments (pixel count, sums of
+R, G, B and of R^2 + G^2 + B^2, indexed by the top 5 bits of each channel),
+turned into 3-D prefix sums so that the moments of any box are eight lookups,
+then split box by box along the cut that leaves the least variance.
+
+The moment cube is built with ``np.bincount`` and ``np.cumsum``; integer
+arithmetic is int64 and wraps exactly like the Futhark i64 code, so
+``quantize_wu`` returns the same palette as the compiled version.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+INDEX_BITS = 5
+INDEX_COUNT = 33
+MAX_COLOR_SLOTS = 256
+
+WU_FUT = (
+    Path(__file__).resolve().parent.parent
+    / "Material"
+    / "Extract"
+    / "futhark"
+    / "src"
+    / "wu.fut"
+)
+
+
+# 像素多于此数时用 2^24 格的稠密直方图去重，否则排序
+DENSE_HISTOGRAM_MIN_PIXELS = 1 << 21
+
+
+def _bgr_codes(pixels):
+    """0xBBGGRR code of every pixel, read as overlapping little-endian words."""
+    n = len(pixels)
+    codes = np.empty(n, dtype=np.intp)
+    if n == 0:
+        return codes
+    # 第 i 个 uint32 从第 3i 个字节开始读，高字节属于下一个像素，屏蔽掉即可；
+    # 最后一个像素会读越界，单独处理
+    words = np.ndarray((n - 1,), dtype="<u4", buffer=pixels, strides=(3,))
+    np.bitwise_and(words, 0xFFFFFF, out=codes[:-1], casting="unsafe")
+    r, g, b = (int(c) for c in pixels[-1])
+    codes[-1] = r | g << 8 | b << 16
+    return codes
+
+
+def unique_colors(pixels):
+    """
+    Distinct colors of ``pixels`` ([n, 3] uint8 RGB) and how often each occurs.
+
+    Returns:
+        (uint32 ARGB array sorted ascending, int64 counts)
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    codes = _bgr_codes(pixels)
+    if len(codes) >= DENSE_HISTOGRAM_MIN_PIXELS:
+        histogram = np.bincount(codes, minlength=1 << 24)
+        codes = np.flatnonzero(histogram)
+        counts = histogram[codes]
+    else:
+        codes, counts = np.unique(codes, return_counts=True)
+    argb = (
+        np.uint32(0xFF000000)
+        | (codes & 0xFF).astype(np.uint32) << 16
+        | (codes & 0xFF00).astype(np.uint32)
+        | (codes >> 16).astype(np.uint32)
+    )
+    order = np.argsort(argb)
+    return argb[order], counts[order].astype(np.int64)
+
+
+def compute_moments(pixels):
+    """
+    Prefix-summed moment cube of ``pixels`` ([n, 3] uint8 RGB).
+
+    The cube is accumulated over the distinct colors, weighted by their
+    counts, which is far fewer bins to scatter into than one per pixel.
+
+    Returns:
+        int64 [33, 33, 33, 5] array of (R, G, B, count, R^2 + G^2 + B^2)
+        sums; index 0 of every axis is the all-zero border
+    """
+    return moments_from_colors(*unique_colors(pixels))
+
+
+def moments_from_colors(argb, counts):
+    """``compute_moments`` for the output of ``unique_colors``."""
+    rgb = [(argb >> shift & 0xFF).astype(np.int64) for shift in (16, 8, 0)]
+    n = INDEX_COUNT
+    # 每个通道的高 5 位 + 1 拼成 33^3 立方体里的扁平下标
+    flat = np.zeros(len(argb), dtype=np.intp)
+    for c in rgb:
+        flat = flat * n + (c >> (8 - INDEX_BITS)) + 1
+
+    size = n * n * n
+    m0 = np.empty((size, 5), dtype=np.int64)
+    # float64 的和在 2^53 以内都是精确整数
+    for i, c in enumerate(rgb):
+        m0[:, i] = np.bincount(flat, weights=c * counts, minlength=size)
+    m0[:, 3] = np.bincount(flat, weights=counts, minlength=size)
+    squares = sum(c * c for c in rgb) * counts
+    m0[:, 4] = np.bincount(flat, weights=squares, minlength=size)
+    return moments_prefix(m0.reshape(n, n, n, 5))
+
+
+def moments_prefix(m0):
+    """Inclusive prefix sums of a moment cube along B, G and R."""
+    m = np.cumsum(m0, axis=2)
+    np.cumsum(m, axis=1, out=m)
+    np.cumsum(m, axis=0, out=m)
+    return m
+
+
+def vol(cube, moments):
+    """Moments (along the last axis) inside ``cube`` = (r0, r1, g0, g1, b0, b1)."""
+    r0, r1, g0, g1, b0, b1 = cube
+    return (
+        moments[r1, g1, b1]
+        - moments[r1, g1, b0]
+        - moments[r1, g0, b1]
+        - moments[r0, g1, b1]
+        + moments[r1, g0, b0]
+        + moments[r0, g1, b0]
+        + moments[r0, g0, b1]
+        - moments[r0, g0, b0]
+    )
+
+
+def cube_volume(cube):
+    r0, r1, g0, g1, b0, b1 = cube
+    return (r1 - r0) * (g1 - g0) * (b1 - b0)
+
+
+def _hyp(v):
+    # int64 数组运算，溢出时和 Futhark 一样回绕
+    return (v[..., :3] * v[..., :3]).sum(axis=-1)
+
+
+def variance(cube, moments):
+    d = vol(cube, moments)
+    if d[3] == 0:
+        return 0.0
+    return float(d[4]) - float(_hyp(d)) / float(d[3])
+
+
+def calculate_axis_scores(half, leftover):
+    """
+    Best cut among candidate halves ([k, 4] moments each side).
+
+    Returns:
+        (index, score), or (-1, -1.0) when no cut is usable
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_half = np.where(
+            half[:, 3] != 0, _hyp(half).astype(np.float64) / half[:, 3], -np.inf
+        )
+        t_left = np.where(
+            leftover[:, 3] != 0,
+            _hyp(leftover).astype(np.float64) / leftover[:, 3],
+            -np.inf,
+        )
+    scores = t_half + t_left
+    best = int(np.argmax(scores))
+    best_val = float(scores[best])
+    if np.isinf(best_val) or np.isnan(best_val) or best_val < 0.0:
+        return -1, -1.0
+    return best, best_val
+
+
+def _axis_cut(cut, half, whole):
+    best, score = calculate_axis_scores(half, whole - half)
+    if score >= 0.0:
+        return cut + best, score
+    return -1, 0.0
+
+
+def maximize(cube, moments4):
+    """
+    Best cut of ``cube`` along each axis.
+
+    Returns:
+        ((cut_r, max_r), (cut_g, max_g), (cut_b, max_b)); cut is -1 (score 0)
+        where the axis cannot be split
+    """
+    r0, r1, g0, g1, b0, b1 = cube
+    m = moments4
+    whole = vol(cube, m)
+
+    r_cut = r0 + 1
+    result_r = (-1, 0.0)
+    if r1 > r_cut:
+        bottom = (m[r0, g1, b0] - m[r0, g1, b1]) + (m[r0, g0, b1] - m[r0, g0, b0])
+        s = slice(r_cut, r1)
+        slices = m[s, g1, b1] - m[s, g1, b0] - m[s, g0, b1] + m[s, g0, b0]
+        result_r = _axis_cut(r_cut, slices + bottom, whole)
+
+    g_cut = g0 + 1
+    result_g = (-1, 0.0)
+    if g1 > g_cut:
+        bottom = (m[r1, g0, b0] - m[r1, g0, b1]) + (m[r0, g0, b1] - m[r0, g0, b0])
+        s = slice(g_cut, g1)
+        slices = m[r1, s, b1] - m[r1, s, b0] - m[r0, s, b1] + m[r0, s, b0]
+        result_g = _axis_cut(g_cut, slices + bottom, whole)
+
+    b_cut = b0 + 1
+    result_b = (-1, 0.0)
+    if b1 > b_cut:
+        bottom = (m[r1, g0, b0] - m[r1, g1, b0]) + (m[r0, g1, b0] - m[r0, g0, b0])
+        s = slice(b_cut, b1)
+        slices = m[r1, g1, s] - m[r1, g0, s] - m[r0, g1, s] + m[r0, g0, s]
+        result_b = _axis_cut(b_cut, slices + bottom, whole)
+
+    return result_r, result_g, result_b
+
+
+def _split(cube, axis, cut):
+    lo, hi = list(cube), list(cube)
+    lo[2 * axis + 1] = cut
+    hi[2 * axis] = cut
+    return tuple(lo), tuple(hi)
+
+
+def split_boxes(moments, max_colors):
+    """
+    The box-splitting loop of ``quantize_wu``.
+
+    Returns:
+        list of cubes (r0, r1, g0, g1, b0, b1), at most ``max_colors`` long
+    """
+    moments4 = moments[..., :4]
+    cubes = [(0, INDEX_COUNT - 1, 0, INDEX_COUNT - 1, 0, INDEX_COUNT - 1)]
+    variances = np.zeros(MAX_COLOR_SLOTS)
+    variances[0] = variance(cubes[0], moments)
+
+    next_idx = 0
+    i = 1
+    while i < max_colors:
+        cube = cubes[next_idx]
+        (cut_r, max_r), (cut_g, max_g), (cut_b, max_b) = maximize(cube, moments4)
+
+        if max_r >= max_g and max_r >= max_b:
+            axis, cut = 0, cut_r
+        elif max_g >= max_r and max_g >= max_b:
+            axis, cut = 1, cut_g
+        else:
+            axis, cut = 2, cut_b
+
+        if cut < 0:
+            # 切不开：这个盒子不再参与挑选，槽位 i 留给下一次
+            variances[next_idx] = 0.0
+            i -= 1
+        else:
+            old, new = _split(cube, axis, cut)
+            cubes[next_idx] = old
+            cubes.append(new)
+            variances[next_idx] = (
+                variance(old, moments) if cube_volume(old) > 1 else 0.0
+            )
+            variances[i] = variance(new, moments) if cube_volume(new) > 1 else 0.0
+
+        next_idx = int(np.argmax(variances[: i + 1]))
+        if variances[next_idx] <= 0.0:
+            break
+        i += 1
+    return cubes[: max(max_colors, 0)]
+
+
+def pack_argb(v):
+    """Average color of a box's [R, G, B, count] moments as ARGB."""
+    r, g, b, w = (int(x) for x in v[:4])
+    r, g, b = (c // w if w > 0 else 0 for c in (r, g, b))
+    return (0xFF << 24 | r << 16 | g << 8 | b) & 0xFFFFFFFF
+
+
+def quantize_wu(pixels, max_colors):
+    """
+    Wu palette of ``pixels``.
+
+    Args:
+        pixels: [n, 3] uint8 RGB (anything that reshapes to it)
+        max_colors: palette size, at most ``MAX_COLOR_SLOTS``
+
+    Returns:
+        uint32 ARGB array of box averages, in box order like ``quantize_wu``
+    """
+    return quantize_wu_moments(compute_moments(pixels), max_colors)
+
+
+def quantize_wu_moments(moments, max_colors):
+    """``quantize_wu`` for a moment cube that is already computed."""
+    if max_colors > MAX_COLOR_SLOTS:
+        raise ValueError(f"max_colors must be <= {MAX_COLOR_SLOTS}")
+    cubes = split_boxes(moments, max_colors)
+    return np.array([pack_argb(vol(c, moments)) for c in cubes], dtype=np.uint32)
+
+
+# ---------------------------------------------------------------------------
+# 与 Futhark 版本对比
+# ---------------------------------------------------------------------------
+
+_BENCH_FUT = """import "{wu}"
+
+entry main (max_colors: i64) (pixels: [][3]u8) : []i32 = quantize_wu max_colors pixels
+"""
+
+
+def _futhark_value(array):
+    """Futhark binary data format of a NumPy scalar or array."""
+    array = np.asarray(array)
+    type_name = {np.dtype(np.uint8): b"  u8", np.dtype(np.int64): b" i64"}[array.dtype]
+    header = b"b\x02" + bytes([array.ndim]) + type_name
+    shape = np.array(array.shape, dtype="<i8").tobytes()
+    return header + shape + array.astype(array.dtype.newbyteorder("<")).tobytes()
+
+
+def run_futhark(pixels, max_colors, backend="c", runs=10):
+    """
+    Compile wu.fut with ``futhark <backend>`` and run it on ``pixels``.
+
+    Returns:
+        (uint32 ARGB palette, mean seconds per run), or None when the
+        ``futhark`` executable is not installed
+    """
+    futhark = shutil.which("futhark")
+    if futhark is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "wu_bench.fut"
+        source.write_text(_BENCH_FUT.format(wu=WU_FUT.with_suffix("").as_posix()))
+        subprocess.run([futhark, backend, str(source)], check=True)
+        timing = Path(tmp) / "timing.txt"
+        data = _futhark_value(np.int64(max_colors)) + _futhark_value(
+            np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+        )
+        out = subprocess.run(
+            [str(source.with_suffix("")), "-r", str(runs), "-t", str(timing)],
+            input=data,
+            capture_output=True,
+            check=True,
+        )
+        # 输出形如 [-16777216i32, ...]
+        values = [int(v) for v in re.findall(r"-?\d+(?=i32)", out.stdout.decode())]
+        micros = [int(line) for line in timing.read_text().split()]
+    return np.array(values, dtype=np.int64).astype(np.uint32), np.mean(micros) / 1e6
+
+
+def load_pixels(path, megapixels=None):
+    """
+    RGB pixels of an image; with ``megapixels`` the image is tiled up to at
+    least that many pixels, to time large inputs.
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        pixels = np.asarray(image.convert("RGB")).reshape(-1, 3)
+    if megapixels:
+        reps = -(-int(megapixels * 1e6) // len(pixels))
+        pixels = np.tile(pixels, (reps, 1))[: int(megapixels * 1e6)]
+    return pixels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "image",
+        nargs="?",
+        default=Path(__file__).with_name("example.jpg"),
+        help="image to quantize (default: example.jpg)",
+    )
+    parser.add_argument(
+        "--max-colors",
+        type=int,
+        default=128,
+        help="palette size, as passed by extract_colors (default: 128)",
+    )
+    parser.add_argument(
+        "--megapixels",
+        type=float,
+        default=12.0,
+        help="tile the image up to this many megapixels (default: 12, 0 = as is)",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="timed runs (default: 5)")
+    parser.add_argument(
+        "--backend",
+        default=os.environ.get("FUTHARK_BACKEND", "c"),
+        help="futhark compiler backend for the comparison (default: c)",
+    )
+    args = parser.parse_args(argv)
+
+    pixels = load_pixels(args.image, args.megapixels)
+    quantize_wu(pixels[:1000], args.max_colors)
+
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        palette = quantize_wu(pixels, args.max_colors)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    moments = compute_moments(pixels)
+    t_moments = time.perf_counter() - start
+    print(
+        f"{len(pixels) / 1e6:.1f} MP -> {len(palette)} colors: "
+        f"NumPy {min(times) * 1000:.0f} ms (moments {t_moments * 1000:.0f} ms)"
+    )
+
+    try:
+        futhark = run_futhark(pixels, args.max_colors, args.backend, args.runs)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Futhark build failed: {e}", file=sys.stderr)
+        return False
+    if futhark is None:
+        print("futhark not found on PATH, skipped the comparison")
+        return True
+    expected, seconds = futhark
+    same = np.array_equal(expected, palette)
+    print(
+        f"Futhark ({args.backend}) {seconds * 1000:.0f} ms: "
+        f"palette {'identical' if same else 'DIFFERENT'}"
+    )
+    return same
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)